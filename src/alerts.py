@@ -0,0 +1,70 @@
+# app/alerts.py
+# Alert assets ฝั่ง pure Python (ไม่ต้องมี Qt): รายการรูป gag + audio worker ตัวเดียว
+import os, random, threading
+
+try:
+    from playsound import playsound  # ใช้เล่นเสียง (ไม่บังคับ)
+    HAS_PLAYSOUND = True
+except Exception:
+    HAS_PLAYSOUND = False
+
+from .config import GAG_DIR, ALERT_SOUND_PATH
+
+GAG_EXTS = (".png", ".jpg", ".jpeg")
+
+
+def list_gags(folder: str = GAG_DIR) -> list[str]:
+    """ไฟล์รูปในโฟลเดอร์ gag (เรียงชื่อ) — ไม่มีโฟลเดอร์ = []"""
+    if not folder or not os.path.isdir(folder):
+        return []
+    return [os.path.join(folder, f) for f in sorted(os.listdir(folder))
+            if f.lower().endswith(GAG_EXTS)]
+
+
+class GagPicker:
+    """สุ่มรูป gag จากรายการที่อ่านครั้งเดียวตอนสร้าง (ไม่ listdir ทุก alert, ไม่ซ้ำรูปเดิมติดกัน)"""
+
+    def __init__(self, folder: str = GAG_DIR):
+        self.files = list_gags(folder)
+        self._last = None
+
+    def pick(self) -> str:
+        if not self.files:
+            return ""
+        choices = [f for f in self.files if f != self._last] or self.files
+        self._last = random.choice(choices)
+        return self._last
+
+
+class AudioWorker:
+    """
+    เล่นเสียง alert ผ่าน thread เดียวที่ใช้ซ้ำ (ไม่สร้าง thread ใหม่ทุก alert)
+    trigger() ระหว่างที่กำลังเล่นอยู่ → รวมเป็นการเล่นอีกครั้งเดียวหลังจบ
+    """
+
+    def __init__(self, path: str = ALERT_SOUND_PATH, play=None):
+        self.path = path if path and os.path.exists(path) else None
+        self._play = play or (playsound if HAS_PLAYSOUND else None)
+        self._pending = threading.Event()
+        self._thread = None
+
+    @property
+    def available(self) -> bool:
+        return self.path is not None and self._play is not None
+
+    def trigger(self):
+        if not self.available:
+            return
+        self._pending.set()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="napnope-audio", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            try:
+                self._play(self.path)
+            except Exception as e:
+                print("Sound error:", e)
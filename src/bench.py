@@ -0,0 +1,401 @@
+# app/bench.py
+# Benchmark suite ของ hot path — ขับด้วยคลิป Data/VDO_* และภาพนิ่ง Data/Eye_* / Yawn / Not_yawn (ไม่ใช้กล้อง)
+#
+#   python -m app.bench                                  ทุกชุด
+#   python -m app.bench --only features,logger --frames 60
+#   python -m app.bench --compare bench_out/bench_20251017_101500.json
+#   python -m app.bench --only tiers                      FaceMesh tier: fps + EAR/MAR เทียบ "accurate"
+#
+# รายงาน p50 / p95 / p99 (ms) และ fps ต่อรายการ แล้วเขียน JSON ลง BENCH_OUT_DIR ไว้เทียบกันข้ามรอบ
+import argparse, json, os, platform, sys, tempfile, time, datetime as dt
+import numpy as np
+
+from .config import DATA_DIR, BENCH_OUT_DIR, BENCH_FACEMESH_WIDTHS, BENCH_TIER_FRAMES
+from .evaluate import find_clips
+
+STILL_DIRS = ("Eye_close", "Eye_open", "Yawn", "Not_yawn")
+STILL_EXTS = (".jpg", ".jpeg", ".png")
+
+
+# ==============================
+# Timing
+# ==============================
+
+def _stats(ns: np.ndarray) -> dict:
+    ms = ns / 1e6
+    mean = float(ms.mean()) if len(ms) else 0.0
+    return {
+        "n": int(len(ms)),
+        "mean_ms": mean,
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else 0.0,
+        "p95_ms": float(np.percentile(ms, 95)) if len(ms) else 0.0,
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else 0.0,
+        "fps": 1000.0 / mean if mean > 0 else 0.0,
+    }
+
+
+def measure(fn, items: list, repeat: int = 1, warmup: int = 3) -> dict:
+    """เรียก fn(item) ทีละตัว จับเวลาแยกทุกครั้ง (warm-up ไม่นับ)"""
+    for x in items[:warmup]:
+        fn(x)
+    ns = np.empty(len(items) * repeat, np.int64)
+    k = 0
+    clock = time.perf_counter_ns
+    for _ in range(repeat):
+        for x in items:
+            t = clock()
+            fn(x)
+            ns[k] = clock() - t
+            k += 1
+    return _stats(ns)
+
+
+# ==============================
+# Corpus (frames + landmarks)
+# ==============================
+
+class Corpus:
+    """เฟรมตัวอย่างจากคลิป (กระจายทั้งคลิป) + ภาพนิ่ง; landmark คำนวณครั้งแรกที่ขอแล้ว cache"""
+
+    def __init__(self, data_dir: str = DATA_DIR, frames_per_clip: int = 30, max_clips: int | None = None):
+        import cv2
+        self.frames = []
+        clips = find_clips(data_dir)[:max_clips]
+        self.paths = [path for path, _folder, _label in clips]
+        for path, _folder, _label in clips:
+            cap = cv2.VideoCapture(path)
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or frames_per_clip
+            step = max(1, total // frames_per_clip)
+            i = kept = 0
+            while kept < frames_per_clip:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                if i % step == 0:
+                    self.frames.append(frame)
+                    kept += 1
+                i += 1
+            cap.release()
+        self.n_clip_frames = len(self.frames)
+
+        for d in STILL_DIRS:
+            folder = os.path.join(data_dir, d)
+            if not os.path.isdir(folder):
+                continue
+            for fn in sorted(os.listdir(folder)):
+                if fn.lower().endswith(STILL_EXTS):
+                    img = cv2.imread(os.path.join(folder, fn))
+                    if img is not None:
+                        self.frames.append(img)
+        self.clips = len(clips)
+        self._faces = None
+
+    def faces(self) -> list:
+        """[(landmark protobuf, w, h)] ของเฟรมที่เจอหน้า"""
+        if self._faces is None:
+            import cv2
+            import mediapipe as mp
+            self._faces = []
+            with mp.solutions.face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1,
+                                                 refine_landmarks=True,
+                                                 min_detection_confidence=0.5) as fm:
+                for frame in self.frames:
+                    res = fm.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    if res.multi_face_landmarks:
+                        h, w = frame.shape[:2]
+                        self._faces.append((res.multi_face_landmarks[0].landmark, w, h))
+        return self._faces
+
+    def sequence(self, path: str, n: int) -> list:
+        """n เฟรมแรกติดกันของคลิป (RGB) — ใช้กับ FaceMesh โหมด video ที่ต้องการเฟรมต่อเนื่อง"""
+        import cv2
+        cap = cv2.VideoCapture(path)
+        frames = []
+        while len(frames) < n:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        cap.release()
+        return frames
+
+
+# ==============================
+# Benchmarks
+# ==============================
+
+def bench_features(corpus: Corpus, repeat: int) -> dict:
+    """landmark → feature (แทน logic เดิมใน Pipeline._process_frame) + _rot / ระยะทาง"""
+    from . import features as F
+    from .detector import Detector
+
+    faces = corpus.faces()
+    if not faces:
+        return {}
+    buf = np.empty((F.NUM_LANDMARKS, 2), np.float32)
+    pts = [F.landmarks_to_array(lm, w, h) for lm, w, h in faces]
+    geo = [F.head_geometry(p) for p in pts]
+    out = {
+        "features.landmarks_to_array": measure(
+            lambda f: F.landmarks_to_array(f[0], f[1], f[2], out=buf), faces, repeat),
+        "features.extract": measure(F.extract, pts, repeat),
+        # _distance เดิมถูกแทนด้วย features._dist (vectorized) — วัดคู่หางตาเหมือนที่ใช้หา eye_dist
+        "features.distance": measure(
+            lambda p: F._dist(p, F.EYE_L_OUTER_IDX, F.EYE_R_OUTER_IDX), pts, repeat),
+        "detector._rot": measure(
+            lambda g: Detector._rot((float(g["cx"]) - 50.0, float(g["nose_y"])),
+                                    (float(g["cx"]), float(g["cy"])), float(g["roll"])),
+            geo, repeat),
+    }
+    # ทั้ง batch ในครั้งเดียว (ใช้ตอน sweep offline) → เวลาเฉลี่ยต่อเฟรม
+    stack = np.stack(pts)
+    ns = np.empty(max(repeat, 5), np.int64)
+    for i in range(len(ns)):
+        t = time.perf_counter_ns()
+        F.extract(stack)
+        ns[i] = (time.perf_counter_ns() - t) // len(stack)
+    out["features.extract_batch_per_frame"] = _stats(ns)
+    return out
+
+
+def bench_facemesh(corpus: Corpus, repeat: int, widths=BENCH_FACEMESH_WIDTHS) -> dict:
+    """FaceMesh.process ที่ความกว้างภาพต่าง ๆ (โหมด video เหมือนตอนใช้งานจริง) + Detector.process เต็ม"""
+    import cv2
+    import mediapipe as mp
+    from .detector import Detector
+
+    frames = corpus.frames[:corpus.n_clip_frames] or corpus.frames
+    out = {}
+    for width in widths:
+        rgbs = []
+        for f in frames:
+            h, w = f.shape[:2]
+            s = width / w
+            img = cv2.resize(f, (width, max(1, int(round(h * s)))),
+                             interpolation=cv2.INTER_AREA if s < 1 else cv2.INTER_LINEAR)
+            rgbs.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        with mp.solutions.face_mesh.FaceMesh(static_image_mode=False, max_num_faces=1,
+                                             refine_landmarks=True,
+                                             min_detection_confidence=0.5,
+                                             min_tracking_confidence=0.5) as fm:
+            out[f"facemesh.w{width}"] = measure(fm.process, rgbs, repeat)
+
+    det = Detector()
+    try:
+        out["detector.process"] = measure(
+            lambda f: det.process(f, now=None, draw=False), frames, repeat)
+    finally:
+        det.close()
+    return out
+
+
+def bench_tiers(corpus: Corpus, repeat: int, frames: int = BENCH_TIER_FRAMES,
+                baseline: str = "accurate") -> dict:
+    """
+    FaceMesh แต่ละ tier (FACEMESH_TIERS) บนเฟรมต่อเนื่องของทุกคลิป (ทั้งเฟรม โหมด video)
+    + ความตรงกับ tier baseline: เจอหน้าตรงกัน, EAR/MAR MAE, สถานะตา/ปากตรงกัน (threshold ใน config)
+    """
+    import mediapipe as mp
+    from . import features as F
+    from .config import FACEMESH_TIERS, EAR_CLOSED_THRESH, MAR_OPEN_THRESH
+    from .detector import face_mesh_options
+
+    tiers = list(FACEMESH_TIERS)
+    ns = {t: [] for t in tiers}
+    ear = {t: [] for t in tiers}
+    mar = {t: [] for t in tiers}
+    clock = time.perf_counter_ns
+    for path in corpus.paths:
+        seq = corpus.sequence(path, frames)
+        if not seq:
+            continue
+        h, w = seq[0].shape[:2]
+        for tier in tiers:
+            for r in range(repeat):
+                # FaceMesh ใหม่ต่อคลิป → state tracking ไม่ข้ามคลิป (เฟรมแรกคือ detection จริง)
+                with mp.solutions.face_mesh.FaceMesh(**face_mesh_options(tier)) as fm:
+                    for rgb in seq:
+                        t = clock()
+                        res = fm.process(rgb)
+                        ns[tier].append(clock() - t)
+                        if r:
+                            continue
+                        if res.multi_face_landmarks:
+                            feats = F.extract(F.landmarks_to_array(
+                                res.multi_face_landmarks[0].landmark, w, h))
+                            ear[tier].append(float(feats["ear"]))
+                            mar[tier].append(float(feats["mar"]))
+                        else:
+                            ear[tier].append(np.nan)
+                            mar[tier].append(np.nan)
+
+    out = {}
+    base = baseline if baseline in tiers else tiers[0]
+    be, bm = np.asarray(ear[base]), np.asarray(mar[base])
+    for tier in tiers:
+        s = _stats(np.asarray(ns[tier], np.int64))
+        e, m = np.asarray(ear[tier]), np.asarray(mar[tier])
+        both = ~np.isnan(e) & ~np.isnan(be)
+        s["refine"] = FACEMESH_TIERS[tier]["refine"]
+        s["face_rate"] = float(np.mean(~np.isnan(e))) if len(e) else 0.0
+        s["face_agree"] = float(np.mean(np.isnan(e) == np.isnan(be))) if len(e) else 0.0
+        if both.any():
+            s["ear_mae"] = float(np.mean(np.abs(e[both] - be[both])))
+            s["mar_mae"] = float(np.mean(np.abs(m[both] - bm[both])))
+            s["eye_state_agree"] = float(np.mean((e[both] < EAR_CLOSED_THRESH)
+                                                 == (be[both] < EAR_CLOSED_THRESH)))
+            s["mouth_state_agree"] = float(np.mean((m[both] > MAR_OPEN_THRESH)
+                                                   == (bm[both] > MAR_OPEN_THRESH)))
+        out[f"tier.{tier}"] = s
+    return out
+
+
+def bench_display(corpus: Corpus, repeat: int, size=(960, 540)) -> dict:
+    """เฟรม → ภาพแสดงผล: เส้นทางใหม่ (render thread) และ cv_bgr_to_qimage + scale แบบเดิม"""
+    from .pipeline import Pipeline
+
+    frames = corpus.frames[:corpus.n_clip_frames] or corpus.frames
+    pipe = Pipeline(lazy=True)           # ไม่โหลด FaceMesh — ใช้แค่ _to_display
+    pipe.set_display_size(*size)
+    out = {"pipeline._to_display": measure(pipe._to_display, frames, repeat)}
+
+    try:
+        from PySide6.QtCore import Qt
+        from .ui import cv_bgr_to_qimage
+    except ImportError:
+        print("display: PySide6 not installed → skip cv_bgr_to_qimage")
+        return out
+    out["ui.cv_bgr_to_qimage+scaled"] = measure(
+        lambda f: cv_bgr_to_qimage(f).scaled(size[0], size[1], Qt.KeepAspectRatio,
+                                             Qt.SmoothTransformation),
+        frames, repeat)
+    return out
+
+
+def bench_logger(corpus: Corpus, repeat: int, rows: int = 20000) -> dict:
+    """EventLogger.log (ฝั่งผู้เรียก) + throughput รวมจนเขียนลงดิสก์ (CSV + SQLite) เสร็จ"""
+    from .logger import EventLogger
+
+    info = {"eye_state": "closed", "mouth_state": "yawn", "head_state": "down",
+            "ear": 0.18, "mar": 0.72, "head_ratio": -0.11}
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLogger(path=os.path.join(tmp, "events.csv"), parquet=False,
+                          store=os.path.join(tmp, "events.db"))
+        t0 = time.perf_counter()
+        stats = measure(lambda _: log.log("Drowsy Alert", info), range(rows), repeat, warmup=0)
+        log.flush(timeout=30.0)
+        total = time.perf_counter() - t0
+        log.close()
+    stats["rows_per_sec"] = rows * repeat / total
+    return {"logger.log": stats}
+
+
+BENCHMARKS = {
+    "features": bench_features,
+    "facemesh": bench_facemesh,
+    "tiers":    bench_tiers,
+    "display":  bench_display,
+    "logger":   bench_logger,
+}
+
+
+# ==============================
+# Report / compare
+# ==============================
+
+def _meta(corpus: Corpus, args) -> dict:
+    meta = {
+        "time": dt.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "clips": corpus.clips,
+        "frames": len(corpus.frames),
+        "repeat": args.repeat,
+    }
+    try:
+        import cv2
+        meta["opencv"] = cv2.__version__
+    except ImportError:
+        pass
+    try:
+        import mediapipe as mp
+        meta["mediapipe"] = mp.__version__
+    except ImportError:
+        pass
+    return meta
+
+
+def print_table(results: dict, baseline: dict | None = None):
+    head = f"{'benchmark':<34}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fps':>10}"
+    print(head + ("   vs base" if baseline else ""))
+    for name, s in results.items():
+        line = (f"{name:<34}{s['n']:>7}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}"
+                f"{s['p99_ms']:>10.3f}{s['fps']:>10.1f}")
+        if baseline and name in baseline and s["p50_ms"] > 0:
+            line += f"   x{baseline[name]['p50_ms'] / s['p50_ms']:.2f}"
+        print(line)
+
+
+def print_tiers(results: dict):
+    """ตาราง tier: fps, speedup และความตรงของ EAR/MAR เทียบ "accurate" (ไม่มี → tier แรก)"""
+    tiers = {k[5:]: v for k, v in results.items() if k.startswith("tier.")}
+    if not tiers:
+        return
+    base = tiers.get("accurate") or next(iter(tiers.values()))
+    print(f"\n{'tier':<12}{'refine':>7}{'fps':>8}{'speed':>7}{'face':>7}{'agree':>7}"
+          f"{'EAR mae':>9}{'MAR mae':>9}{'eye ok':>8}{'mouth ok':>9}")
+    for name, s in tiers.items():
+        speed = base["p50_ms"] / s["p50_ms"] if s["p50_ms"] > 0 else 0.0
+        print(f"{name:<12}{str(s['refine']):>7}{s['fps']:>8.1f}{speed:>6.2f}x{s['face_rate']:>7.1%}"
+              f"{s['face_agree']:>7.1%}{s.get('ear_mae', float('nan')):>9.4f}"
+              f"{s.get('mar_mae', float('nan')):>9.4f}{s.get('eye_state_agree', float('nan')):>8.1%}"
+              f"{s.get('mouth_state_agree', float('nan')):>9.1%}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nap?Nope! hot-path benchmarks")
+    ap.add_argument("--data", default=DATA_DIR)
+    ap.add_argument("--only", default=",".join(BENCHMARKS),
+                    help=f"คั่นด้วย , จาก {', '.join(BENCHMARKS)}")
+    ap.add_argument("--frames", type=int, default=30, help="เฟรมตัวอย่างต่อคลิป")
+    ap.add_argument("--clips", type=int, default=None, help="จำกัดจำนวนคลิป")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default=BENCH_OUT_DIR)
+    ap.add_argument("--compare", default=None, help="JSON ของรอบก่อน (คอลัมน์ vs base = speedup p50)")
+    args = ap.parse_args(argv)
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()]
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        ap.error(f"unknown benchmark: {', '.join(sorted(unknown))}")
+
+    corpus = Corpus(args.data, args.frames, args.clips)
+    if not corpus.frames:
+        raise FileNotFoundError(f"ไม่พบคลิป/ภาพใน {args.data}")
+    print(f"corpus: {corpus.clips} clips, {len(corpus.frames)} frames")
+
+    results = {}
+    for name in names:
+        print(f"… {name}")
+        results.update(BENCHMARKS[name](corpus, args.repeat))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print()
+    print_table(results, baseline)
+    print_tiers(results)
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, dt.datetime.now().strftime("bench_%Y%m%d_%H%M%S.json"))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": _meta(corpus, args), "results": results}, f, indent=2)
+    print(f"\n→ {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# app/calibration.py
+# Per-driver baseline — ระดับหัวปกติ, การกระจาย EAR ตอนพัก, MAR baseline
+#
+# ไฟล์ <CALIB_DIR>/<driver>.json (~0.6 KB): histogram EAR / MAR แบบ normalized (ต่อหมื่น) + ref_y ของหัว
+# session แรกเรียนรู้ใน CALIB_SEC วินาทีแรก, session ถัดไปโหลดแล้วใช้ได้ตั้งแต่เฟรมแรก
+# threshold ส่วนตัวถูก blend() ให้อยู่ใน ±CALIB_*_SHIFT รอบค่าที่ tune ไว้ใน config / profile
+# session_track() จำลองเส้นทางเดียวกันแบบ vectorized ให้ evaluate / sweep ใช้
+#
+#   python -m app.calibration            แสดง profile ทุกคน
+#   python -m app.calibration --reset ID ลบ profile ของคนนั้น
+import argparse, glob, json, os, re, datetime as dt
+import numpy as np
+
+from .config import (
+    DRIVER_ID, CALIB_DIR, CALIB_SEC, CALIB_MIN_SAMPLES, CALIB_DECAY,
+    CALIB_EAR_FRAC, CALIB_EAR_RANGE, CALIB_MAR_DELTA, CALIB_MAR_RANGE,
+    CALIB_EAR_SHIFT, CALIB_MAR_SHIFT,
+    EAR_CLOSED_THRESH, MAR_OPEN_THRESH,
+)
+
+PROFILE_VERSION = 1
+EAR_EDGES = np.linspace(0.0, 0.5, 101)    # ละเอียด 0.005
+MAR_EDGES = np.linspace(0.0, 1.5, 76)     # ละเอียด 0.02
+_SCALE = 10000                            # histogram เก็บเป็นจำนวนเต็มต่อหมื่น
+
+
+def _quantile(hist: np.ndarray, edges: np.ndarray, q: float) -> float:
+    total = hist.sum()
+    if total <= 0:
+        return float("nan")
+    cdf = np.cumsum(hist) / total
+    i = int(np.searchsorted(cdf, q))
+    return float((edges[i] + edges[i + 1]) / 2)
+
+
+def _normalized(hist: np.ndarray) -> np.ndarray:
+    s = hist.sum()
+    return hist / s if s > 0 else hist.astype(np.float64)
+
+
+def _ear_bin(ear):
+    return np.clip((np.asarray(ear) / EAR_EDGES[1]).astype(int), 0, len(EAR_EDGES) - 2)
+
+
+def _mar_bin(mar):
+    return np.clip((np.asarray(mar) / MAR_EDGES[1]).astype(int), 0, len(MAR_EDGES) - 2)
+
+
+def personal(ear_hist: np.ndarray, mar_hist: np.ndarray) -> tuple[float, float]:
+    """histogram ตอนพัก → (ear_closed, mar_open) ส่วนตัวก่อน blend"""
+    # median ทนต่อการกะพริบ/หาวที่ปนมาในช่วงเรียนรู้
+    ear_rest = _quantile(ear_hist, EAR_EDGES, 0.5)
+    mar_rest = _quantile(mar_hist, MAR_EDGES, 0.5)
+    return (float(np.clip(ear_rest * CALIB_EAR_FRAC, *CALIB_EAR_RANGE)),
+            float(np.clip(mar_rest + CALIB_MAR_DELTA, *CALIB_MAR_RANGE)))
+
+
+def blend(ear_personal, mar_personal, ear_base=EAR_CLOSED_THRESH, mar_base=MAR_OPEN_THRESH):
+    """threshold ส่วนตัว → ห่างค่าที่ tune ไว้ (base) ไม่เกิน ±CALIB_*_SHIFT (รับ numpy array ได้)"""
+    return (np.clip(ear_personal, np.subtract(ear_base, CALIB_EAR_SHIFT), np.add(ear_base, CALIB_EAR_SHIFT)),
+            np.clip(mar_personal, np.subtract(mar_base, CALIB_MAR_SHIFT), np.add(mar_base, CALIB_MAR_SHIFT)))
+
+
+def session_track(t: np.ndarray, ear: np.ndarray, mar: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    threshold ส่วนตัว (ก่อน blend) ที่ Detector ใช้ ณ แต่ละเฟรมที่เจอหน้า ของ session ที่ไม่มี profile
+    — ลำดับเดียวกับ observe(): อัปเดตหลังเฟรมที่ n ≥ CALIB_MIN_SAMPLES และ n % 30 == 0 ภายใน CALIB_SEC
+    คืน (ear, mar) ยาวเท่า t — NaN = ยังไม่พอ ใช้ค่าใน config
+    """
+    n = len(t)
+    ear_out = np.full(n, np.nan)
+    mar_out = np.full(n, np.nan)
+    if not n:
+        return ear_out, mar_out
+    m = int(np.searchsorted(t - t[0], CALIB_SEC, side="right"))    # เฟรมที่ถูกนับ
+    eb, mb = _ear_bin(ear[:m]), _mar_bin(mar[:m])
+    for k in range(CALIB_MIN_SAMPLES, m + 1):
+        if k % 30:
+            continue
+        e, mo = personal(np.bincount(eb[:k], minlength=len(EAR_EDGES) - 1),
+                         np.bincount(mb[:k], minlength=len(MAR_EDGES) - 1))
+        ear_out[k:], mar_out[k:] = e, mo     # มีผลตั้งแต่เฟรมถัดไป
+    return ear_out, mar_out
+
+
+class DriverCalibration:
+    """
+    baseline ต่อคนขับ (ใช้ใน Detector)
+      observe(now, ear, mar)  เก็บ histogram ช่วง CALIB_SEC แรกของ session
+      set_head_ref(y_norm)    ระดับจมูกตอนหน้าตรง (สัดส่วนความสูงเฟรม) หลัง Detector ล็อก reference
+      thresholds              (ear_closed, mar_open) ส่วนตัวหลัง blend() — ยังไม่พอ → ค่าใน config
+      save()                  รวมกับ profile เดิม (CALIB_DECAY) แล้วเขียนไฟล์
+    """
+
+    def __init__(self, driver_id: str = DRIVER_ID, root: str | None = CALIB_DIR):
+        """root=None → ไม่อ่าน/เขียนไฟล์ (evaluate: เรียนรู้ใหม่ทุกคลิป)"""
+        self.driver_id = driver_id
+        safe = re.sub(r"[^0-9A-Za-z_.-]+", "_", driver_id) or "default"
+        self.path = None if root is None else os.path.join(root, f"{safe}.json")
+
+        # profile ที่บันทึกไว้ (normalized)
+        self.ear_hist = np.zeros(len(EAR_EDGES) - 1)
+        self.mar_hist = np.zeros(len(MAR_EDGES) - 1)
+        self.ref_y_norm = None
+        self.sessions = 0
+        self.samples = 0            # จำนวนเฟรมสะสมทุก session
+        self.loaded = self.load()
+        self.reset()
+
+    # ------------------------------
+    # Session
+    # ------------------------------
+    def reset(self):
+        self._ear = np.zeros_like(self.ear_hist)
+        self._mar = np.zeros_like(self.mar_hist)
+        self._n = 0
+        self._t0 = None
+        self._elapsed = 0.0
+        self._ref = None
+        self._update_thresholds()
+
+    @property
+    def calibrated(self) -> bool:
+        """มี baseline ส่วนตัวแล้ว (จาก profile หรือ session นี้)"""
+        return self.loaded or self._n >= CALIB_MIN_SAMPLES
+
+    @property
+    def learning(self) -> bool:
+        return self._elapsed < CALIB_SEC
+
+    def observe(self, now: float, ear: float, mar: float):
+        if self._t0 is None:
+            self._t0 = now
+        self._elapsed = now - self._t0
+        if self._elapsed > CALIB_SEC:
+            return
+        self._ear[_ear_bin(ear)] += 1
+        self._mar[_mar_bin(mar)] += 1
+        self._n += 1
+        # threshold ใหม่เมื่อข้อมูลพอ แล้วทุก ~1 วินาที (ไม่คำนวณทุกเฟรม)
+        if self._n >= CALIB_MIN_SAMPLES and self._n % 30 == 0:
+            self._update_thresholds()
+
+    def set_head_ref(self, ref_y_norm: float):
+        self._ref = float(ref_y_norm)
+        if self.ref_y_norm is None:
+            self.ref_y_norm = self._ref
+
+    # ------------------------------
+    # Thresholds
+    # ------------------------------
+    def _merged(self):
+        """profile เดิม × CALIB_DECAY + session นี้ × (1 - CALIB_DECAY)"""
+        if self._n < CALIB_MIN_SAMPLES:
+            return self.ear_hist, self.mar_hist
+        if not self.loaded:
+            return _normalized(self._ear), _normalized(self._mar)
+        w = CALIB_DECAY
+        return (w * self.ear_hist + (1 - w) * _normalized(self._ear),
+                w * self.mar_hist + (1 - w) * _normalized(self._mar))
+
+    def _update_thresholds(self):
+        ear_hist, mar_hist = self._merged()
+        if ear_hist.sum() <= 0:
+            self.ear_thresh, self.mar_thresh = EAR_CLOSED_THRESH, MAR_OPEN_THRESH
+            return
+        ear_th, mar_th = blend(*personal(ear_hist, mar_hist))
+        self.ear_thresh, self.mar_thresh = float(ear_th), float(mar_th)
+
+    @property
+    def thresholds(self) -> tuple[float, float]:
+        return self.ear_thresh, self.mar_thresh
+
+    # ------------------------------
+    # Persistence
+    # ------------------------------
+    def load(self) -> bool:
+        if self.path is None or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                d = json.load(f)
+            if d.get("version") != PROFILE_VERSION:
+                return False
+            self.ear_hist = _normalized(np.asarray(d["ear_hist"], np.float64))
+            self.mar_hist = _normalized(np.asarray(d["mar_hist"], np.float64))
+            self.ref_y_norm = d.get("ref_y_norm")
+            self.sessions = int(d.get("sessions", 0))
+            self.samples = int(d.get("samples", 0))
+            return self.ear_hist.sum() > 0
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Calibration {self.path} ignored:", e)
+            return False
+
+    def save(self):
+        """บันทึกเมื่อ session นี้ได้ข้อมูลพอ (ไม่งั้นคง profile เดิมไว้)"""
+        if self._n < CALIB_MIN_SAMPLES and self._ref is None:
+            return
+        self._update_thresholds()
+        ear_hist, mar_hist = self._merged()
+        if self._ref is not None:
+            self.ref_y_norm = (self._ref if self.ref_y_norm is None or not self.loaded else
+                               CALIB_DECAY * self.ref_y_norm + (1 - CALIB_DECAY) * self._ref)
+        self.ear_hist, self.mar_hist = _normalized(ear_hist), _normalized(mar_hist)
+        self.sessions += 1
+        self.samples += self._n
+        self.loaded = self.ear_hist.sum() > 0
+        if self.path is None:
+            self.reset()
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        out = {
+            "version": PROFILE_VERSION,
+            "driver_id": self.driver_id,
+            "updated": dt.datetime.now().isoformat(timespec="seconds"),
+            "sessions": self.sessions,
+            "samples": self.samples,
+            "ref_y_norm": None if self.ref_y_norm is None else round(self.ref_y_norm, 4),
+            "ear_thresh": round(self.ear_thresh, 4),
+            "mar_thresh": round(self.mar_thresh, 4),
+            "ear_hist": np.rint(self.ear_hist * _SCALE).astype(int).tolist(),
+            "mar_hist": np.rint(self.mar_hist * _SCALE).astype(int).tolist(),
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(out, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        self.reset()
+
+    def summary(self) -> dict:
+        return {
+            "driver_id": self.driver_id,
+            "sessions": self.sessions,
+            "samples": self.samples,
+            "ref_y_norm": self.ref_y_norm,
+            "ear_p5":  _quantile(self.ear_hist, EAR_EDGES, 0.05),
+            "ear_p50": _quantile(self.ear_hist, EAR_EDGES, 0.50),
+            "mar_p50": _quantile(self.mar_hist, MAR_EDGES, 0.50),
+            "mar_p95": _quantile(self.mar_hist, MAR_EDGES, 0.95),
+            "ear_thresh": self.ear_thresh,
+            "mar_thresh": self.mar_thresh,
+        }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nap?Nope! driver calibration profiles")
+    ap.add_argument("--dir", default=CALIB_DIR)
+    ap.add_argument("--reset", metavar="DRIVER_ID", default=None)
+    args = ap.parse_args(argv)
+
+    if args.reset:
+        cal = DriverCalibration(args.reset, args.dir)
+        if os.path.exists(cal.path):
+            os.remove(cal.path)
+            print(f"removed {cal.path}")
+        return
+
+    for path in sorted(glob.glob(os.path.join(args.dir, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            driver = json.load(f).get("driver_id", os.path.splitext(os.path.basename(path))[0])
+        s = DriverCalibration(driver, args.dir).summary()
+        ref = "–" if s["ref_y_norm"] is None else f"{s['ref_y_norm']:.3f}"
+        print(f"{s['driver_id']:<20} sessions={s['sessions']:<3} ref_y={ref}"
+              f"  EAR p50={s['ear_p50']:.3f} → closed<{s['ear_thresh']:.3f}"
+              f"  MAR p50={s['mar_p50']:.3f} → yawn>{s['mar_thresh']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
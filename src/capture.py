@@ -0,0 +1,251 @@
+# app/capture.py
+# Capture backend — กล้อง / ไฟล์ / URL (rtsp, http) / image sequence ผ่าน interface เดียว
+#
+#   cap = Capture(0)                       กล้อง index 0 (ต่อรอง MJPG → YUYV ที่ FRAME_W x FRAME_H)
+#   cap = Capture("rtsp://cam/stream")     หลุดแล้วต่อใหม่เองแบบ backoff
+#   cap = Capture("Data/VDO_nap/a.mp4")    เล่นตามเวลาจริง (CAPTURE_REALTIME_FILES)
+#   cap = Capture("frames/*.jpg")          image sequence (โฟลเดอร์หรือ glob)
+#
+#   ok, frame = cap.read()   # ไม่เคย spin: อ่านพลาด → รอสั้น ๆ / reconnect แบบ backoff ก่อนคืน (False, None)
+#   cap.ended                # ไฟล์/sequence จบแล้ว (ไม่ loop)
+#   cap.interrupt()          # เรียกจาก thread อื่นเพื่อปลุกจาก backoff ตอน stop
+import glob, os, sys, threading, time
+import cv2
+
+from .config import (
+    FRAME_W, FRAME_H,
+    CAPTURE_FOURCC, CAPTURE_BUFFERSIZE, CAPTURE_FPS,
+    CAPTURE_FAIL_READS, CAPTURE_FAIL_WAIT, CAPTURE_BACKOFF_MIN, CAPTURE_BACKOFF_MAX,
+    CAPTURE_REALTIME_FILES, CAPTURE_LOOP_FILES, CAPTURE_SEQ_FPS,
+)
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+STREAM_PREFIXES = ("rtsp://", "rtsps://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+
+def _fourcc_str(code: float) -> str:
+    code = int(code)
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00")
+
+
+def source_kind(spec) -> str:
+    """camera | stream | sequence | file"""
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return "camera"
+    if spec.lower().startswith(STREAM_PREFIXES):
+        return "stream"
+    if os.path.isdir(spec) or any(c in spec for c in "*?["):
+        return "sequence"
+    return "file"
+
+
+# ==============================
+# Backends (เปิด / อ่าน / ปิด 1 ครั้ง — ไม่มี retry)
+# ==============================
+
+class _VideoBackend:
+    """cv2.VideoCapture: กล้อง / stream / ไฟล์"""
+
+    def __init__(self, spec, kind: str, width: int, height: int, fourccs, buffersize: int):
+        self.kind = kind
+        self.negotiated = {}
+        if kind == "camera":
+            index = int(spec)
+            api = cv2.CAP_DSHOW if sys.platform == "win32" else (
+                cv2.CAP_V4L2 if sys.platform.startswith("linux") else cv2.CAP_ANY)
+            self.cap = cv2.VideoCapture(index, api)
+            if not self.cap.isOpened() and api != cv2.CAP_ANY:
+                self.cap = cv2.VideoCapture(index)
+            if self.cap.isOpened():
+                self._negotiate(width, height, fourccs, buffersize)
+        else:
+            self.cap = cv2.VideoCapture(spec)
+            if kind == "stream" and self.cap.isOpened():
+                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffersize)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0.0
+
+    def _negotiate(self, width, height, fourccs, buffersize):
+        """ลอง FOURCC ตามลำดับ (ตั้งก่อนขนาดภาพ — V4L2 เลือก mode ตาม format) เลือกอันที่ driver รับจริง"""
+        cap = self.cap
+        for fourcc in fourccs:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            if _fourcc_str(cap.get(cv2.CAP_PROP_FOURCC)) == fourcc:
+                break
+        cap.set(cv2.CAP_PROP_FPS, CAPTURE_FPS)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, buffersize)   # 1 เฟรม → latency ต่ำสุด
+        self.negotiated = {
+            "fourcc": _fourcc_str(cap.get(cv2.CAP_PROP_FOURCC)),
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": cap.get(cv2.CAP_PROP_FPS),
+            "buffersize": int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+        }
+
+    def opened(self) -> bool:
+        return self.cap.isOpened()
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class _SequenceBackend:
+    """โฟลเดอร์รูป หรือ glob pattern → เฟรมเรียงตามชื่อไฟล์"""
+    kind = "sequence"
+
+    def __init__(self, spec: str, fps: float = CAPTURE_SEQ_FPS):
+        if os.path.isdir(spec):
+            files = [os.path.join(spec, f) for f in os.listdir(spec)]
+        else:
+            files = glob.glob(spec)
+        self.files = sorted(f for f in files if f.lower().endswith(IMAGE_EXTS))
+        self.fps = fps
+        self.negotiated = {}
+        self._i = 0
+
+    def opened(self) -> bool:
+        return bool(self.files)
+
+    def read(self):
+        while self._i < len(self.files):
+            frame = cv2.imread(self.files[self._i])
+            self._i += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def release(self):
+        self._i = len(self.files)
+
+
+# ==============================
+# Capture (reconnect + pacing)
+# ==============================
+
+class Capture:
+    """
+    ห่อ backend ให้ทนทาน:
+      - อ่านพลาด → รอ CAPTURE_FAIL_WAIT (ไม่วนเปล่าจน CPU 100%) ครบ CAPTURE_FAIL_READS ครั้ง → ปิดแล้วเปิดใหม่
+        (กล้องหลุดชั่วคราวกลับมาภายใน ~0.1 วินาที + เวลาเปิดกล้อง)
+      - เปิดใหม่แล้วยังอ่านไม่ได้ → ระยะรอก่อน reconnect ครั้งถัดไป ×2 (CAPTURE_BACKOFF_MIN … MAX)
+        อ่านได้อีกครั้งเมื่อไหร่ → backoff กลับเป็นค่าต่ำสุด
+      - ไฟล์ / sequence: จบแล้ว ended=True (หรือ loop), realtime=True → ส่งเฟรมตาม fps ของไฟล์
+    """
+
+    def __init__(self, spec, width: int = FRAME_W, height: int = FRAME_H,
+                 fourcc=CAPTURE_FOURCC, buffersize: int = CAPTURE_BUFFERSIZE,
+                 realtime: bool = CAPTURE_REALTIME_FILES, loop: bool = CAPTURE_LOOP_FILES):
+        self.spec = spec
+        self.kind = source_kind(spec)
+        self.width, self.height = width, height
+        self.fourcc = tuple(fourcc)
+        self.buffersize = buffersize
+        self.realtime = realtime
+        self.loop = loop
+        self.live = self.kind in ("camera", "stream")
+
+        self.ended = False
+        self.reconnects = 0
+        self.reconnects_failed = 0     # reconnect ติดกันที่ยังไม่ได้ภาพ
+        self.failures = 0
+        self._backend = None
+        self._stop = threading.Event()
+        self._backoff = CAPTURE_BACKOFF_MIN
+        self._t0 = None
+        self._n = 0
+        self._open()
+
+    # ------------------------------
+    # Open / close
+    # ------------------------------
+    def _open(self) -> bool:
+        if self._backend is not None:
+            self._backend.release()
+        if self.kind == "sequence":
+            self._backend = _SequenceBackend(self.spec)
+        else:
+            self._backend = _VideoBackend(self.spec, self.kind, self.width, self.height,
+                                          self.fourcc, self.buffersize)
+        self._t0 = None
+        self._n = 0
+        ok = self._backend.opened()
+        if ok and self.negotiated:
+            print(f"Capture {self.spec}: {self.negotiated}")
+        return ok
+
+    @property
+    def negotiated(self) -> dict:
+        return self._backend.negotiated if self._backend is not None else {}
+
+    @property
+    def fps(self) -> float:
+        return self._backend.fps if self._backend is not None else 0.0
+
+    def isOpened(self) -> bool:
+        return self._backend is not None and self._backend.opened()
+
+    def interrupt(self):
+        """ปลุก read() ที่กำลังรอ backoff (ใช้ตอน stop)"""
+        self._stop.set()
+
+    def release(self):
+        self._stop.set()
+        if self._backend is not None:
+            self._backend.release()
+            self._backend = None
+
+    # ------------------------------
+    # Read
+    # ------------------------------
+    def _wait(self, sec: float):
+        self._stop.wait(sec)
+
+    def _fail(self):
+        """อ่านไม่ได้: พลาดไม่กี่ครั้งติดกัน → reconnect ทันที, reconnect ซ้ำ → เว้นระยะแบบ backoff"""
+        self.failures += 1
+        if self.failures < CAPTURE_FAIL_READS:
+            self._wait(CAPTURE_FAIL_WAIT)
+            return
+        self.failures = 0
+        if self.reconnects_failed:
+            # reconnect ครั้งก่อนยังไม่ได้ภาพ → รอก่อนลองใหม่
+            self._wait(self._backoff)
+            self._backoff = min(self._backoff * 2, CAPTURE_BACKOFF_MAX)
+        if self._stop.is_set():
+            return
+        self.reconnects += 1
+        self.reconnects_failed += 1
+        print(f"Capture {self.spec}: reconnecting (#{self.reconnects})")
+        if not self._open():
+            self.failures = CAPTURE_FAIL_READS - 1     # เปิดไม่ได้ → ไม่ต้องอ่านพลาดซ้ำอีกรอบ
+
+    def read(self):
+        if self.ended or self._stop.is_set() or self._backend is None:
+            return False, None
+        ok, frame = self._backend.read()
+        if not ok:
+            if not self.live:
+                # ไฟล์ / sequence จบ
+                if self.loop and self._n > 0 and self._open():
+                    return self.read()
+                self.ended = True
+                return False, None
+            self._fail()
+            return False, None
+
+        self.failures = 0
+        self.reconnects_failed = 0
+        self._backoff = CAPTURE_BACKOFF_MIN
+        if self.realtime and not self.live:
+            fps = self._backend.fps
+            if fps and 1 < fps <= 240:
+                # ส่งเฟรมตามเวลาในไฟล์ ไม่เร็วกว่ากล้องจริง
+                if self._t0 is None:
+                    self._t0 = time.monotonic()
+                self._wait(self._t0 + self._n / fps - time.monotonic())
+        self._n += 1
+        return True, frame
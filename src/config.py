@@ -1,6 +1,7 @@
 # ============================================================
 # CONFIGURATION — Nap?Nope! Drowsiness Detection (Mediapipe)
 # ============================================================
+import json, os
 
 # ---------------- CAMERA ----------------
 CAM_INDEX = 0           # 0 = กล้องโน้ตบุ๊ก
@@ -8,6 +9,18 @@ FRAME_W  = 1280
 FRAME_H  = 720
 FLIP     = True         # กลับภาพแนวนอน (mirror)
 
+# capture backend (app/capture.py)
+CAPTURE_FOURCC      = ("MJPG", "YUYV")  # ลองตามลำดับ — MJPG ได้ 720p@30 บน USB2, YUYV มักได้แค่ ~10 fps
+CAPTURE_FPS         = 30
+CAPTURE_BUFFERSIZE  = 1       # เฟรมค้างใน driver น้อยสุด → latency ต่ำ
+CAPTURE_FAIL_READS  = 5       # อ่านพลาดติดกันกี่ครั้งถึงปิดแล้วเปิดใหม่
+CAPTURE_FAIL_WAIT   = 0.02    # วินาที รอระหว่างอ่านพลาด (ก่อนถึง CAPTURE_FAIL_READS)
+CAPTURE_BACKOFF_MIN = 0.5     # วินาที รอก่อน reconnect ครั้งถัดไป (×2 ทุกครั้งที่เปิดแล้วยังอ่านไม่ได้)
+CAPTURE_BACKOFF_MAX = 5.0
+CAPTURE_REALTIME_FILES = True # ไฟล์วิดีโอ/sequence ส่งเฟรมตามเวลาจริงเหมือนกล้อง
+CAPTURE_LOOP_FILES  = False   # เล่นไฟล์ซ้ำเมื่อจบ
+CAPTURE_SEQ_FPS     = 15      # fps ของ image sequence
+
 # ---------------- UI LAYOUT ----------------
 START_W, START_H   = 1400, 860   # ขนาดหน้าต่างเริ่มต้น
 MARGIN, HSPACE, VSPACE = 16, 16, 12
@@ -16,21 +29,128 @@ BOTTOM_H = 65
 LIVE_H = 700                     # ความสูงจอกล้องคงที่
 GAG_W, GAG_H = 300, 700          # ขนาด GAG ตายตัว
 GAG_IMAGE_PATH = "assets/gag.png"
+GAG_DIR        = "gag"           # รูป gag สุ่มแสดงตอน alert
+GAG_CACHE_MAX  = 32               # รูป gag ที่ decode + ย่อค้างไว้สูงสุด (~0.8 MB/รูป)
+ALERT_SOUND_PATH = "notification/sound_notification.mp3"
+
+DISPLAY_FPS     = 20     # อัตราอัปเดตภาพบนจอ (แยกจากอัตรา detection)
+DISPLAY_BUFFERS = 3      # จำนวน RGB buffer ที่หมุนใช้ระหว่าง render thread กับ GUI
 
 # ---------------- MODEL INPUT SIZES ----------------
 EYE_IMG_SIZE   = 224
 MOUTH_IMG_SIZE = 160
 HEAD_IMG_SIZE  = 224
 
+# ---------------- CLASSIFIER MODELS (EfficientNetV2, infer.py) ----------------
+USE_CLASSIFIER    = False          # เปิดเมื่อมีไฟล์โมเดลใน models/
+INFER_BACKEND     = "auto"         # "auto" | "keras" | "tflite"
+EYE_MODEL_PATH    = "models/eye_effnetv2.keras"
+MOUTH_MODEL_PATH  = "models/mouth_effnetv2.keras"
+EYE_TFLITE_PATH   = "models/eye_effnetv2_int8.tflite"
+MOUTH_TFLITE_PATH = "models/mouth_effnetv2_int8.tflite"
+INFER_THREADS     = 2              # thread ของ TFLite interpreter
+
+# ---------------- LANDMARK MODEL TIERS (FaceMesh, detector.py) ----------------
+# refine = โมเดล iris/attention (+10 จุด, ขยับ contour ตา/ปาก) — EAR / MAR / head ใช้แค่ ~20 จุด contour
+# detection / tracking = min_*_confidence (tracking ต่ำ → ใช้ tracking ต่อนานขึ้น รัน detector น้อยลง)
+# วัด fps + ความตรงของ EAR/MAR เทียบ "accurate": python -m app.bench --only tiers
+FACEMESH_TIERS = {
+    "accurate": {"refine": True,  "detection": 0.5, "tracking": 0.5},   # baseline (threshold ตั้งจากโหมดนี้)
+    "balanced": {"refine": False, "detection": 0.5, "tracking": 0.5},
+    "fast":     {"refine": False, "detection": 0.5, "tracking": 0.3},
+    "robust":   {"refine": False, "detection": 0.7, "tracking": 0.7},   # แสงน้อย / ลด false face
+}
+FACEMESH_TIER = os.environ.get("NAPNOPE_TIER", "accurate")
+
+# ---------------- ROI CROP (roi.py) ----------------
+ROI_SMOOTH_ALPHA = 0.5   # 0..1 (1 = กรอบนิ่งขึ้น แต่ตามช้าลง)
+ROI_EYE_SCALE    = 1.8   # ขยายกรอบตาจาก landmark
+ROI_MOUTH_SCALE  = 1.5
+
+# ---------------- FACE-ROI TRACKING (roi.FaceTracker) ----------------
+# ส่ง FaceMesh เฉพาะบริเวณหน้าจากเฟรมก่อน (ย่อเป็นขนาดคงที่) แทนทั้งเฟรม 1280x720
+TRACK_ENABLED      = True
+TRACK_INPUT_SIZE   = 256    # ขนาดภาพ (สี่เหลี่ยมจัตุรัส) ที่ส่งเข้า FaceMesh
+TRACK_EXPAND       = 1.8    # ขนาดกรอบ = ขนาดหน้า × เท่านี้
+TRACK_MIN_FACE_PX  = 60     # หน้าเล็กกว่านี้ (pixel ในเฟรมจริง) → กลับไปใช้ทั้งเฟรม
+TRACK_EDGE_MARGIN  = 0.04   # landmark ชิดขอบ crop เกินนี้ (สัดส่วน) → ถือว่าหลุด track
+
 # ---------------- THRESHOLDS (probabilities) ----------------
 EYE_OPEN_THRESH   = 0.20   # >= ถือว่า OPEN
 MOUTH_YAWN_THRESH = 0.45   # >= ถือว่า YAWN
 
+# ---------------- THRESHOLDS (landmark features, ใช้ใน detector.py) ----------------
+EAR_CLOSED_THRESH  = 0.22   # EAR <  ถือว่า CLOSED
+MAR_OPEN_THRESH    = 0.60   # MAR >  ถือว่า YAWN
+HEAD_RATIO_UP_TH   = +0.07  # head_ratio >= ถือว่า UP
+HEAD_RATIO_DOWN_TH = -0.07  # head_ratio <= ถือว่า DOWN
+EYE_CLOSED_ALERT_SEC = 3.0  # หลับตาต่อเนื่องกี่วินาทีถึงเริ่มพิจารณา alert
+
+# ---------------- DRIVER CALIBRATION (calibration.py) ----------------
+# baseline ต่อคนขับ → threshold EAR / MAR ส่วนตัว + reference หัวพร้อมใช้ตั้งแต่เฟรมแรก
+DRIVER_ID         = os.environ.get("NAPNOPE_DRIVER", "default")
+# ปิดเป็นค่าเริ่มต้น: threshold ที่ sweep.py tune ไว้ใน profile คือค่าที่ใช้จริง
+# เปิด (NAPNOPE_CALIB=1) แล้ว threshold ส่วนตัวถูกจำกัดไว้ไม่เกิน ±CALIB_*_SHIFT จากค่าที่ tune
+# evaluate.py / sweep.py ใช้ค่าเดียวกันนี้เป็น default → ผลที่รายงานตรงกับที่รันจริง
+CALIB_ENABLED     = os.environ.get("NAPNOPE_CALIB", "0") == "1"
+CALIB_DIR         = "profiles/drivers"
+CALIB_SEC         = 120.0         # เรียนรู้ baseline ช่วงแรกของแต่ละ session
+CALIB_MIN_SAMPLES = 150           # เฟรมที่เจอหน้าขั้นต่ำก่อนใช้ threshold ส่วนตัว
+CALIB_DECAY       = 0.7           # น้ำหนัก profile เดิมเมื่อรวมกับ session ใหม่
+CALIB_EAR_FRAC    = 0.75          # EAR closed = median EAR ตอนพัก × ค่านี้
+CALIB_EAR_RANGE   = (0.12, 0.30)
+CALIB_MAR_DELTA   = 0.45          # MAR yawn = median MAR ตอนพัก + ค่านี้
+CALIB_MAR_RANGE   = (0.45, 0.95)
+CALIB_EAR_SHIFT   = 0.04          # threshold ส่วนตัวห่าง EAR_CLOSED_THRESH ได้ไม่เกินนี้
+CALIB_MAR_SHIFT   = 0.15          # threshold ส่วนตัวห่าง MAR_OPEN_THRESH ได้ไม่เกินนี้
+
 # ---------------- LOGGING ----------------
 SNAP_DIR = "snapshots"
+SNAP_FORMAT          = "jpg"   # jpg | webp | png
+SNAP_QUALITY         = 92      # jpg / webp (1–100)
+SNAP_PNG_COMPRESSION = 1       # png 0–9 (สูง = ไฟล์เล็กแต่ช้า)
+SNAP_WORKERS         = 2       # encoder thread
+SNAP_MAX_PENDING     = 32      # ภาพที่รอ encode ได้ (เกินนี้ทิ้ง ไม่บล็อก)
+SNAP_BURST_FRAMES    = 8       # burst: ครึ่งหนึ่งก่อนกด + ครึ่งหนึ่งหลังกด
+SNAP_BURST_ON_ALERT  = False   # ถ่าย burst อัตโนมัติเมื่อเกิด alert
 LOG_DIR  = "logs"
 LOG_FILE = "events.csv"
 LOG_PATH = f"{LOG_DIR}/{LOG_FILE}"
+LOG_FLUSH_SEC  = 1.0                # เขียนลงดิสก์เป็นชุดทุกกี่วินาที
+LOG_BATCH_ROWS = 64                 # หรือเมื่อค้างครบกี่แถว
+LOG_MAX_BYTES  = 5 * 1024 * 1024    # rotate เมื่อไฟล์ใหญ่เกิน
+LOG_ROTATE_SEC = 24 * 3600          # rotate เมื่อเปิดไฟล์นานเกิน
+LOG_PARQUET    = False              # เขียน .parquet คู่กับไฟล์ที่ rotate (ต้องมี pyarrow)
+
+# ---------------- SESSION STORE (SQLite WAL, store.py) ----------------
+STORE_ENABLED          = True       # EventLogger เขียน event ลง STORE_PATH ด้วย
+STORE_PATH             = f"{LOG_DIR}/napnope.db"
+STORE_TELEMETRY_STRIDE = 10         # import telemetry .ntl ทุก N เฟรม (+ ทุกเฟรมที่ alert)
+
+# ---------------- TELEMETRY (ทุกเฟรม, telemetry.py) ----------------
+TELEMETRY_ENABLED        = False
+TELEMETRY_DIR            = "telemetry"
+TELEMETRY_SEGMENT_FRAMES = 30 * 3600   # ~1 ชม. ที่ 30 fps ต่อไฟล์ (~3 MB)
+
+# ---------------- METRICS (เวลาแต่ละ stage, metrics.py) ----------------
+METRICS_ENABLED    = os.environ.get("NAPNOPE_METRICS", "0") == "1"   # หรือ --metrics (เปิดทั้ง endpoint + dump)
+METRICS_PORT       = 9464          # http://127.0.0.1:9464/metrics (0 = ไม่เปิด)
+METRICS_DUMP_PATH  = "logs/metrics.prom"
+METRICS_DUMP_SEC   = 10.0          # เขียนไฟล์ทุกกี่วินาที (0 = ไม่เขียน)
+METRICS_HUD_STAGES = ("capture.read", "queue", "facemesh", "features", "draw",
+                      "infer.total", "display", "signal", "ui.frame", "ui.paint",
+                      "e2e.display", "e2e.alert")
+
+# ---------------- INCIDENT CLIPS (ก่อน/หลัง alert, incidents.py) ----------------
+INCIDENT_ENABLED      = True
+INCIDENT_DIR          = "incidents"
+INCIDENT_PRE_SEC      = 10.0    # เก็บย้อนหลังกี่วินาทีในหน่วยความจำ
+INCIDENT_POST_SEC     = 5.0     # บันทึกต่อหลัง alert อีกกี่วินาที
+INCIDENT_FPS          = 10      # เฟรมที่เก็บต่อวินาที (10 s × 10 fps × ~40 KB ≈ 4 MB)
+INCIDENT_MAX_SIDE     = 640
+INCIDENT_JPEG_QUALITY = 70
+INCIDENT_FOURCC       = "mp4v"
+INCIDENT_MAX_PENDING  = 4       # คลิปที่รอ encode ได้พร้อมกัน (เกินนี้ทิ้ง)
 
 # ---------------- DROWSINESS RULES ----------------
 CLOSED_EYE_MIN_FRAMES = 15
@@ -38,11 +158,64 @@ YAWN_BURST_FRAMES     = 8
 YAWN_MIN_FRAMES       = YAWN_BURST_FRAMES
 HEAD_DOWN_MIN_FRAMES  = 12
 ALERT_COOLDOWN_FRAMES = 30
-ALERT_COOLDOWN_SEC    = 2.0
+ALERT_COOLDOWN_SEC    = 5.0   # เว้นระยะระหว่าง alert (เท่ากับที่ pipeline ใช้เดิม)
 
 # ---------------- RUNTIME ----------------
 TARGET_FPS = 30
 
+# กฎแบบนับเฟรมด้านบนนิยามไว้ที่ TARGET_FPS → แปลงเป็นช่วงเวลา (วินาที)
+# เพื่อให้ยังถูกต้องเมื่อ scheduler ลดอัตรา inference หรือกล้องได้ fps ไม่คงที่
+# (คำนวณใหม่หลังโหลด profile ด้วย — ดู _derive ท้ายไฟล์)
+CLOSED_EYE_MIN_SEC = CLOSED_EYE_MIN_FRAMES / TARGET_FPS
+YAWN_MIN_SEC       = YAWN_MIN_FRAMES / TARGET_FPS
+HEAD_DOWN_MIN_SEC  = HEAD_DOWN_MIN_FRAMES / TARGET_FPS
+
+# ---------------- TEMPORAL RULES (state_machine.py) ----------------
+# rule ที่เปิดใช้: drowsy, perclos, yawn_rate, eyes_closed, yawn, head_down
+ALERT_RULES = ("drowsy", "perclos", "yawn_rate")
+PERCLOS_WINDOW_SEC   = 60.0   # PERCLOS = สัดส่วนเวลาหลับตาใน window นี้
+PERCLOS_ALERT        = 0.30
+PERCLOS_MIN_COVERAGE = 0.5    # ต้องมีข้อมูลอย่างน้อยครึ่ง window ก่อนใช้ตัดสิน
+YAWN_RATE_WINDOW_SEC = 60.0
+YAWN_RATE_ALERT      = 3      # หาวกี่ครั้งใน window → Repeated Yawning
+RULES_MAX_FPS        = 60     # ขนาด ring buffer = window × ค่านี้
+RULES_MAX_GAP_SEC    = 0.5    # ช่วงว่างระหว่างเฟรมที่นานกว่านี้ (เช่นหาหน้าไม่เจอ) นับแค่เท่านี้
+
+# ---------------- DETECTION SCHEDULER ----------------
+SCHED_ENABLED    = True
+SCHED_STABLE_FPS = 15     # อัตรา FaceMesh ตอนหน้านิ่ง/ค่าห่างจาก threshold
+SCHED_MIN_FPS    = 8      # ต่ำสุดที่ยอมได้ แม้เกิน CPU budget
+SCHED_CPU_BUDGET = 0.5    # สัดส่วนเวลา CPU (1 core) ที่ยอมให้ FaceMesh ใช้ตอนหน้านิ่ง
+SCHED_COST_ALPHA = 0.2    # EMA ของเวลาต่อเฟรม
+SCHED_EAR_MARGIN = 0.04   # |EAR - EAR_CLOSED_THRESH| < margin → กลับ full rate
+SCHED_MAR_MARGIN = 0.15
+SCHED_HEAD_MARGIN = 0.03
+
+# ---------------- MULTI-CAMERA (multicam.py) ----------------
+MULTI_WORKERS    = 2      # worker thread ที่ใช้ร่วมกันทุกกล้อง
+MULTI_REPORT_SEC = 5.0    # พิมพ์ metrics ทุกกี่วินาที (CLI)
+
+# ---------------- OFFLINE EVALUATION ----------------
+DATA_DIR = "Data"
+EVAL_OUT_DIR = "eval_out"
+# โฟลเดอร์คลิป → label (1 = ควรมี alert, 0 = ไม่ควรมี)
+EVAL_CLIP_LABELS = {
+    "VDO_drowsy": 1,
+    "VDO_nap":    1,
+    "VDO_normal": 0,
+}
+EVAL_VIDEO_EXTS = (".mp4", ".webm", ".mov", ".avi", ".mkv")
+
+# ---------------- BENCHMARKS ----------------
+BENCH_OUT_DIR = "bench_out"
+BENCH_FACEMESH_WIDTHS = (320, 480, 640, 960)   # ความกว้างภาพที่ส่งเข้า FaceMesh
+BENCH_TIER_FRAMES = 90                         # เฟรมต่อเนื่องต่อคลิปที่ใช้เทียบ FaceMesh tier
+
+# ---------------- FRAME CACHE ----------------
+CACHE_DIR = "frame_cache"
+CACHE_MAX_SIDE = 640    # ย่อให้ด้านยาวสุดไม่เกินนี้
+CACHE_FPS = 15          # resample ลงเหลือไม่เกินนี้
+
 
 # ============================================================
 # MEDIAPIPE HEAD DETECTION PARAMETERS
@@ -93,4 +266,61 @@ HEAD_UP_DOT   = 0.35   # ≤ 0.35 ถือว่าเงย
 # ============================================================
 # (optional) Debug / Visualization
 # ============================================================
-SHOW_LANDMARKS = True  # แสดงจุด landmark บนจอ (True/False)
\ No newline at end of file
+SHOW_LANDMARKS = True  # แสดงจุด landmark บนจอ (True/False)
+
+
+# ============================================================
+# PROFILE OVERRIDES
+# ============================================================
+# JSON {"ชื่อค่า": value} ทับค่าด้านบน (เช่นผลจาก `python -m app.sweep --activate`)
+# เลือกไฟล์อื่นได้ด้วย env NAPNOPE_CONFIG_PROFILE, ตั้งเป็น "" เพื่อปิด
+CONFIG_PROFILE = os.environ.get("NAPNOPE_CONFIG_PROFILE", "profiles/active.json")
+
+
+def _apply_profile(path: str):
+    if not path or not os.path.exists(path):
+        return
+    try:
+        with open(path, encoding="utf-8") as f:
+            overrides = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Config profile {path} ignored:", e)
+        return
+    g = globals()
+    applied = set()
+    for name, value in overrides.items():
+        if name.startswith("_"):
+            continue          # metadata เช่น _meta
+        if not name.isupper() or name not in g:
+            print(f"Config profile {path}: unknown key {name}")
+            continue
+        g[name] = tuple(value) if isinstance(g[name], tuple) else value
+        applied.add(name)
+    return applied
+
+
+# ค่าที่คำนวณจากค่าอื่น: ชื่อ → (ค่าที่ใช้คำนวณ, สูตร)
+_DERIVED = {
+    "YAWN_MIN_FRAMES":    (("YAWN_BURST_FRAMES",), lambda g: g["YAWN_BURST_FRAMES"]),
+    "CLOSED_EYE_MIN_SEC": (("CLOSED_EYE_MIN_FRAMES", "TARGET_FPS"),
+                           lambda g: g["CLOSED_EYE_MIN_FRAMES"] / g["TARGET_FPS"]),
+    "YAWN_MIN_SEC":       (("YAWN_MIN_FRAMES", "TARGET_FPS"),
+                           lambda g: g["YAWN_MIN_FRAMES"] / g["TARGET_FPS"]),
+    "HEAD_DOWN_MIN_SEC":  (("HEAD_DOWN_MIN_FRAMES", "TARGET_FPS"),
+                           lambda g: g["HEAD_DOWN_MIN_FRAMES"] / g["TARGET_FPS"]),
+}
+
+
+def _derive(applied: set):
+    """
+    profile ทับค่าต้นทาง (เช่น CLOSED_EYE_MIN_FRAMES / TARGET_FPS) → คำนวณค่าที่ได้จากมันใหม่
+    ยกเว้นค่าที่ profile ตั้งไว้เองตรง ๆ (เช่น YAWN_MIN_SEC จาก sweep)
+    """
+    g = globals()
+    for name, (inputs, fn) in _DERIVED.items():    # เรียงตามลำดับที่พึ่งกัน
+        if name not in applied and applied.intersection(inputs):
+            g[name] = fn(g)
+            applied.add(name)
+
+
+_derive(_apply_profile(CONFIG_PROFILE) or set())
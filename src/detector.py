@@ -0,0 +1,242 @@
+# app/detector.py
+import time
+import cv2
+import mediapipe as mp
+import numpy as np
+from . import features as F
+from .config import (
+    EAR_CLOSED_THRESH, MAR_OPEN_THRESH,
+    HEAD_RATIO_UP_TH, HEAD_RATIO_DOWN_TH,
+    HEAD_CALIB_FRAMES,
+    TRACK_ENABLED,
+    FACEMESH_TIERS, FACEMESH_TIER,
+)
+from .metrics import metrics
+from .roi import FaceTracker, RoiCropper
+from .state_machine import StateMachine
+
+
+def face_mesh_options(tier: str = FACEMESH_TIER, static: bool = False) -> dict:
+    """kwargs ของ mp FaceMesh ตาม tier ใน FACEMESH_TIERS"""
+    if tier not in FACEMESH_TIERS:
+        raise ValueError(f"unknown FaceMesh tier {tier!r}, choose from {sorted(FACEMESH_TIERS)}")
+    t = FACEMESH_TIERS[tier]
+    return {
+        "static_image_mode": static,
+        "max_num_faces": 1,
+        "refine_landmarks": t["refine"],
+        "min_detection_confidence": t["detection"],
+        "min_tracking_confidence": t["tracking"],
+    }
+
+
+# ==============================
+# Mediapipe-based Detector (ไม่ผูกกับ Qt / thread / กล้อง)
+# ==============================
+
+class Detector:
+    """
+    ตรวจ eye / mouth / head จากเฟรมทีละเฟรม
+    ใช้ร่วมกันได้ทั้ง Pipeline (กล้องสด) และงาน offline (เล่นไฟล์วิดีโอ)
+    """
+
+    def __init__(self, classifier=None, track=TRACK_ENABLED, calibration=None, tier=FACEMESH_TIER):
+        # EfficientNetV2 eye/mouth classifier (infer.ClassifierEngine) — ไม่บังคับ
+        self.classifier = classifier
+        self.roi = RoiCropper() if classifier is not None else None
+        # Face-ROI tracking: ส่ง FaceMesh แค่บริเวณหน้า (roi.FaceTracker)
+        self.tracker = FaceTracker() if track else None
+        # baseline ต่อคนขับ (calibration.DriverCalibration) — ไม่บังคับ
+        self.calibration = calibration
+
+        # Mediapipe setup (tier: refine iris / confidence preset — ดู FACEMESH_TIERS)
+        self.tier = tier
+        self.mp_face = mp.solutions.face_mesh
+        self.face_mesh = self.mp_face.FaceMesh(**face_mesh_options(tier))
+
+        # ----- HEAD reference (static horizontal line at nose level) -----
+        # เริ่มจาก ref ของคนขับที่บันทึกไว้ (ถ้ามี) แล้ว EMA ต่อจนครบ HEAD_CALIB_FRAMES จึงล็อก
+        self.ref_lock_after = HEAD_CALIB_FRAMES
+        self.ref_alpha = 0.10
+
+        # ----- ALERT SYSTEM (time-windowed rules + PERCLOS / yawn rate) -----
+        self.rules = StateMachine()
+
+        self.pts = None          # landmark buffer (n, 2) ใช้ซ้ำทุกเฟรม
+        self.reset()
+
+    def reset(self):
+        """ล้างสถานะต่อ session (head reference + rules / สถิติ alert)"""
+        self.ref_y = None
+        self.ref_frames = 0
+        self.ref_locked = False
+        self.rules.reset()
+        if self.calibration is not None:
+            self.calibration.reset()
+        self._overlay = None
+        if self.roi is not None:
+            self.roi.reset()
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    def close(self):
+        self.face_mesh.close()
+
+    # ------------------------------
+    # Rotation Helper
+    # ------------------------------
+    @staticmethod
+    def _rot(p, c, ang):
+        x, y = p
+        cx, cy = c
+        ca, sa = np.cos(ang), np.sin(ang)
+        xr = ca*(x - cx) - sa*(y - cy) + cx
+        yr = sa*(x - cx) + ca*(y - cy) + cy
+        return (xr, yr)
+
+    # ------------------------------
+    # FaceMesh (full frame / face-ROI tracking)
+    # ------------------------------
+    def _mesh(self, image):
+        t0 = metrics.now()
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        metrics.since("cvt_color", t0)
+        t0 = metrics.now()
+        results = self.face_mesh.process(rgb)
+        metrics.since("facemesh", t0)
+        return results
+
+    def _detect(self, frame):
+        """
+        รัน FaceMesh บน crop หน้าเดิม (ถ้ามี track) ไม่เจอ → ลองทั้งเฟรมทันทีในเฟรมเดียวกัน
+        คืน (results, (ox, oy, sx, sy)) สำหรับแปลง landmark กลับเป็นพิกัดเฟรม
+        """
+        if self.tracker is not None and self.tracker.tracking:
+            image, xform = self.tracker.prepare(frame)
+            results = self._mesh(image)
+            if results.multi_face_landmarks:
+                return results, xform
+            self.tracker.update(None, 0, 0)
+
+        h, w = frame.shape[:2]
+        results = self._mesh(frame)
+        return results, (0.0, 0.0, float(w), float(h))
+
+    # ------------------------------
+    # Frame Processing
+    # ------------------------------
+    def process(self, frame, now=None, draw=True):
+        """
+        ประมวลผล 1 เฟรม (BGR) แล้วคืน info dict
+        now  : เวลาของเฟรม (วินาที) — None = ใช้เวลาจริง, งาน offline ส่งเวลาในคลิปมาแทน
+        draw : วาดเส้นอ้างอิง/ค่า debug ลงบน frame
+        """
+        h, w, _ = frame.shape
+        results, (ox, oy, sx, sy) = self._detect(frame)
+
+        now = time.time() if now is None else now
+        ear = mar = head_ratio = 0.0
+        if self.calibration is not None:
+            ear_th, mar_th = self.calibration.thresholds
+        else:
+            ear_th, mar_th = EAR_CLOSED_THRESH, MAR_OPEN_THRESH
+        eye_state = "unknown"
+        mouth_state = "unknown"
+        head_state = "unknown"
+        triggered = None
+        cnn = {}
+
+        if results.multi_face_landmarks:
+            face = results.multi_face_landmarks[0]
+            t0 = metrics.now()
+            self.pts = pts = F.landmarks_to_array(face.landmark, sx, sy, out=self.pts,
+                                                  offset=(ox, oy))
+            if self.tracker is not None:
+                self.tracker.update(pts, w, h)
+            feats = F.extract(pts)
+            metrics.since("features", t0)
+
+            # ---- EAR (Eyes) ----
+            ear = float(feats["ear"])
+            eye_state = "closed" if ear < ear_th else "open"
+
+            # ---- CNN (ก่อนวาด overlay ลงเฟรม) ----
+            if self.classifier is not None:
+                t0 = metrics.now()
+                cnn = self.classifier.classify(frame, pts, self.roi)
+                metrics.since("classifier", t0)
+
+            # ---- MAR (Mouth) ----
+            mar = float(feats["mar"])
+            mouth_state = "yawn" if mar > mar_th else "normal"
+            if self.calibration is not None:
+                self.calibration.observe(now, ear, mar)
+
+            # =========================================================
+            # HEAD (deroll + static horizontal reference at nose level)
+            # =========================================================
+            nose_y = float(feats["nose_y"])
+            if not self.ref_locked:
+                if self.ref_y is None:
+                    seed = self.calibration.ref_y_norm if self.calibration is not None else None
+                    self.ref_y = nose_y if seed is None else seed * h
+                else:
+                    self.ref_y = (1 - self.ref_alpha)*self.ref_y + self.ref_alpha*nose_y
+                self.ref_frames += 1
+                if self.ref_frames >= self.ref_lock_after:
+                    self.ref_locked = True
+                    if self.calibration is not None:
+                        self.calibration.set_head_ref(self.ref_y / h)
+
+            eye_dist = float(feats["eye_dist"])
+            head_ratio = float(F.head_ratio(self.ref_y, nose_y, eye_dist))
+
+            if head_ratio >= HEAD_RATIO_UP_TH:
+                head_state = "up"
+            elif head_ratio <= HEAD_RATIO_DOWN_TH:
+                head_state = "down"
+            else:
+                head_state = "normal"
+
+            # ---------- Alert Condition (temporal rules) ----------
+            triggered = self.rules.update(eye_state, mouth_state, head_state, now)
+
+            # ---------- Draw Debug ----------
+            self._overlay = (float(feats["cx"]), float(feats["cy"]), float(feats["roll"]),
+                             eye_dist, tuple(pts[F.NOSE_IDX]), head_ratio)
+            if draw:
+                t0 = metrics.now()
+                self.draw(frame)
+                metrics.since("draw", t0)
+        else:
+            self._overlay = None
+
+        return {
+            "eye_state": eye_state,
+            "mouth_state": mouth_state,
+            "head_state": head_state,
+            "ear": float(ear),
+            "mar": float(mar),
+            "head_ratio": float(head_ratio),
+            "triggered": triggered,
+            "tracking": self.tracker is not None and self.tracker.tracking,
+            "ear_thresh": ear_th,
+            "mar_thresh": mar_th,
+            "calibrated": self.calibration is not None and self.calibration.calibrated,
+            **self.rules.features(),
+            **cnn,
+        }
+
+    def draw(self, frame):
+        """วาดเส้นอ้างอิง/ค่า debug ของผลล่าสุด (ใช้กับเฟรมที่ scheduler ข้ามได้ด้วย)"""
+        if self._overlay is None or self.ref_y is None:
+            return
+        cx, cy, theta, eye_dist, nose, head_ratio = self._overlay
+        half = eye_dist / 2 + 15
+        left_ref_orig  = self._rot((cx - half, self.ref_y), (cx, cy), +theta)
+        right_ref_orig = self._rot((cx + half, self.ref_y), (cx, cy), +theta)
+        cv2.line(frame, (int(left_ref_orig[0]), int(left_ref_orig[1])),
+                 (int(right_ref_orig[0]), int(right_ref_orig[1])), (255, 200, 80), 2)
+        cv2.circle(frame, (int(nose[0]), int(nose[1])), 5, (80, 255, 120), -1)
+        cv2.putText(frame, f"HeadRatio: {head_ratio:+.2f}", (20, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.1, (255,255,255), 2, cv2.LINE_AA)
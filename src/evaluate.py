@@ -0,0 +1,219 @@
+# app/evaluate.py
+# Offline batch evaluation — เล่นคลิปใน Data/VDO_* ผ่าน Detector แบบ headless
+#
+#   python -m app.evaluate --workers 4 --out eval_out
+#
+# ผลลัพธ์:
+#   <out>/timelines/<folder>__<clip>.csv   ค่าต่อเฟรม + alert
+#   <out>/alerts.csv                       alert ทุกครั้งของทุกคลิป
+#   <out>/summary.json                     precision / recall ระดับคลิป เทียบกับ label โฟลเดอร์
+import argparse, csv, json, os, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .config import (
+    DATA_DIR, EVAL_OUT_DIR, EVAL_CLIP_LABELS, EVAL_VIDEO_EXTS, TARGET_FPS, CALIB_ENABLED,
+)
+
+TIMELINE_FIELDS = ["frame", "t", "eye_state", "mouth_state", "head_state",
+                   "ear", "mar", "head_ratio", "perclos", "yawn_per_min", "triggered"]
+
+
+# ------------------------------
+# Clip discovery
+# ------------------------------
+
+def find_clips(data_dir: str = DATA_DIR) -> list[tuple[str, str, int]]:
+    """คืนรายการ (path, folder, label) ของทุกคลิปในโฟลเดอร์ที่มี label"""
+    clips = []
+    for folder, label in EVAL_CLIP_LABELS.items():
+        d = os.path.join(data_dir, folder)
+        if not os.path.isdir(d):
+            continue
+        for fn in sorted(os.listdir(d)):
+            if fn.lower().endswith(EVAL_VIDEO_EXTS):
+                clips.append((os.path.join(d, fn), folder, label))
+    return clips
+
+
+# ------------------------------
+# Worker (1 Detector / 1 FaceMesh ต่อ process)
+# ------------------------------
+
+_detector = None
+
+def _init_worker(calib: bool = CALIB_ENABLED):
+    global _detector
+    import cv2
+    from .detector import Detector
+    cv2.setNumThreads(1)   # ให้ pool กระจายงานเอง ไม่แย่ง core กับ OpenCV
+    # calibration แบบไม่มีไฟล์: ทุกคลิปเริ่มเรียนรู้ใหม่เหมือนคนขับที่ยังไม่มี profile
+    calibration = None
+    if calib:
+        from .calibration import DriverCalibration
+        calibration = DriverCalibration("eval", root=None)
+    _detector = Detector(calibration=calibration)
+
+
+def _run_clip(path: str, max_frames: int | None = None) -> dict:
+    """เล่นคลิปเดียวจนจบ ใช้เวลาในคลิป (frame / fps) แทนเวลาจริง"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise OSError(f"cannot open {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or TARGET_FPS
+    if fps <= 1 or fps > 240:
+        fps = TARGET_FPS
+
+    _detector.reset()
+    timeline, alerts = [], []
+    t0 = time.perf_counter()
+    idx = 0
+    while max_frames is None or idx < max_frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        t = idx / fps
+        info = _detector.process(frame, now=t, draw=False)
+        timeline.append([idx, round(t, 3),
+                         info["eye_state"], info["mouth_state"], info["head_state"],
+                         round(info["ear"], 4), round(info["mar"], 4),
+                         round(info["head_ratio"], 4), round(info["perclos"], 4),
+                         round(info["yawn_per_min"], 2), info["triggered"] or ""])
+        if info["triggered"]:
+            alerts.append((round(t, 3), info["triggered"]))
+        idx += 1
+    cap.release()
+
+    return {
+        "path": path,
+        "frames": idx,
+        "fps": fps,
+        "duration": idx / fps,
+        "proc_sec": time.perf_counter() - t0,
+        "alerts": alerts,
+        "timeline": timeline,
+    }
+
+
+# ------------------------------
+# Metrics
+# ------------------------------
+
+def _prf(tp: int, fp: int, fn: int) -> dict:
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall    = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def summarize(results: list[dict]) -> dict:
+    """คลิปที่มี alert อย่างน้อย 1 ครั้ง = ทำนายว่าง่วง (คลิปที่ error ไม่นับใน precision / recall)"""
+    tp = fp = fn = tn = 0
+    per_folder = {}
+    errors = [r for r in results if r.get("error")]
+    for r in results:
+        if r.get("error"):
+            continue
+        pred = 1 if r["alerts"] else 0
+        label = r["label"]
+        tp += pred and label
+        fp += pred and not label
+        fn += (not pred) and label
+        tn += (not pred) and (not label)
+
+        f = per_folder.setdefault(r["folder"], {"clips": 0, "alerted": 0, "alerts": 0})
+        f["clips"] += 1
+        f["alerted"] += pred
+        f["alerts"] += len(r["alerts"])
+
+    return {
+        "clips": len(results) - len(errors),
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        **_prf(tp, fp, fn),
+        "per_folder": per_folder,
+        "errors": [{"path": r["path"], "error": r["error"]} for r in errors],
+        "video_sec": sum(r["duration"] for r in results),
+        "proc_sec": sum(r["proc_sec"] for r in results),
+    }
+
+
+def _write_outputs(results: list[dict], summary: dict, out_dir: str):
+    tl_dir = os.path.join(out_dir, "timelines")
+    os.makedirs(tl_dir, exist_ok=True)
+
+    for r in results:
+        if r.get("error"):
+            continue
+        name = f'{r["folder"]}__{os.path.basename(r["path"])}.csv'
+        with open(os.path.join(tl_dir, name), "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(TIMELINE_FIELDS)
+            w.writerows(r["timeline"])
+
+    with open(os.path.join(out_dir, "alerts.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["clip", "folder", "label", "t", "event"])
+        for r in results:
+            for t, event in r["alerts"]:
+                w.writerow([os.path.basename(r["path"]), r["folder"], r["label"], t, event])
+
+    with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+
+# ------------------------------
+# Entrypoint
+# ------------------------------
+
+def evaluate(data_dir: str = DATA_DIR, out_dir: str = EVAL_OUT_DIR,
+             workers: int | None = None, max_frames: int | None = None,
+             calib: bool = CALIB_ENABLED) -> dict:
+    clips = find_clips(data_dir)
+    if not clips:
+        raise FileNotFoundError(f"ไม่พบคลิปใน {data_dir}/({', '.join(EVAL_CLIP_LABELS)})")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(calib,)) as pool:
+        futs = {pool.submit(_run_clip, path, max_frames): (path, folder, label)
+                for path, folder, label in clips}
+        for fut in as_completed(futs):
+            path, folder, label = futs[fut]
+            try:
+                r = fut.result()
+            except Exception as e:
+                # คลิปเสีย / อ่านไม่ได้ / worker ตาย → บันทึกเป็น error แล้วทำคลิปอื่นต่อ
+                r = {"path": path, "frames": 0, "fps": 0.0, "duration": 0.0, "proc_sec": 0.0,
+                     "alerts": [], "timeline": [], "error": f"{type(e).__name__}: {e}"}
+            r.update(folder=folder, label=label)
+            results.append(r)
+            status = (f"ERROR {r['error']}" if r.get("error") else
+                      f"frames={r['frames']}  alerts={len(r['alerts'])}  {r['proc_sec']:.1f}s")
+            print(f"[{len(results):>3}/{len(clips)}] {folder}/{os.path.basename(path)}  {status}")
+
+    results.sort(key=lambda r: r["path"])
+    summary = summarize(results)
+    summary["calibration"] = calib
+    _write_outputs(results, summary, out_dir)
+    return summary
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nap?Nope! offline batch evaluation")
+    ap.add_argument("--data", default=DATA_DIR)
+    ap.add_argument("--out", default=EVAL_OUT_DIR)
+    ap.add_argument("--workers", type=int, default=None, help="จำนวน process (default = จำนวน CPU)")
+    ap.add_argument("--max-frames", type=int, default=None, help="จำกัดเฟรมต่อคลิป (ไว้ทดสอบเร็ว)")
+    ap.add_argument("--calib", action=argparse.BooleanOptionalAction, default=CALIB_ENABLED,
+                    help="ใช้ driver calibration แบบเดียวกับ pipeline (default = CALIB_ENABLED)")
+    args = ap.parse_args(argv)
+
+    s = evaluate(args.data, args.out, args.workers, args.max_frames, args.calib)
+    print(f"\nclips={s['clips']}  TP={s['tp']} FP={s['fp']} FN={s['fn']} TN={s['tn']}"
+          + (f"  errors={len(s['errors'])}" if s["errors"] else ""))
+    print(f"precision={s['precision']:.3f}  recall={s['recall']:.3f}  f1={s['f1']:.3f}")
+    print(f"video={s['video_sec']:.0f}s  cpu={s['proc_sec']:.0f}s  → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
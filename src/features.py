@@ -0,0 +1,93 @@
+# app/features.py
+# Landmark → feature (EAR / MAR / roll / head) แบบ vectorized
+#
+# landmark เก็บเป็น ndarray float32 รูป (478, 2) หน่วย pixel
+# ทุกฟังก์ชันรับ (..., 478, 2) ได้ → ส่ง (N, 478, 2) เพื่อคำนวณทั้ง batch ในครั้งเดียว
+import numpy as np
+
+NUM_LANDMARKS = 478   # FaceMesh refine_landmarks=True (468 + iris 10)
+
+# ---- index (Mediapipe FaceMesh) ----
+# EAR: [outer, top1, top2, inner, bottom2, bottom1]
+LEFT_EYE_IDX  = np.array([33, 160, 158, 133, 153, 144])
+RIGHT_EYE_IDX = np.array([362, 385, 387, 263, 373, 380])
+MOUTH_TOP_IDX, MOUTH_BOTTOM_IDX  = 13, 14
+MOUTH_LEFT_IDX, MOUTH_RIGHT_IDX  = 78, 308
+EYE_L_OUTER_IDX, EYE_R_OUTER_IDX = 33, 263
+NOSE_IDX = 1
+
+_EPS = 1e-6
+
+
+def landmarks_to_array(landmarks, w: float, h: float, out: np.ndarray | None = None,
+                       offset: tuple = (0.0, 0.0)) -> np.ndarray:
+    """
+    แปลง face.landmark (protobuf) → ndarray (n, 2) float32 หน่วย pixel
+    ส่ง out มาเพื่อใช้ buffer เดิมซ้ำทุกเฟรม
+    offset = มุมซ้ายบนของภาพที่ส่งเข้า FaceMesh (กรณี crop) ในพิกัดเฟรมจริง
+    """
+    n = len(landmarks)
+    flat = np.fromiter((c for lm in landmarks for c in (lm.x, lm.y)),
+                       dtype=np.float32, count=2 * n)
+    if out is None or out.shape != (n, 2):
+        out = np.empty((n, 2), dtype=np.float32)
+    np.multiply(flat.reshape(n, 2), (w, h), out=out, casting="unsafe")
+    if offset[0] or offset[1]:
+        out += np.asarray(offset, dtype=np.float32)
+    return out
+
+
+def _dist(pts: np.ndarray, i, j) -> np.ndarray:
+    d = pts[..., i, :] - pts[..., j, :]
+    return np.sqrt((d * d).sum(axis=-1))
+
+
+def eye_aspect_ratio(pts: np.ndarray) -> np.ndarray:
+    """EAR เฉลี่ยสองตา — (..., n, 2) → (...)"""
+    idx = np.stack([LEFT_EYE_IDX, RIGHT_EYE_IDX])          # (2, 6)
+    a = _dist(pts, idx[:, 1], idx[:, 5])                   # (..., 2)
+    b = _dist(pts, idx[:, 2], idx[:, 4])
+    c = _dist(pts, idx[:, 0], idx[:, 3]) + _EPS
+    return ((a + b) / (2.0 * c)).mean(axis=-1)
+
+
+def mouth_aspect_ratio(pts: np.ndarray) -> np.ndarray:
+    """MAR = ช่องปากแนวตั้ง / ความกว้างปาก — (..., n, 2) → (...)"""
+    return _dist(pts, MOUTH_TOP_IDX, MOUTH_BOTTOM_IDX) / (
+        _dist(pts, MOUTH_LEFT_IDX, MOUTH_RIGHT_IDX) + _EPS)
+
+
+def head_geometry(pts: np.ndarray) -> dict:
+    """
+    De-roll รอบจุดกึ่งกลางหางตา
+      roll     : มุมเอียงหัว (rad)
+      cx, cy   : จุดกึ่งกลางหางตาซ้าย-ขวา
+      nose_y   : y ของปลายจมูกหลังหมุนให้ตาอยู่แนวนอน
+      eye_dist : ระยะหางตา (≥ 1 px)
+    """
+    L = pts[..., EYE_L_OUTER_IDX, :]
+    R = pts[..., EYE_R_OUTER_IDX, :]
+    nose = pts[..., NOSE_IDX, :]
+    c = (L + R) * 0.5
+    d = R - L
+    roll = np.arctan2(d[..., 1], d[..., 0])
+
+    # หมุน nose รอบ c ด้วยมุม -roll (เอาเฉพาะแกน y)
+    rel = nose - c
+    nose_y = -np.sin(roll) * rel[..., 0] + np.cos(roll) * rel[..., 1] + c[..., 1]
+    eye_dist = np.maximum(1.0, np.sqrt((d * d).sum(axis=-1)))
+    return {"roll": roll, "cx": c[..., 0], "cy": c[..., 1],
+            "nose_y": nose_y, "eye_dist": eye_dist}
+
+
+def head_ratio(ref_y, nose_y, eye_dist):
+    """(ref_y - nose_y) / eye_dist : > 0 = เงย, < 0 = ก้ม"""
+    return (ref_y - nose_y) / eye_dist
+
+
+def extract(pts: np.ndarray) -> dict:
+    """รวม EAR / MAR / head geometry — รับ (n, 2) หรือ (N, n, 2)"""
+    feats = head_geometry(pts)
+    feats["ear"] = eye_aspect_ratio(pts)
+    feats["mar"] = mouth_aspect_ratio(pts)
+    return feats
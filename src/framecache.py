@@ -0,0 +1,244 @@
+# app/framecache.py
+# Pre-decoded frame cache ของคลิปใน Data/VDO_* (ถอดรหัสครั้งเดียว ใช้ซ้ำได้ทุก sweep / replay)
+#
+#   python -m app.framecache ingest [--workers 4] [--force] [--landmarks-only]
+#   python -m app.framecache info
+#
+# โครงสร้างใน CACHE_DIR:
+#   index.json                   รายการคลิป + shape / fps / แหล่งที่มา (ใช้ตรวจว่าไฟล์ต้นทางเปลี่ยนไหม)
+#   <key>.frames                 uint8 raw (frames, h, w, 3) BGR — เปิดด้วย np.memmap
+#   <key>.landmarks.npy          float32 (frames, 478, 3) พิกัด normalized ของ FaceMesh, ไม่เจอหน้า = NaN
+#
+# ทุกคลิปถูกย่อให้ด้านยาวสุด = CACHE_MAX_SIDE และ resample เหลือ ≤ CACHE_FPS
+# (คลิปที่ fps ต่ำกว่านั้นเก็บที่ fps เดิม — ไม่สร้างเฟรมซ้ำ)
+import argparse, json, os, re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from .config import DATA_DIR, TARGET_FPS, CACHE_DIR, CACHE_MAX_SIDE, CACHE_FPS
+from .evaluate import find_clips
+from .features import NUM_LANDMARKS
+
+INDEX_VERSION = 1
+INDEX_NAME = "index.json"
+
+
+def clip_key(path: str, folder: str) -> str:
+    name = re.sub(r"[^0-9A-Za-z_.-]+", "_", os.path.basename(path))
+    return f"{folder}__{name}"
+
+
+def _source_stamp(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime": int(st.st_mtime)}
+
+
+# ==============================
+# Ingest (1 process ต่อคลิป)
+# ==============================
+
+def _ingest_clip(path: str, key: str, root: str, max_side: int, fps_out: float,
+                 store_frames: bool) -> dict:
+    import cv2
+    import mediapipe as mp
+    cv2.setNumThreads(1)
+
+    cap = cv2.VideoCapture(path)
+    src_fps = cap.get(cv2.CAP_PROP_FPS) or TARGET_FPS
+    if src_fps <= 1 or src_fps > 240:
+        src_fps = TARGET_FPS
+    fps = min(fps_out, src_fps)
+
+    frames_path = os.path.join(root, f"{key}.frames")
+    tmp_frames = frames_path + ".tmp"
+    lms = []
+    shape = None
+    n = 0
+    src_idx = 0
+    fm = mp.solutions.face_mesh.FaceMesh(static_image_mode=False, max_num_faces=1,
+                                         refine_landmarks=True,
+                                         min_detection_confidence=0.5,
+                                         min_tracking_confidence=0.5)
+    out = open(tmp_frames, "wb") if store_frames else None
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            # เก็บเฟรมเมื่อเวลาในคลิปข้ามช่องของ fps ปลายทาง
+            keep = int(src_idx * fps / src_fps) >= n
+            src_idx += 1
+            if not keep:
+                continue
+
+            if shape is None:
+                h, w = frame.shape[:2]
+                s = min(1.0, max_side / max(h, w))
+                shape = (max(1, int(round(h * s))), max(1, int(round(w * s))), 3)
+            if frame.shape != shape:
+                frame = cv2.resize(frame, (shape[1], shape[0]), interpolation=cv2.INTER_AREA)
+            if out is not None:
+                out.write(frame.tobytes())
+
+            res = fm.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if res.multi_face_landmarks:
+                lm = res.multi_face_landmarks[0].landmark
+                arr = np.fromiter((c for p in lm for c in (p.x, p.y, p.z)),
+                                  dtype=np.float32, count=3 * len(lm)).reshape(-1, 3)
+                if len(arr) < NUM_LANDMARKS:
+                    arr = np.vstack([arr, np.full((NUM_LANDMARKS - len(arr), 3), np.nan, np.float32)])
+            else:
+                arr = np.full((NUM_LANDMARKS, 3), np.nan, np.float32)
+            lms.append(arr)
+            n += 1
+    finally:
+        cap.release()
+        fm.close()
+        if out is not None:
+            out.close()
+
+    if out is not None:
+        os.replace(tmp_frames, frames_path)
+    landmarks = np.stack(lms) if lms else np.empty((0, NUM_LANDMARKS, 3), np.float32)
+    np.save(os.path.join(root, f"{key}.landmarks.npy"), landmarks)
+
+    return {
+        "key": key,
+        "frames": n,
+        "fps": fps,
+        "src_fps": src_fps,
+        "shape": list(shape) if shape else [0, 0, 3],
+        "has_frames": bool(store_frames and n),
+        "face_ratio": float(np.mean(~np.isnan(landmarks[:, 0, 0]))) if n else 0.0,
+    }
+
+
+# ==============================
+# Cache
+# ==============================
+
+class FrameCache:
+    """
+    อ่าน cache แบบ memory-mapped (ไม่โหลดทั้งก้อนเข้า RAM)
+      frames(key)       → (n, h, w, 3) uint8
+      landmarks(key)    → (n, 478, 3) float32 normalized
+      landmarks_px(key) → (n, 478, 2) float32 พิกัด pixel ของเฟรมใน cache (ตรงกับ features.extract)
+      times(key)        → (n,) วินาทีในคลิป
+    """
+
+    def __init__(self, root: str = CACHE_DIR):
+        self.root = root
+        self.index = {"version": INDEX_VERSION, "clips": {}}
+        path = os.path.join(root, INDEX_NAME)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == INDEX_VERSION:
+                self.index = index
+
+    # ---- read ----
+    @property
+    def clips(self) -> dict:
+        return self.index["clips"]
+
+    def keys(self) -> list[str]:
+        return sorted(self.clips)
+
+    def frames(self, key: str) -> np.ndarray:
+        c = self.clips[key]
+        if not c.get("has_frames"):
+            raise KeyError(f"{key}: cached with --landmarks-only")
+        return np.memmap(os.path.join(self.root, f"{key}.frames"), dtype=np.uint8, mode="r",
+                         shape=(c["frames"], *c["shape"]))
+
+    def landmarks(self, key: str) -> np.ndarray:
+        return np.load(os.path.join(self.root, f"{key}.landmarks.npy"), mmap_mode="r")
+
+    def landmarks_px(self, key: str) -> np.ndarray:
+        h, w = self.clips[key]["shape"][:2]
+        return self.landmarks(key)[..., :2] * np.array([w, h], np.float32)
+
+    def times(self, key: str) -> np.ndarray:
+        c = self.clips[key]
+        return np.arange(c["frames"], dtype=np.float64) / c["fps"]
+
+    # ---- write ----
+    def _save_index(self):
+        path = os.path.join(self.root, INDEX_NAME)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def _is_fresh(self, key: str, path: str, max_side: int, fps: float, store_frames: bool) -> bool:
+        c = self.clips.get(key)
+        return bool(c and c["source"] == _source_stamp(path)
+                    and c["max_side"] == max_side and c["target_fps"] == fps
+                    and (c["has_frames"] or not store_frames)
+                    and os.path.exists(os.path.join(self.root, f"{key}.landmarks.npy")))
+
+    def ingest(self, data_dir: str = DATA_DIR, workers: int | None = None, force: bool = False,
+               max_side: int = CACHE_MAX_SIDE, fps: float = CACHE_FPS,
+               store_frames: bool = True) -> list[str]:
+        """ถอดรหัสคลิปที่ยังไม่มี/เปลี่ยนไปแล้ว คืนรายการ key ที่ ingest รอบนี้"""
+        os.makedirs(self.root, exist_ok=True)
+        todo = []
+        for path, folder, label in find_clips(data_dir):
+            key = clip_key(path, folder)
+            if force or not self._is_fresh(key, path, max_side, fps, store_frames):
+                todo.append((path, folder, label, key))
+        if not todo:
+            return []
+
+        done = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futs = {pool.submit(_ingest_clip, path, key, self.root, max_side, fps, store_frames):
+                    (path, folder, label, key) for path, folder, label, key in todo}
+            for fut in as_completed(futs):
+                path, folder, label, key = futs[fut]
+                entry = fut.result()
+                entry.update(path=path, folder=folder, label=label,
+                             source=_source_stamp(path), max_side=max_side, target_fps=fps)
+                self.clips[key] = entry
+                self._save_index()   # บันทึกทุกคลิป → หยุดกลางคันแล้วรันต่อได้
+                done.append(key)
+                print(f"[{len(done):>3}/{len(todo)}] {key}  frames={entry['frames']}"
+                      f"  {entry['shape'][1]}x{entry['shape'][0]}@{entry['fps']:.0f}"
+                      f"  face={entry['face_ratio']:.0%}")
+        return done
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nap?Nope! pre-decoded frame cache")
+    ap.add_argument("--cache", default=CACHE_DIR)
+    # --cache ใส่ได้ทั้งก่อนและหลัง subcommand (SUPPRESS → ไม่ทับค่าที่ใส่ไว้ก่อน subcommand)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--cache", default=argparse.SUPPRESS)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ing = sub.add_parser("ingest", parents=[common],
+                         help="decode clips + FaceMesh landmarks into the cache")
+    ing.add_argument("--data", default=DATA_DIR)
+    ing.add_argument("--workers", type=int, default=None)
+    ing.add_argument("--force", action="store_true")
+    ing.add_argument("--max-side", type=int, default=CACHE_MAX_SIDE)
+    ing.add_argument("--fps", type=float, default=CACHE_FPS)
+    ing.add_argument("--landmarks-only", action="store_true", help="ไม่เก็บเฟรม (พอสำหรับ threshold sweep)")
+    sub.add_parser("info", parents=[common], help="list cached clips")
+    args = ap.parse_args(argv)
+
+    cache = FrameCache(args.cache)
+    if args.cmd == "ingest":
+        done = cache.ingest(args.data, args.workers, args.force, args.max_side, args.fps,
+                            store_frames=not args.landmarks_only)
+        print(f"ingested {len(done)} clip(s), cache has {len(cache.clips)}")
+    else:
+        total = 0
+        for key in cache.keys():
+            c = cache.clips[key]
+            total += c["frames"]
+            print(f"{key:<48} {c['frames']:>6} fr  {c['shape'][1]}x{c['shape'][0]}@{c['fps']:.0f}"
+                  f"  face={c['face_ratio']:.0%}  label={c['label']}")
+        print(f"{len(cache.clips)} clips, {total} frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# app/headless.py
+# Headless service mode — ตรวจจับ + เตือน + log โดยไม่ import Qt เลย (สำหรับเครื่องในรถที่ไม่มีจอ)
+#
+#   python -m app.main --headless [--cam 0] [--driver ID] [--no-sound] [--duration SEC] [--tier T] [--metrics]
+#   python -m app.headless ...
+import argparse, signal, threading, time
+
+from .config import (
+    CAM_INDEX, FLIP, MULTI_REPORT_SEC, DRIVER_ID, FACEMESH_TIER, FACEMESH_TIERS, METRICS_ENABLED,
+)
+from .logger import EventLogger
+from .metrics import metrics, enable as enable_metrics
+from .pipeline import Pipeline
+from .startup import profiler
+
+
+def run(cam_index=CAM_INDEX, flip=FLIP, sound=True, duration=None,
+        report_sec=MULTI_REPORT_SEC, driver_id=DRIVER_ID, tier=FACEMESH_TIER):
+    log = EventLogger(driver_id=driver_id)
+    with profiler.stage("Pipeline()"):
+        pipe = Pipeline(cam_index, flip, sound=sound, gag_folder=None, driver_id=driver_id,
+                        tier=tier)
+    pipe.add_alert_callback(lambda reason, gag_path, info: log.log(reason, info))
+
+    stats = {"frames": 0, "face": 0}
+    def on_result(frame, info):
+        if not stats["frames"]:
+            profiler.report()   # หลัง "first frame processed"
+        stats["frames"] += 1
+        stats["face"] += info["eye_state"] != "unknown"
+    pipe.add_result_callback(on_result)
+
+    done = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: done.set())
+
+    pipe.start()
+    print(f"headless: camera {cam_index} started (Ctrl+C to stop)")
+    t0 = last = time.monotonic()
+    last_frames = 0
+    try:
+        while not done.wait(report_sec):
+            now = time.monotonic()
+            n = stats["frames"]
+            print(f"fps={(n - last_frames) / (now - last):.1f}  frames={n}  face={stats['face']}")
+            for line in metrics.hud_lines():
+                print("   ", line)
+            last, last_frames = now, n
+            if duration is not None and now - t0 >= duration:
+                break
+    finally:
+        pipe.stop()
+        log.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nap?Nope! headless service")
+    ap.add_argument("--cam", default=CAM_INDEX,
+                    help="camera index, path วิดีโอ, URL (rtsp/http) หรือโฟลเดอร์/glob ของรูป")
+    ap.add_argument("--no-flip", action="store_true")
+    ap.add_argument("--no-sound", action="store_true")
+    ap.add_argument("--duration", type=float, default=None, help="หยุดเองหลังกี่วินาที")
+    ap.add_argument("--driver", default=DRIVER_ID, help="driver id ของ calibration profile")
+    ap.add_argument("--tier", default=FACEMESH_TIER, choices=sorted(FACEMESH_TIERS),
+                    help="FaceMesh tier (refine / confidence preset)")
+    ap.add_argument("--metrics", action="store_true", help="จับเวลาแต่ละ stage (+ /metrics endpoint)")
+    args, _ = ap.parse_known_args(argv)
+    if args.metrics or METRICS_ENABLED:     # NAPNOPE_METRICS=1 = --metrics
+        enable_metrics()
+
+    cam = int(args.cam) if str(args.cam).isdigit() else args.cam
+    run(cam, FLIP and not args.no_flip, not args.no_sound, args.duration, driver_id=args.driver,
+        tier=args.tier)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# app/incidents.py
+# Incident clip — วิดีโอช่วงก่อน/หลัง alert สำหรับย้อนดูเหตุการณ์
+#
+#   - push(frame, now)   เรียกจาก capture thread: เลือกเฟรม ≤ INCIDENT_FPS แล้วย่อ/คัดลอก (ไม่ encode)
+#                        JPEG encode ทำใน ingest thread แล้วเก็บใน ring
+#                        (ย้อนหลัง INCIDENT_PRE_SEC วินาที ไม่อัดวิดีโอตลอดเวลา)
+#   - trigger(reason)    เรียกตอน alert: เฟรมใน ring + อีก INCIDENT_POST_SEC วินาที → คลิป 1 ไฟล์
+#   - encoder thread เดียวถอด JPEG แล้วเขียน <INCIDENT_DIR>/<เวลา>_<reason>.mp4 + .json
+#
+# alert ที่เกิดซ้อนระหว่างคลิปยังไม่จบ → ต่อเวลาคลิปเดิม (ไม่สร้างไฟล์ซ้ำซ้อน)
+import collections, json, os, queue, re, threading, datetime as dt
+import cv2
+import numpy as np
+
+from .config import (
+    INCIDENT_DIR, INCIDENT_PRE_SEC, INCIDENT_POST_SEC, INCIDENT_FPS,
+    INCIDENT_MAX_SIDE, INCIDENT_JPEG_QUALITY, INCIDENT_FOURCC, INCIDENT_MAX_PENDING,
+)
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^0-9A-Za-z]+", "_", text).strip("_").lower()[:32] or "alert"
+
+
+class IncidentRecorder:
+    """ring ของ JPEG (หน่วยความจำคงที่) + encoder thread เดียว — push/trigger ไม่บล็อก"""
+
+    def __init__(self, out_dir: str = INCIDENT_DIR, pre_sec: float = INCIDENT_PRE_SEC,
+                 post_sec: float = INCIDENT_POST_SEC, fps: float = INCIDENT_FPS,
+                 max_side: int = INCIDENT_MAX_SIDE, quality: int = INCIDENT_JPEG_QUALITY,
+                 prefix: str = ""):
+        self.out_dir = out_dir
+        self.pre_sec = pre_sec
+        self.post_sec = post_sec
+        self.fps = fps
+        self.max_side = max_side
+        self.prefix = prefix
+        self._params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+        self._dt = 1.0 / fps
+        self._next_t = 0.0
+
+        self._ring = collections.deque()   # (t, jpeg bytes)
+        self._active = None                # คลิปที่กำลังเก็บเฟรมหลัง alert
+        self._lock = threading.Lock()
+        self._q = queue.Queue(INCIDENT_MAX_PENDING)
+        self._frames = queue.Queue(2)      # (t, เฟรมย่อแล้ว) รอ JPEG encode
+        self.written = []
+        self.dropped = 0
+        self.dropped_frames = 0
+        self._thread = threading.Thread(target=self._run, name="napnope-incidents", daemon=True)
+        self._thread.start()
+        self._ingest = threading.Thread(target=self._ingest_loop, name="napnope-incidents-jpeg",
+                                        daemon=True)
+        self._ingest.start()
+
+    # ------------------------------
+    # Capture side
+    # ------------------------------
+    def _shrink(self, frame):
+        """สำเนาขนาด ≤ max_side — ตัดขาดจากเฟรมเดิม (inference thread วาด overlay ทับได้ภายหลัง)"""
+        h, w = frame.shape[:2]
+        s = self.max_side / max(h, w)
+        if s < 1:
+            return cv2.resize(frame, (max(1, int(w * s)), max(1, int(h * s))),
+                              interpolation=cv2.INTER_AREA)
+        return frame.copy()
+
+    def push(self, frame, now: float):
+        """เฟรมจากกล้อง (BGR) — ข้ามเฟรมให้เหลือ ≤ fps แล้วส่งให้ ingest thread encode (ไม่บล็อก)"""
+        if now < self._next_t:
+            return
+        self._next_t += self._dt
+        if self._next_t < now:
+            self._next_t = now + self._dt
+        try:
+            self._frames.put_nowait((now, self._shrink(frame)))
+        except queue.Full:
+            self.dropped_frames += 1     # encoder ตามไม่ทัน → ข้ามเฟรมนี้ (ไม่หน่วง capture)
+
+    # ------------------------------
+    # Ingest thread (JPEG → ring)
+    # ------------------------------
+    def _ingest_loop(self):
+        while True:
+            item = self._frames.get()
+            if item is None:
+                return
+            now, frame = item
+            ok, buf = cv2.imencode(".jpg", frame, self._params)
+            if ok:
+                self._store(now, buf.tobytes())
+
+    def _store(self, now: float, jpg: bytes):
+        done = None
+        with self._lock:
+            self._ring.append((now, jpg))
+            while self._ring and self._ring[0][0] < now - self.pre_sec:
+                self._ring.popleft()
+            if self._active is not None:
+                self._active["frames"].append((now, jpg))
+                if now >= self._active["end"]:
+                    done, self._active = self._active, None
+        if done is not None:
+            self._submit(done)
+
+    # ------------------------------
+    # Alert side
+    # ------------------------------
+    def trigger(self, reason: str, now: float, info: dict | None = None) -> str:
+        """เริ่มคลิปใหม่ (หรือต่อเวลาคลิปที่ยังเก็บอยู่) คืน path ของไฟล์ที่จะเขียน"""
+        with self._lock:
+            if self._active is not None:
+                self._active["end"] = max(self._active["end"], now + self.post_sec)
+                self._active["alerts"].append({"reason": reason, "t": now})
+                return self._active["path"]
+            stamp = dt.datetime.fromtimestamp(now).strftime("%Y%m%d_%H%M%S")
+            path = os.path.join(self.out_dir, f"{self.prefix}{stamp}_{_slug(reason)}.mp4")
+            self._active = {
+                "path": path,
+                "t_alert": now,
+                "end": now + self.post_sec,
+                "alerts": [{"reason": reason, "t": now}],
+                "info": {k: v for k, v in (info or {}).items()
+                         if isinstance(v, (str, int, float, bool)) or v is None},
+                "frames": list(self._ring),
+            }
+            return path
+
+    def close(self, timeout: float = 5.0):
+        """เขียนคลิปที่ค้างอยู่ (เท่าที่มีเฟรม) แล้วหยุด encoder"""
+        self._frames.put(None)           # encode เฟรมที่ค้างในคิวให้หมดก่อน
+        self._ingest.join(timeout)
+        with self._lock:
+            done, self._active = self._active, None
+            self._ring.clear()
+        if done is not None:
+            self._submit(done, block=True)
+        self._q.put(None)
+        self._thread.join(timeout)
+
+    # ------------------------------
+    # Encoder thread
+    # ------------------------------
+    def _submit(self, job: dict, block: bool = False):
+        try:
+            self._q.put(job, block=block, timeout=2.0 if block else None)
+        except queue.Full:
+            self.dropped += 1
+            print(f"Incident clip dropped (encoder busy): {job['path']}")
+
+    def _run(self):
+        while True:
+            job = self._q.get()
+            if job is None:
+                return
+            try:
+                self._write(job)
+                self.written.append(job["path"])
+            except Exception as e:
+                print(f"Incident clip {job['path']} failed:", e)
+
+    def _write(self, job: dict):
+        frames = job["frames"]
+        if not frames:
+            return
+        os.makedirs(os.path.dirname(job["path"]) or ".", exist_ok=True)
+        root, ext = os.path.splitext(job["path"])
+        tmp = f"{root}.part{ext}"
+        writer = None
+        size = None
+        try:
+            for _, jpg in frames:
+                img = cv2.imdecode(np.frombuffer(jpg, np.uint8), cv2.IMREAD_COLOR)
+                if img is None:
+                    continue
+                if writer is None:
+                    size = (img.shape[1], img.shape[0])
+                    writer = cv2.VideoWriter(tmp, cv2.VideoWriter_fourcc(*INCIDENT_FOURCC),
+                                             self.fps, size)
+                if (img.shape[1], img.shape[0]) != size:
+                    img = cv2.resize(img, size)
+                writer.write(img)
+        finally:
+            if writer is not None:
+                writer.release()
+        if writer is None:
+            return
+        os.replace(tmp, job["path"])
+
+        t0 = frames[0][0]
+        meta = {
+            "clip": os.path.basename(job["path"]),
+            "time": dt.datetime.fromtimestamp(job["t_alert"]).isoformat(timespec="seconds"),
+            "alert_offset_sec": round(job["t_alert"] - t0, 2),
+            "duration_sec": round(frames[-1][0] - t0, 2),
+            "frames": len(frames),
+            "fps": self.fps,
+            "alerts": [{"reason": a["reason"], "offset_sec": round(a["t"] - t0, 2)}
+                       for a in job["alerts"]],
+            "info": job["info"],
+        }
+        with open(root + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,154 @@
+# app/infer.py
+# Batched EfficientNetV2 eye / mouth classifier
+#
+#   ตาซ้าย + ตาขวา + ปาก จากเฟรมเดียว → เรียกโมเดลรอบเดียว
+#     keras  : รวม eye/mouth model ไว้ใน tf.function เดียว (ตา batch=2, ปาก batch=1)
+#     tflite : interpreter ละโมเดล, ตา resize input เป็น batch 2, รองรับ int8 quantized
+#
+# class index ตามลำดับโฟลเดอร์ใน Data/ (Eye_close=0, Eye_open=1 / Not_yawn=0, Yawn=1)
+# → output ของโมเดล = P(open) และ P(yawn)
+import os
+import threading
+import numpy as np
+
+from .roi import RoiCropper
+from .config import (
+    EYE_IMG_SIZE, MOUTH_IMG_SIZE,
+    EYE_OPEN_THRESH, MOUTH_YAWN_THRESH,
+    USE_CLASSIFIER, INFER_BACKEND, INFER_THREADS,
+    EYE_MODEL_PATH, MOUTH_MODEL_PATH,
+    EYE_TFLITE_PATH, MOUTH_TFLITE_PATH,
+)
+
+
+# ==============================
+# Engine
+# ==============================
+
+class ClassifierEngine:
+    """
+    โหลดโมเดลครั้งเดียว + warm-up แล้วใช้ buffer input เดิมทุกเฟรม
+    classify(frame, pts) → dict สำหรับ merge เข้า info ของ Pipeline
+    """
+
+    def __init__(self, backend: str = INFER_BACKEND, warmup: bool = True):
+        if backend == "auto":
+            backend = "tflite" if os.path.exists(EYE_TFLITE_PATH) and os.path.exists(MOUTH_TFLITE_PATH) else "keras"
+        self.backend = backend
+
+        # input buffer (uint8 RGB) — crop เขียนลงตรงนี้
+        self.eye_batch   = np.zeros((2, EYE_IMG_SIZE, EYE_IMG_SIZE, 3), np.uint8)
+        self.mouth_batch = np.zeros((1, MOUTH_IMG_SIZE, MOUTH_IMG_SIZE, 3), np.uint8)
+        self.roi = RoiCropper()
+        self._lock = threading.Lock()   # buffer input ใช้ร่วมกัน → ทีละ caller
+
+        if backend == "keras":
+            self._load_keras(EYE_MODEL_PATH, MOUTH_MODEL_PATH)
+        elif backend == "tflite":
+            self._load_tflite(EYE_TFLITE_PATH, MOUTH_TFLITE_PATH)
+        else:
+            raise ValueError(f"unknown INFER_BACKEND: {backend}")
+
+        if warmup:
+            self.predict()
+
+    # ------------------------------
+    # Backends
+    # ------------------------------
+    def _load_keras(self, eye_path, mouth_path):
+        import tensorflow as tf
+        eye_model   = tf.keras.models.load_model(eye_path, compile=False)
+        mouth_model = tf.keras.models.load_model(mouth_path, compile=False)
+
+        @tf.function(reduce_retracing=True)
+        def run(eyes, mouth):
+            return eye_model(eyes, training=False), mouth_model(mouth, training=False)
+
+        def _predict(eyes, mouth):
+            # EfficientNetV2 (include_preprocessing) รับค่า 0..255
+            e, m = run(tf.cast(eyes, tf.float32), tf.cast(mouth, tf.float32))
+            return e.numpy(), m.numpy()
+        self._run = _predict
+
+    def _load_tflite(self, eye_path, mouth_path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        def make(path, batch):
+            it = Interpreter(model_path=path, num_threads=INFER_THREADS)
+            inp = it.get_input_details()[0]
+            if inp["shape"][0] != batch:
+                it.resize_tensor_input(inp["index"], [batch, *inp["shape"][1:]])
+            it.allocate_tensors()
+            return it, it.get_input_details()[0], it.get_output_details()[0]
+
+        eye = make(eye_path, 2)
+        mouth = make(mouth_path, 1)
+
+        def invoke(model, x):
+            it, inp, out = model
+            scale, zp = inp["quantization"]
+            if inp["dtype"] in (np.int8, np.uint8) and scale:
+                x = np.clip(np.round(x / scale + zp), np.iinfo(inp["dtype"]).min,
+                            np.iinfo(inp["dtype"]).max).astype(inp["dtype"])
+            else:
+                x = x.astype(inp["dtype"])
+            it.set_tensor(inp["index"], x)
+            it.invoke()
+            y = it.get_tensor(out["index"])
+            scale, zp = out["quantization"]
+            if out["dtype"] in (np.int8, np.uint8) and scale:
+                y = (y.astype(np.float32) - zp) * scale
+            return y
+
+        self._run = lambda eyes, mouth: (invoke(eye, eyes), invoke(mouth, mouth))
+
+    # ------------------------------
+    # Inference
+    # ------------------------------
+    @staticmethod
+    def _positive_prob(y: np.ndarray) -> np.ndarray:
+        """sigmoid (B, 1) หรือ softmax (B, 2) → P(class 1)"""
+        y = np.asarray(y, dtype=np.float32).reshape(len(y), -1)
+        return y[:, -1]
+
+    def predict(self) -> dict:
+        """รันโมเดลกับ buffer ปัจจุบัน (eye_batch / mouth_batch)"""
+        eye_out, mouth_out = self._run(self.eye_batch, self.mouth_batch)
+        p_eye = self._positive_prob(eye_out)
+        p_yawn = float(self._positive_prob(mouth_out)[0])
+        p_open = float(p_eye.mean())
+        return {
+            "eye_open_prob": p_open,
+            "yawn_prob": p_yawn,
+            "eye_state_cnn": "open" if p_open >= EYE_OPEN_THRESH else "closed",
+            "mouth_state_cnn": "yawn" if p_yawn >= MOUTH_YAWN_THRESH else "normal",
+        }
+
+    def classify(self, frame: np.ndarray, pts: np.ndarray, roi: RoiCropper | None = None) -> dict:
+        """
+        crop ตาซ้าย/ขวา/ปาก จาก landmark ลง buffer แล้วรันทีเดียว
+        roi = cropper ของแต่ละแหล่งภาพ (กรอบ smooth แยกกัน) — None = ใช้ของ engine
+        """
+        roi = roi or self.roi
+        h, w = frame.shape[:2]
+        roi.update(pts, w, h)
+        with self._lock:
+            roi.crop_into(frame, "eye_l", self.eye_batch[0])
+            roi.crop_into(frame, "eye_r", self.eye_batch[1])
+            roi.crop_into(frame, "mouth", self.mouth_batch[0])
+            return self.predict()
+
+
+def load_classifier():
+    """สร้าง engine ถ้าเปิด USE_CLASSIFIER (โหลดไม่ได้ → None = ใช้ landmark อย่างเดียว)"""
+    if not USE_CLASSIFIER:
+        return None
+    try:
+        return ClassifierEngine()
+    except Exception as e:
+        print("Classifier disabled:", e)
+        return None
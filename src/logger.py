@@ -1,21 +1,56 @@
-import os, csv, datetime as dt
-from .config import LOG_PATH, LOG_DIR
+import os, csv, time, queue, atexit, threading, datetime as dt
+from .config import (
+    LOG_PATH,
+    LOG_FLUSH_SEC, LOG_BATCH_ROWS,
+    LOG_MAX_BYTES, LOG_ROTATE_SEC,
+    LOG_PARQUET,
+    STORE_ENABLED, STORE_PATH, DRIVER_ID,
+)
+
+SCHEMA_VERSION = 2
+SCHEMA_LINE = f"# napnope-events schema={SCHEMA_VERSION}"
+FIELDS = ["timestamp", "event",
+          "eye_state", "mouth_state", "head_state",
+          "ear", "mar", "head_ratio"]
+
+_FLUSH = object()   # คำสั่งใน queue
+_CLOSE = object()
+
 
 class EventLogger:
     """
-    เขียนเหตุการณ์ลง logs/events.csv
-    รูปแบบ: timestamp,event,eye_state,mouth_state,head_state,ear,mar,head_ratio
+    เขียนเหตุการณ์ลง logs/events.csv ผ่าน background thread
+    รูปแบบ: บรรทัดแรก '# napnope-events schema=N' (อ่านด้วย pandas ใช้ comment="#")
+            ตามด้วย timestamp,event,eye_state,mouth_state,head_state,ear,mar,head_ratio
+    - log() แค่ใส่คิว ไม่แตะดิสก์ (เรียกจาก GUI thread ได้)
+    - เขียนเป็นชุดทุก LOG_FLUSH_SEC หรือครบ LOG_BATCH_ROWS แถว
+    - rotate เมื่อไฟล์ใหญ่เกิน LOG_MAX_BYTES หรือเปิดนานเกิน LOG_ROTATE_SEC
+      → events.<YYYYmmdd_HHMMSS>.csv (+ .parquet ถ้าเปิด LOG_PARQUET)
+    - store = path ของ SQLite (store.SessionStore) → ชุดเดียวกันเขียนลง events table ด้วย
+      (1 session ต่อ logger, None = CSV อย่างเดียว)
     """
-    def __init__(self, path: str = LOG_PATH):
+    def __init__(self, path: str = LOG_PATH, parquet: bool = LOG_PARQUET,
+                 store: str | None = STORE_PATH if STORE_ENABLED else None,
+                 driver_id: str = DRIVER_ID):
         self.path = path
-        os.makedirs(LOG_DIR, exist_ok=True)
-        if not os.path.exists(self.path):
-            with open(self.path, "w", newline="", encoding="utf-8") as f:
-                w = csv.writer(f)
-                w.writerow(["timestamp","event",
-                            "eye_state","mouth_state","head_state",
-                            "ear","mar","head_ratio"])
+        self.parquet = parquet and self._has_parquet()
+        self.store_path = store
+        self.driver_id = driver_id
+        self._store = None
+        self._session = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
 
+        self._q = queue.SimpleQueue()
+        self._flushed = threading.Event()
+        self._f = None
+        self._parquet_rows = []
+        self._thread = threading.Thread(target=self._run, name="napnope-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ------------------------------
+    # Public API
+    # ------------------------------
     def log(self, event: str, info: dict | None = None):
         ts = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         info = info or {}
@@ -28,5 +63,164 @@ class EventLogger:
             f'{info.get("mar",0):.3f}' if "mar" in info else "",
             f'{info.get("head_ratio",0):.2f}' if "head_ratio" in info else "",
         ]
-        with open(self.path, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow(row)
+        self._q.put(row)
+
+    def flush(self, timeout: float = 2.0):
+        """บังคับเขียนทุกแถวที่ค้างอยู่ แล้วรอจนเสร็จ"""
+        if not self._thread.is_alive():
+            return
+        self._flushed.clear()
+        self._q.put(_FLUSH)
+        self._flushed.wait(timeout)
+
+    def close(self, timeout: float = 2.0):
+        if not self._thread.is_alive():
+            return
+        self._q.put(_CLOSE)
+        self._thread.join(timeout)
+
+    # ------------------------------
+    # Writer thread
+    # ------------------------------
+    def _run(self):
+        self._open_store()
+        pending = []
+        last_flush = time.monotonic()
+        while True:
+            wait = max(0.0, LOG_FLUSH_SEC - (time.monotonic() - last_flush))
+            try:
+                item = self._q.get(timeout=wait if pending else None)
+            except queue.Empty:
+                item = None
+
+            if item is not None and item is not _FLUSH and item is not _CLOSE:
+                pending.append(item)
+                if len(pending) < LOG_BATCH_ROWS:
+                    continue
+
+            if pending:
+                self._write(pending)
+                pending = []
+            last_flush = time.monotonic()
+
+            if item is _FLUSH:
+                self._flushed.set()
+            elif item is _CLOSE:
+                self._close_file()
+                self._close_store()
+                return
+
+    def _write(self, rows: list):
+        try:
+            if self._f is None:
+                self._open()
+            csv.writer(self._f).writerows(rows)
+            self._f.flush()
+            if self.parquet:
+                self._parquet_rows.extend(rows)
+            if self._f.tell() >= LOG_MAX_BYTES or time.time() - self._opened_at >= LOG_ROTATE_SEC:
+                self._rotate()
+        except Exception as e:
+            # ทุก error จบที่นี่ → writer thread ไม่ตาย (log() / flush() ไม่ค้าง)
+            print("Logger error:", e)
+        if self._store is not None:
+            from .store import event_row
+            try:
+                self._store.add_events(self._session, filter(None, map(event_row, rows)))
+            except Exception as e:
+                print("Logger store error:", e)
+
+    # ------------------------------
+    # SQLite session store (optional)
+    # ------------------------------
+    def _open_store(self):
+        """สร้าง connection ใน writer thread (sqlite3 ผูก connection กับ thread)"""
+        if not self.store_path:
+            return
+        try:
+            from .store import SessionStore
+            self._store = SessionStore(self.store_path)
+            self._session = self._store.begin_session(self.driver_id, source="live")
+        except Exception as e:
+            print("Logger: session store disabled:", e)
+            self._store = None
+
+    def _close_store(self):
+        if self._store is not None:
+            try:
+                self._store.end_session(self._session)
+            finally:
+                self._store.close()
+                self._store = None
+
+    # ------------------------------
+    # File / rotation
+    # ------------------------------
+    def _open(self):
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8", errors="replace") as f:
+                first = f.readline().rstrip("\r\n")
+            if first != SCHEMA_LINE:
+                # ไฟล์เก่า schema อื่น → ย้ายออกไปก่อน ไม่ต่อท้ายปนกัน
+                os.replace(self.path, self._rotated_name("legacy"))
+
+        new = not os.path.exists(self.path)
+        self._f = open(self.path, "a", newline="", encoding="utf-8")
+        self._opened_at = time.time()
+        if new:
+            self._f.write(SCHEMA_LINE + "\n")
+            csv.writer(self._f).writerow(FIELDS)
+
+    def _rotated_name(self, tag: str = "", ext: str = ".csv") -> str:
+        root, _ = os.path.splitext(self.path)
+        stamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+        name = f"{root}.{tag + '-' if tag else ''}{stamp}"
+        n, out = 1, name + ext
+        while os.path.exists(out):
+            n += 1
+            out = f"{name}_{n}{ext}"
+        return out
+
+    def _rotate(self):
+        target = self._rotated_name()
+        self._f.close()
+        self._f = None
+        os.replace(self.path, target)
+        self._write_parquet(os.path.splitext(target)[0] + ".parquet")
+
+    def _close_file(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if self._parquet_rows:
+            self._write_parquet(self._rotated_name(ext=".parquet"))
+
+    # ------------------------------
+    # Parquet sink (optional)
+    # ------------------------------
+    @staticmethod
+    def _has_parquet() -> bool:
+        try:
+            import pandas, pyarrow  # noqa: F401
+            return True
+        except ImportError:
+            print("Logger: pandas/pyarrow not installed → parquet sink disabled")
+            return False
+
+    def _write_parquet(self, target: str):
+        if not self.parquet or not self._parquet_rows:
+            return
+        rows, self._parquet_rows = self._parquet_rows, []   # พลาดแล้วไม่สะสมต่อ (แถวยังอยู่ใน CSV)
+        try:
+            import pandas as pd
+            df = pd.DataFrame(rows, columns=FIELDS)
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+            for col in ("ear", "mar", "head_ratio"):
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+            for col in ("event", "eye_state", "mouth_state", "head_state"):
+                df[col] = df[col].astype("category")
+            df.attrs["schema_version"] = SCHEMA_VERSION
+            df.to_parquet(target, index=False, compression="zstd")
+        except Exception as e:
+            # ImportError / ValueError / ArrowInvalid ... → ข้ามไฟล์ parquet นี้ ไม่ให้ writer thread ตาย
+            print(f"Logger parquet {target} failed:", e)
@@ -1,10 +1,38 @@
 # main.py
-from PySide6 import QtWidgets
-from app.ui import NapNopeApp
+#   python -m app.main                    หน้าต่าง Qt (ต้องมี PySide6)
+#   python -m app.main --headless         service ไม่มีจอ (ไม่ import Qt)
+#   python -m app.main --profile-startup  พิมพ์เวลา import / init แต่ละส่วน
+#   python -m app.main --metrics          เวลาแต่ละ stage: HUD (กด H) + /metrics + logs/metrics.prom
 import sys
+from app.startup import profiler, enable as enable_profiler
 
 if __name__ == "__main__":
-    app = QtWidgets.QApplication(sys.argv)      
-    win = NapNopeApp()
+    args = sys.argv[1:]
+    if "--profile-startup" in args:
+        enable_profiler()
+        args = [a for a in args if a != "--profile-startup"]
+    from app.config import METRICS_ENABLED
+    if "--metrics" in args or METRICS_ENABLED:     # NAPNOPE_METRICS=1 = --metrics
+        from app.metrics import enable as enable_metrics
+        enable_metrics()
+        args = [a for a in args if a != "--metrics"]
+
+    if "--headless" in args:
+        with profiler.stage("import app.headless"):
+            from app.headless import main
+        main([a for a in args if a != "--headless"])
+        sys.exit(0)
+
+    with profiler.stage("import PySide6"):
+        from PySide6 import QtCore, QtWidgets
+    with profiler.stage("import app.ui"):
+        from app.ui import NapNopeApp
+
+    with profiler.stage("QApplication"):
+        app = QtWidgets.QApplication(sys.argv[:1] + args)
+    with profiler.stage("NapNopeApp()"):
+        win = NapNopeApp()
     win.show()
-    sys.exit(app.exec())    
\ No newline at end of file
+    QtCore.QTimer.singleShot(0, lambda: profiler.mark("window shown"))
+    win.pipe.ready.connect(lambda _err: profiler.report())
+    sys.exit(app.exec())
@@ -0,0 +1,229 @@
+# app/metrics.py
+# Hot-path instrumentation — เวลาแต่ละขั้น (capture → FaceMesh → features → draw → UI) + latency
+#
+#   python -m app.main --metrics                  HUD บนภาพสด (กด H) + http://127.0.0.1:METRICS_PORT/metrics
+#   NAPNOPE_METRICS=1 python -m app.main --headless   เหมือน --metrics
+#
+# ในโค้ด:
+#   t0 = metrics.now()                  perf_counter() — ปิดอยู่คืน 0.0
+#   metrics.since("facemesh", t0)       บันทึกเวลาตั้งแต่ t0 — ปิดอยู่ไม่ทำอะไร
+#   metrics.observe("e2e.alert", sec)
+#
+# ปิดอยู่ = ทุกฟังก์ชันเป็น no-op (แค่ function call, ไม่อ่านนาฬิกา ไม่แตะ dict)
+# Histogram แต่ละตัวมีผู้เขียน thread เดียว (stage อยู่ใน thread ของมัน) → ไม่ต้องใช้ lock
+# ผู้อ่าน (HUD / endpoint) อาจเห็นค่าที่ช้าไป 1 sample ซึ่งยอมรับได้
+# (multicam มีหลาย worker เขียน stage เดียวกัน → นับหายได้บ้าง แต่ไม่ทำให้ค่าเพี้ยน)
+import math, os, threading, time
+
+from .config import (
+    METRICS_ENABLED, METRICS_PORT, METRICS_DUMP_PATH, METRICS_DUMP_SEC,
+    METRICS_HUD_STAGES,
+)
+
+# bucket แบบ log: 0.01 ms … ~10 s, 8 ช่องต่อ 2 เท่า (ความละเอียด ~9%)
+_LO_MS = 0.01
+_PER_OCTAVE = 8
+_BUCKETS = 20 * _PER_OCTAVE
+_SCALE = _PER_OCTAVE / math.log(2)
+
+
+def _bucket_ms(i: int) -> float:
+    """ขอบบนของ bucket i (ms)"""
+    return _LO_MS * 2 ** ((i + 1) / _PER_OCTAVE)
+
+
+class Histogram:
+    """latency histogram ขนาดคงที่ (ms) — record() เป็น O(1) ไม่จองหน่วยความจำเพิ่ม"""
+
+    __slots__ = ("name", "counts", "count", "total", "max")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, sec: float):
+        ms = sec * 1e3
+        i = int(math.log(ms / _LO_MS) * _SCALE) if ms > _LO_MS else 0
+        self.counts[min(i, _BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q: float) -> float:
+        """ขอบบนของ bucket ที่ quantile ตก — ไม่เกินค่าสูงสุดที่วัดได้จริง"""
+        counts = list(self.counts)   # สำเนาก่อนอ่าน (writer อาจเขียนอยู่)
+        n = sum(counts)
+        if not n:
+            return 0.0
+        target = q * n
+        acc = 0
+        for i, c in enumerate(counts):
+            acc += c
+            if acc >= target:
+                return min(_bucket_ms(i), self.max)
+        return min(_bucket_ms(_BUCKETS - 1), self.max)
+
+    def summary(self) -> dict:
+        n = self.count
+        return {
+            "count": n,
+            "mean_ms": self.total / n if n else 0.0,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": self.max,
+        }
+
+
+def _noop_now() -> float:
+    return 0.0
+
+
+def _noop_since(name: str, t0: float):
+    pass
+
+
+def _noop_observe(name: str, sec: float):
+    pass
+
+
+class Metrics:
+    """registry ของ histogram ต่อ stage — enable() แล้ว now/since/observe จึงทำงานจริง"""
+
+    def __init__(self, enabled: bool = False):
+        self.hists = {}
+        self._lock = threading.Lock()       # ใช้ตอนสร้าง histogram ใหม่เท่านั้น
+        self._server = None
+        self._dumper = None
+        self.enabled = False
+        self.now, self.since, self.observe = _noop_now, _noop_since, _noop_observe
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        self.enabled = True
+        self.now, self.since, self.observe = time.perf_counter, self._since, self._observe
+
+    def disable(self):
+        self.enabled = False
+        self.now, self.since, self.observe = _noop_now, _noop_since, _noop_observe
+
+    # ------------------------------
+    # Record
+    # ------------------------------
+    def hist(self, name: str) -> Histogram:
+        h = self.hists.get(name)
+        if h is None:
+            with self._lock:
+                h = self.hists.setdefault(name, Histogram(name))
+        return h
+
+    def _observe(self, name: str, sec: float):
+        self.hist(name).record(sec)
+
+    def _since(self, name: str, t0: float):
+        self.hist(name).record(time.perf_counter() - t0)
+
+    def reset(self):
+        with self._lock:
+            self.hists = {}
+
+    # ------------------------------
+    # Read
+    # ------------------------------
+    def snapshot(self) -> dict:
+        return {name: h.summary() for name, h in sorted(self.hists.items())}
+
+    def hud_lines(self, stages=METRICS_HUD_STAGES) -> list[str]:
+        """บรรทัดสั้น ๆ สำหรับ overlay: ชื่อ p50 / p95 (ms)"""
+        lines = []
+        for name in stages:
+            h = self.hists.get(name)
+            if h is not None and h.count:
+                lines.append(f"{name:<14}{h.quantile(0.5):7.1f}{h.quantile(0.95):7.1f} ms")
+        return lines
+
+    def render_text(self) -> str:
+        """Prometheus text format (อ่านด้วย curl หรือ scrape ได้)"""
+        out = ["# TYPE napnope_stage_ms summary"]
+        for name, s in self.snapshot().items():
+            label = f'stage="{name}"'
+            for q in ("p50", "p95", "p99"):
+                out.append(f'napnope_stage_ms{{{label},quantile="0.{q[1:]}"}} {s[q + "_ms"]:.3f}')
+            out.append(f"napnope_stage_ms_sum{{{label}}} {s['mean_ms'] * s['count']:.3f}")
+            out.append(f"napnope_stage_ms_count{{{label}}} {s['count']}")
+            out.append(f"napnope_stage_ms_max{{{label}}} {s['max_ms']:.3f}")
+        return "\n".join(out) + "\n"
+
+    # ------------------------------
+    # Export
+    # ------------------------------
+    def dump(self, path: str = METRICS_DUMP_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.render_text())
+        os.replace(path + ".tmp", path)
+
+    def start_dump(self, path: str = METRICS_DUMP_PATH, every: float = METRICS_DUMP_SEC):
+        """เขียน path ทุก `every` วินาที (thread เดียว)"""
+        if self._dumper is not None or every <= 0:
+            return
+
+        def run():
+            while True:
+                time.sleep(every)
+                try:
+                    self.dump(path)
+                except OSError as e:
+                    print("Metrics dump failed:", e)
+
+        self._dumper = threading.Thread(target=run, name="napnope-metrics-dump", daemon=True)
+        self._dumper.start()
+
+    def serve(self, port: int = METRICS_PORT, host: str = "127.0.0.1"):
+        """GET /metrics บน localhost (daemon thread) คืน (host, port) ที่ bind จริง"""
+        if self._server is not None:
+            return self._server.server_address
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="napnope-metrics-http",
+                         daemon=True).start()
+        return self._server.server_address
+
+
+# METRICS_ENABLED (NAPNOPE_METRICS=1) → เก็บค่าตั้งแต่ import; main / headless เรียก enable() ต่อ
+# เพื่อเปิด endpoint + dump (import เฉย ๆ ไม่เปิด port)
+metrics = Metrics(enabled=METRICS_ENABLED)
+
+
+def enable(port: int | None = METRICS_PORT, dump_every: float = METRICS_DUMP_SEC):
+    """เปิดเก็บค่า + endpoint (port None = ไม่เปิด) + dump ไฟล์เป็นระยะ"""
+    metrics.enable()
+    if port:
+        try:
+            host, bound = metrics.serve(port)
+            print(f"metrics: http://{host}:{bound}/metrics")
+        except OSError as e:
+            print(f"metrics: port {port} unavailable ({e}) → file only")
+    metrics.start_dump(every=dump_every)
@@ -0,0 +1,268 @@
+# app/multicam.py
+# Multi-camera / multi-driver ใน process เดียว
+#
+#   python -m app.multicam 0 1 rtsp://cam3/stream
+#
+#   - capture thread ต่อกล้อง → FrameRing ของกล้องนั้น (latest-frame-wins)
+#   - worker pool (MULTI_WORKERS thread) ใช้ร่วมกันทุกกล้อง
+#     เลือกกล้องแบบ round-robin, กล้องละไม่เกิน 1 worker (Detector มี state)
+#   - สถานะ head reference / alert / scheduler แยกต่อกล้อง (Detector + DetectionScheduler)
+#   - calibration profile ต่อกล้อง ใช้ชื่อกล้องเป็น driver id
+#   - classifier (TensorFlow) โหลดครั้งเดียว ใช้ร่วมกัน
+import argparse, threading, time
+import cv2
+
+from .config import FLIP, SCHED_ENABLED, CALIB_ENABLED, MULTI_WORKERS, MULTI_REPORT_SEC
+from .calibration import DriverCalibration
+from .capture import Capture
+from .detector import Detector
+from .infer import load_classifier
+from .scheduler import DetectionScheduler
+from .utils import FrameRing
+
+
+def _open_capture(spec) -> Capture:
+    """'0' / 0 → กล้อง index, อย่างอื่น → path / URL / image sequence"""
+    if isinstance(spec, str) and spec.isdigit():
+        spec = int(spec)
+    return Capture(spec)
+
+
+class Source:
+    """สถานะต่อกล้อง/คนขับ 1 คน"""
+
+    def __init__(self, name: str, spec, classifier=None, flip: bool = FLIP):
+        self.name = name
+        self.spec = spec
+        self.flip = flip
+        calibration = DriverCalibration(name) if CALIB_ENABLED else None
+        self.detector = Detector(classifier=classifier, calibration=calibration)
+        self.scheduler = DetectionScheduler() if SCHED_ENABLED else None
+        self.ring = FrameRing(capacity=2)
+        self.cap = None
+        self.busy = False          # มี worker กำลังประมวลผลกล้องนี้อยู่
+        self.last_info = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.frames_in = 0
+        self.frames_done = 0
+        self.alerts = 0
+        self.latency = 0.0         # EMA capture → ผลลัพธ์ (วินาที)
+        self._t_stats = time.time()
+
+    def process(self, frame, now: float) -> dict:
+        if self.scheduler is not None:
+            return self.scheduler.step(self.detector, frame, now)
+        return self.detector.process(frame, now)
+
+
+class MultiSourceManager:
+    """
+    รันหลายกล้องพร้อมกัน
+    on_result(source_name, frame, info) / on_alert(source_name, reason, info)
+    ถูกเรียกจาก worker thread
+    """
+
+    def __init__(self, sources: dict, workers: int = MULTI_WORKERS,
+                 on_result=None, on_alert=None, classifier=None):
+        if classifier is None:
+            classifier = load_classifier()
+        self.sources = [Source(name, spec, classifier) for name, spec in sources.items()]
+        self.n_workers = max(1, workers)
+        self.on_result = on_result
+        self.on_alert = on_alert
+        self.running = False
+        self._threads = []
+        self._cond = threading.Condition()
+        self._rr = 0
+
+    # ------------------------------
+    # Start / Stop
+    # ------------------------------
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._threads = []
+        for src in self.sources:
+            src.detector.reset()
+            if src.scheduler is not None:
+                src.scheduler.reset()
+            src.ring = FrameRing(capacity=2)
+            src.reset_stats()
+            src.cap = _open_capture(src.spec)
+            self._threads.append(threading.Thread(
+                target=self._capture_loop, args=(src,), name=f"napnope-cap-{src.name}", daemon=True))
+        for i in range(self.n_workers):
+            self._threads.append(threading.Thread(
+                target=self._worker_loop, name=f"napnope-worker-{i}", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        for src in self.sources:
+            if src.cap:
+                src.cap.interrupt()
+            src.ring.close()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        busy = [t.name for t in self._threads if t.is_alive()]
+        self._threads = []
+        for src in self.sources:
+            # กล้องปิดใน capture thread ของมันเอง (_capture_loop) — ไม่ release ขณะ read() ค้างอยู่
+            if src.detector.calibration is not None:
+                if busy:
+                    # worker ยังอยู่ใน Detector.process → histogram อาจถูกแก้ระหว่างบันทึก
+                    print(f"[{src.name}] calibration not saved: {', '.join(busy)} still running")
+                else:
+                    src.detector.calibration.save()
+
+    # ------------------------------
+    # Loops
+    # ------------------------------
+    def _capture_loop(self, src: Source):
+        """thread นี้เป็นเจ้าของกล้อง: release ตอนออกจาก loop (เหมือน Pipeline._capture_loop)"""
+        cap = src.cap
+        frame_id = 0
+        try:
+            while self.running:
+                ok, frame = cap.read()   # อ่านพลาด → Capture รอ backoff / reconnect เอง
+                if not ok:
+                    if cap.ended:
+                        print(f"[{src.name}] source ended")
+                        break
+                    continue
+                if src.flip:
+                    frame = cv2.flip(frame, 1)
+                src.ring.put((frame_id, time.time(), frame))
+                src.frames_in += 1
+                frame_id += 1
+                with self._cond:
+                    self._cond.notify()
+        finally:
+            cap.release()
+            if src.cap is cap:
+                src.cap = None
+
+    def _next_source(self):
+        """round-robin: กล้องถัดไปที่มีเฟรมรอและยังไม่มี worker ถืออยู่ (เรียกใต้ _cond)"""
+        n = len(self.sources)
+        for k in range(n):
+            src = self.sources[(self._rr + k) % n]
+            if not src.busy and len(src.ring):
+                src.busy = True
+                self._rr = (self._rr + k + 1) % n
+                return src
+        return None
+
+    def _worker_loop(self):
+        while self.running:
+            with self._cond:
+                src = self._next_source()
+                while src is None and self.running:
+                    self._cond.wait(timeout=0.1)
+                    src = self._next_source()
+            if src is None:
+                break
+            try:
+                self._run_one(src)
+            finally:
+                with self._cond:
+                    src.busy = False
+                    self._cond.notify()
+
+    def _run_one(self, src: Source):
+        item = src.ring.get_latest(timeout=0)
+        if item is None:
+            return
+        frame_id, t_capture, frame = item
+        info = src.process(frame, t_capture)
+        info["frame_id"] = frame_id
+        info["t_capture"] = t_capture
+        info["source"] = src.name
+
+        src.frames_done += 1
+        src.latency = 0.9 * src.latency + 0.1 * (time.time() - t_capture)
+        src.last_info = info
+
+        if self.on_result:
+            self.on_result(src.name, frame, info)
+        if info["triggered"]:
+            src.alerts += 1
+            if self.on_alert:
+                self.on_alert(src.name, info["triggered"], info)
+
+    # ------------------------------
+    # Metrics
+    # ------------------------------
+    def metrics(self) -> dict:
+        """สถิติต่อกล้อง + รวม (fps คิดตั้งแต่ start)"""
+        now = time.time()
+        per = {}
+        for src in self.sources:
+            dt = max(1e-6, now - src._t_stats)
+            per[src.name] = {
+                "capture_fps": src.frames_in / dt,
+                "detect_fps": src.frames_done / dt,
+                "facemesh_fps": src.scheduler.rate if src.scheduler else src.frames_done / dt,
+                "dropped": src.ring.dropped,
+                "latency_ms": src.latency * 1000,
+                "alerts": src.alerts,
+                "face": bool(src.last_info and src.last_info["eye_state"] != "unknown"),
+            }
+        total = {
+            "sources": len(per),
+            "capture_fps": sum(m["capture_fps"] for m in per.values()),
+            "detect_fps": sum(m["detect_fps"] for m in per.values()),
+            "alerts": sum(m["alerts"] for m in per.values()),
+        }
+        return {"sources": per, "total": total}
+
+
+# ------------------------------
+# Entrypoint
+# ------------------------------
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nap?Nope! multi-camera monitor (headless)")
+    ap.add_argument("sources", nargs="+", help="camera index / video path / URL (name=spec ก็ได้)")
+    ap.add_argument("--workers", type=int, default=MULTI_WORKERS)
+    args = ap.parse_args(argv)
+
+    sources = {}
+    for i, s in enumerate(args.sources):
+        if "=" in s and "://" not in s:
+            name, spec = s.split("=", 1)
+        else:
+            name, spec = f"cam{i}", s
+        sources[name] = spec
+
+    def on_alert(name, reason, info):
+        print(f"⚠ [{name}] {reason}  EAR={info['ear']:.3f} MAR={info['mar']:.3f}")
+
+    mgr = MultiSourceManager(sources, workers=args.workers, on_alert=on_alert)
+    mgr.start()
+    try:
+        while True:
+            time.sleep(MULTI_REPORT_SEC)
+            m = mgr.metrics()
+            for name, s in m["sources"].items():
+                print(f"[{name}] cap={s['capture_fps']:.1f} det={s['detect_fps']:.1f} "
+                      f"mesh={s['facemesh_fps']:.1f} drop={s['dropped']} "
+                      f"lat={s['latency_ms']:.0f}ms alerts={s['alerts']}")
+            t = m["total"]
+            print(f"[total] sources={t['sources']} det={t['detect_fps']:.1f} alerts={t['alerts']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mgr.stop()
+
+
+if __name__ == "__main__":
+    main()
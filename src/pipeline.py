@@ -1,234 +1,433 @@
-import cv2, threading, time, random, os
-import mediapipe as mp
+import cv2, threading, queue, time, asyncio
 import numpy as np
-from PySide6.QtCore import QObject, Signal
-from playsound import playsound  # ใช้เล่นเสียง
-from .config import CAM_INDEX, FLIP
+
+from .alerts import AudioWorker, GagPicker
+from .capture import Capture
+from .config import (
+    CAM_INDEX, FLIP, SCHED_ENABLED, TELEMETRY_ENABLED, INCIDENT_ENABLED, SNAP_BURST_ON_ALERT,
+    DRIVER_ID, CALIB_ENABLED, FACEMESH_TIER,
+    GAG_DIR, ALERT_SOUND_PATH,
+    DISPLAY_FPS, DISPLAY_BUFFERS,
+)
+from .incidents import IncidentRecorder
+from .metrics import metrics
+from .scheduler import DetectionScheduler
+from .snapshots import SnapshotWriter
+from .startup import profiler
+from .telemetry import TelemetryRecorder
+from .utils import FrameRing
 
 
 # ==============================
-# Mediapipe-based Pipeline
+# Mediapipe-based Pipeline (pure Python, ไม่ต้องมี Qt)
 # ==============================
 
-def _distance(a, b):
-    ax, ay = a
-    bx, by = b
-    return float(np.hypot(ax - bx, ay - by))
-
-
-class Pipeline(QObject):
-    new_frame = Signal(object, dict)   # ส่งภาพและข้อมูล
-    drowsy_alert = Signal(str, str)    # (เหตุผล, path รูป GAG)
-
-    def __init__(self, cam_index=CAM_INDEX, flip=FLIP):
-        super().__init__()
+class Pipeline:
+    """
+    capture → inference → (render) แบบ thread ล้วน ไม่พึ่ง Qt
+    ส่งผลออกผ่าน callback:
+      add_result_callback(fn)  fn(frame_bgr, info)       ทุกเฟรมที่ประมวลผล (inference thread)
+      add_frame_callback(fn)   fn(rgb_display, info)     เฟรมย่อพอดีจอ ≤ DISPLAY_FPS (render thread)
+                               lease=True → fn ถือ buffer ไว้จนเรียก release_display(buf) (GUI วาดแบบ zero-copy)
+      add_alert_callback(fn)   fn(reason, gag_path, info) เมื่อเกิด alert (inference thread — ต้องไม่บล็อก)
+                               info["incident"] = path คลิปก่อน/หลัง alert (เขียนเสร็จภายหลัง)
+    หรือใช้ `async for frame, info in pipe.results(): ...`
+    render thread จะเริ่มเฉพาะเมื่อมี frame callback (headless ไม่เสียเวลาย่อภาพ)
+
+    lazy=True → ยังไม่ import mediapipe / สร้าง FaceMesh จนกว่าจะเรียก preload() หรือ start()
+    (UI เรียก preload(background=True) หลังหน้าต่างขึ้นแล้ว)
+    """
+
+    def __init__(self, cam_index=CAM_INDEX, flip=FLIP, sound=True,
+                 gag_folder=GAG_DIR, lazy=False, driver_id=DRIVER_ID, tier=FACEMESH_TIER):
         self.cam_index = cam_index
+        self.driver_id = driver_id
+        self.tier = tier
         self.flip = flip
         self.cap = None
         self.running = False
         self.last_frame = None
+        self._threads = []
+        self.telemetry = None
+        self.incidents = None
+
+        self._result_cbs = []
+        self._frame_cbs = []
+        self._alert_cbs = []
+        self._ready_cbs = []
+
+        # display buffers (render thread เขียน / GUI thread อ่าน)
+        self._display_size = None
+        self._disp_pool = [None] * DISPLAY_BUFFERS
+        self._disp_idx = 0
+        self._disp_scratch = None
+        self._disp_lease = False
+        self._disp_lent = [False] * DISPLAY_BUFFERS     # buffer ที่ consumer ยังถืออยู่
+        self._disp_lock = threading.Lock()
+        self.display_dropped = 0
+
+        # Mediapipe + head reference + alert timer อยู่ใน Detector (สร้างใน _build)
+        self.detector = None
+        self.load_error = None
+        self._ready = threading.Event()
+        self._loader = None
+        self._load_lock = threading.Lock()
+        self.scheduler = DetectionScheduler() if SCHED_ENABLED else None
+
+        # asset อ่านครั้งเดียว: รายการรูป gag + audio worker thread เดียว
+        self.audio = AudioWorker(ALERT_SOUND_PATH) if sound else None
+        self.gags = GagPicker(gag_folder) if gag_folder else None
+        # snapshot / burst encode ใน thread pool (ไม่บล็อกผู้เรียก)
+        self.snapshots = SnapshotWriter()
+
+        if not lazy:
+            self.preload()
 
-        # Mediapipe setup
-        self.mp_face = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face.FaceMesh(
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-
-        # ----- HEAD reference (static horizontal line at nose level) -----
-        self.ref_y = None
-        self.ref_frames = 0
-        self.ref_locked = False
-        self.ref_lock_after = 30
-        self.ref_alpha = 0.10
-
-        # ----- ALERT SYSTEM -----
-        self.eye_closed_start = None
-        self.alert_cooldown = 5  # 5 วินาทีต่อการแจ้งเตือน
-        self.last_alert_time = 0
-
-        self.sound_path = os.path.join("notification", "sound_notification.mp3")
-        self.gag_folder = os.path.join("gag")
+    # ------------------------------
+    # Callbacks
+    # ------------------------------
+    def add_result_callback(self, fn):
+        self._result_cbs.append(fn)
+
+    def add_frame_callback(self, fn, lease: bool = False):
+        """
+        lease=False: buffer ใช้ได้แค่ระหว่าง fn ทำงาน (หมุนใช้ซ้ำ DISPLAY_BUFFERS ชุด)
+        lease=True : fn ได้ buffer ไปถือ (เช่นส่ง signal ข้าม thread) ต้องคืนด้วย release_display(buf)
+                     ไม่มี buffer ว่าง (GUI ตามไม่ทัน) → ข้ามเฟรมนั้น ไม่เขียนทับ buffer ที่ยังถูกวาดอยู่
+        """
+        self._frame_cbs.append(fn)
+        self._disp_lease = self._disp_lease or lease
+
+    def release_display(self, buf):
+        """consumer เลิกใช้ buffer ที่ได้จาก frame callback แล้ว (เรียกจาก thread ไหนก็ได้)"""
+        with self._disp_lock:
+            for i, b in enumerate(self._disp_pool):
+                if b is buf:
+                    self._disp_lent[i] = False
+                    return
+
+    def add_alert_callback(self, fn):
+        self._alert_cbs.append(fn)
+
+    def add_ready_callback(self, fn):
+        """fn(error) เมื่อโหลดโมเดลเสร็จ (error = None ถ้าสำเร็จ) — ถ้าเสร็จแล้วเรียกทันที"""
+        self._ready_cbs.append(fn)
+        if self._ready.is_set():
+            fn(self.load_error)
+
+    def remove_callback(self, fn):
+        for cbs in (self._result_cbs, self._frame_cbs, self._alert_cbs, self._ready_cbs):
+            if fn in cbs:
+                cbs.remove(fn)
+
+    async def results(self, maxsize: int = 2):
+        """
+        async iterator ของ (frame_bgr, info) ทุกเฟรมที่ประมวลผล
+        ฝั่ง consumer ช้ากว่า → ทิ้งเฟรมเก่า (latest wins) เหมือน FrameRing
+        เรียกก่อน start() (หรือหลัง stop()) → รอจน start() แล้วจึงเริ่มส่งเฟรม ไม่จบทันที
+        จบเมื่อ stop() และส่งเฟรมที่ค้างในคิวหมดแล้ว
+        """
+        loop = asyncio.get_running_loop()
+        q = asyncio.Queue(maxsize)
+
+        def push(item):
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(item)
+
+        def on_result(frame, info):
+            loop.call_soon_threadsafe(push, (frame, info))
+
+        self.add_result_callback(on_result)
+        try:
+            while not self.running:
+                await asyncio.sleep(0.05)
+            while self.running or not q.empty():
+                try:
+                    yield await asyncio.wait_for(q.get(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+        finally:
+            self.remove_callback(on_result)
+
+    # ------------------------------
+    # Model loading
+    # ------------------------------
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def preload(self, background: bool = False):
+        """import mediapipe + สร้าง FaceMesh / classifier (ส่วนที่ช้าที่สุดตอนเปิดโปรแกรม)"""
+        with self._load_lock:
+            if self._loader is None:
+                self._loader = threading.Thread(target=self._build, name="napnope-load", daemon=True)
+                self._loader.start()
+        if not background:
+            self._loader.join()
+
+    def _build(self):
+        try:
+            with profiler.stage("import detector (mediapipe)"):
+                from .calibration import DriverCalibration
+                from .detector import Detector
+                from .infer import load_classifier
+            with profiler.stage("load classifier"):
+                classifier = load_classifier()
+            with profiler.stage("load driver calibration"):
+                calibration = DriverCalibration(self.driver_id) if CALIB_ENABLED else None
+            with profiler.stage("build FaceMesh graph"):
+                self.detector = Detector(classifier=classifier, calibration=calibration,
+                                         tier=self.tier)
+        except Exception as e:
+            self.load_error = e
+            print("Pipeline: model load failed:", e)
+        self._ready.set()
+        for cb in list(self._ready_cbs):
+            cb(self.load_error)
 
     # ------------------------------
     # Start / Stop
     # ------------------------------
     def start(self):
+        """ไม่บล็อก: เปิดกล้องใน capture thread, inference รอจนโมเดลพร้อม"""
         if self.running:
             return
         self.running = True
-        self.ref_y = None
-        self.ref_frames = 0
-        self.ref_locked = False
-        self.eye_closed_start = None
-        self.last_alert_time = 0
-
-        self.cap = cv2.VideoCapture(self.cam_index)
-        threading.Thread(target=self._loop, daemon=True).start()
+        self.preload(background=True)
+        if self.scheduler is not None:
+            self.scheduler.reset()
+
+        # capture → [_capture_buf] → inference → [_render_buf] → render(callback)
+        self._capture_buf = FrameRing(capacity=2)
+        self._render_buf = FrameRing(capacity=2)
+        self._alerts = queue.SimpleQueue()
+        self.telemetry = TelemetryRecorder() if TELEMETRY_ENABLED else None
+        self.incidents = IncidentRecorder() if INCIDENT_ENABLED else None
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="napnope-capture", daemon=True),
+            threading.Thread(target=self._infer_loop,   name="napnope-infer",   daemon=True),
+        ]
+        if self._frame_cbs:
+            self._threads.append(
+                threading.Thread(target=self._render_loop, name="napnope-render", daemon=True))
+        for t in self._threads:
+            t.start()
 
     def stop(self):
+        if not self.running:
+            return
         self.running = False
-        if self.cap:
-            self.cap.release()
-        self.cap = None
+        cap = self.cap
+        if cap is not None:
+            cap.interrupt()
+        self._capture_buf.close()
+        self._render_buf.close()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self._threads = []
+        if self.incidents is not None:
+            self.incidents.close()
+            self.incidents = None
 
     # ------------------------------
-    # Frame Loop
+    # Stage loops
     # ------------------------------
-    def _loop(self):
+    def _capture_loop(self):
+        """อ่านกล้องให้เร็วที่สุด เฟรมที่ inference ตามไม่ทันจะถูกทิ้งใน ring"""
+        # เปิดกล้องใน thread นี้ (อาจใช้เวลาเป็นวินาที) → start() ไม่บล็อก GUI; thread นี้ปิดกล้องเอง
+        with profiler.stage("open camera"):
+            self.cap = cap = Capture(self.cam_index)
+        frame_id = 0
+        try:
+            while self.running:
+                t0 = metrics.now()
+                ok, frame = cap.read()   # อ่านพลาด → Capture รอ backoff / reconnect เอง
+                metrics.since("capture.read", t0)
+                if not ok:
+                    if cap.ended:
+                        print(f"Pipeline: source {self.cam_index} ended")
+                        break
+                    continue
+                if self.flip:
+                    frame = cv2.flip(frame, 1)
+                t = time.time()
+                incidents = self.incidents
+                if incidents is not None:
+                    # ≤ INCIDENT_FPS: แค่ย่อ/คัดลอกก่อน put (infer thread วาด overlay ลงเฟรมนี้)
+                    # JPEG encode ทำใน thread ของ IncidentRecorder ไม่หน่วง capture
+                    incidents.push(frame, t)
+                self._capture_buf.put((frame_id, t, frame))
+                frame_id += 1
+        finally:
+            cap.release()
+            self.cap = None
+
+    def _infer_loop(self):
+        """ทำงานกับเฟรมใหม่สุดเสมอ"""
+        telemetry = self.telemetry
+        try:
+            while self.running and not self._ready.wait(0.1):
+                pass
+            if self.detector is None:
+                return
+            self.detector.reset()
+            try:
+                self._infer_frames(telemetry)
+            finally:
+                # บันทึก calibration ใน thread นี้หลังเฟรมสุดท้าย → ไม่ชนกับ Detector.process
+                # (stop() join แค่ 1 วินาที ถ้า FaceMesh ค้างอยู่ก็ยังบันทึกตอนเฟรมนั้นจบ)
+                if self.detector.calibration is not None:
+                    self.detector.calibration.save()
+        finally:
+            # ปิด telemetry หลังเฟรมสุดท้ายเช่นกัน (ไม่ปิดใน stop() ขณะ thread นี้อาจยัง record อยู่)
+            if telemetry is not None:
+                telemetry.close()
+                if self.telemetry is telemetry:
+                    self.telemetry = None
+
+    def _infer_frames(self, telemetry):
+        first = True
         while self.running:
-            ok, frame = self.cap.read()
-            if not ok:
+            item = self._capture_buf.get_latest(timeout=0.1)
+            if item is None:
                 continue
-            if self.flip:
-                frame = cv2.flip(frame, 1)
+            frame_id, t_capture, frame = item
+            if metrics.enabled:
+                metrics.observe("queue", time.time() - t_capture)
 
             self.last_frame = frame.copy()
-            info = self._process_frame(frame)
-            self.new_frame.emit(frame, info)
-            time.sleep(0.03)
-
-    # ------------------------------
-    # Rotation Helper
-    # ------------------------------
-    @staticmethod
-    def _rot(p, c, ang):
-        x, y = p
-        cx, cy = c
-        ca, sa = np.cos(ang), np.sin(ang)
-        xr = ca*(x - cx) - sa*(y - cy) + cx
-        yr = sa*(x - cx) + ca*(y - cy) + cy
-        return (xr, yr)
+            self.snapshots.observe(self.last_frame, t_capture)
+            t0 = metrics.now()
+            info = self._process_frame(frame, now=t_capture)
+            metrics.since("infer.total", t0)
+            if first:
+                profiler.mark("first frame processed")
+                first = False
+            info["frame_id"] = frame_id
+            info["t_capture"] = t_capture
+            if telemetry is not None:
+                telemetry.record(info)
+            if metrics.enabled:
+                metrics.observe("e2e.result", time.time() - t_capture)
+
+            for cb in self._result_cbs:
+                cb(frame, info)
+            if self._frame_cbs:
+                if info["triggered"]:
+                    self._alerts.put(info["triggered"])
+                self._render_buf.put((frame, info))
+
+    def _render_loop(self):
+        """
+        ย่อเฟรมล่าสุดให้พอดีขนาดจอแสดงผลแล้วส่งให้ frame callback (จำกัดที่ DISPLAY_FPS)
+        ทำใน thread นี้ → GUI thread แค่วาด buffer ที่พร้อมแล้ว
+        """
+        next_t = 0.0
+        while self.running:
+            wait = next_t - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            item = self._render_buf.get_latest(timeout=0.1)
+            if item is None:
+                continue
+            frame, info = item
+            next_t = time.monotonic() + 1.0 / DISPLAY_FPS
+            t0 = metrics.now()
+            disp = self._to_display(frame)
+            metrics.since("display", t0)
+            if disp is None:
+                # ทุก buffer ยังถูก GUI ถืออยู่ → ข้ามเฟรมนี้ (alert ค้างในคิวไปติดเฟรมถัดไป)
+                self.display_dropped += 1
+                continue
+            # alert มาทางคิวแยก → ไม่หายไปแม้เฟรมที่ trigger จะถูกทิ้ง
+            try:
+                info["triggered"] = self._alerts.get_nowait()
+            except queue.Empty:
+                info["triggered"] = None
+            if metrics.enabled:
+                info["t_emit"] = metrics.now()   # UI วัดเวลาส่ง signal ข้าม thread
+            for cb in self._frame_cbs:
+                cb(disp, info)
+
+    def snapshot(self, burst: int = 1) -> str | None:
+        """บันทึกเฟรมล่าสุด (burst > 1 → หลายเฟรมรอบจังหวะนี้) คืน path / prefix ทันที"""
+        if burst > 1 and self.running:
+            return self.snapshots.burst(burst)
+        return self.snapshots.save(self.last_frame, tag="snap")
+
+    def set_display_size(self, w: int, h: int):
+        """UI แจ้งขนาดพื้นที่แสดงผล (เรียกตอน resize)"""
+        self._display_size = (max(1, int(w)), max(1, int(h)))
+
+    def _acquire_display(self) -> int | None:
+        """index ของ buffer ถัดไปที่เขียนได้ — lease mode ข้าม buffer ที่ consumer ยังไม่คืน"""
+        with self._disp_lock:
+            for k in range(1, DISPLAY_BUFFERS + 1):
+                i = (self._disp_idx + k) % DISPLAY_BUFFERS
+                if not self._disp_lent[i]:
+                    self._disp_idx = i
+                    if self._disp_lease:
+                        self._disp_lent[i] = True
+                    return i
+        return None
+
+    def _to_display(self, frame):
+        """BGR เต็มขนาด → RGB ขนาดพอดีจอ (คงอัตราส่วน) ลง buffer ที่หมุนใช้ซ้ำ (None = ไม่มี buffer ว่าง)"""
+        h, w = frame.shape[:2]
+        dw, dh = self._display_size or (w, h)
+        s = min(dw / w, dh / h)
+        tw, th = max(1, int(w * s)), max(1, int(h * s))
+
+        # lease mode: buffer ที่ GUI ยังถือ (กำลังวาด / signal ยังไม่ถึง) ไม่ถูกเขียนทับ
+        # ไม่ lease: หมุน DISPLAY_BUFFERS ชุด — callback ต้องใช้ buffer ให้เสร็จก่อนคืนค่า
+        i = self._acquire_display()
+        if i is None:
+            return None
+        buf = self._disp_pool[i]
+        if buf is None or buf.shape != (th, tw, 3):
+            buf = self._disp_pool[i] = np.empty((th, tw, 3), np.uint8)
+
+        if (tw, th) == (w, h):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buf)
+        else:
+            if self._disp_scratch is None or self._disp_scratch.shape != (th, tw, 3):
+                self._disp_scratch = np.empty((th, tw, 3), np.uint8)
+            interp = cv2.INTER_AREA if s < 1 else cv2.INTER_LINEAR
+            cv2.resize(frame, (tw, th), dst=self._disp_scratch, interpolation=interp)
+            cv2.cvtColor(self._disp_scratch, cv2.COLOR_BGR2RGB, dst=buf)
+        return buf
 
     # ------------------------------
     # Frame Processing
     # ------------------------------
-    def _process_frame(self, frame):
-        h, w, _ = frame.shape
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb)
-
-        ear = mar = head_ratio = 0.0
-        eye_state = "unknown"
-        mouth_state = "unknown"
-        head_state = "unknown"
-        triggered = None
-
-        if results.multi_face_landmarks:
-            face = results.multi_face_landmarks[0]
-            pts = [(lm.x * w, lm.y * h) for lm in face.landmark]
-
-            # ---- EAR (Eyes) ----
-            LEFT = [33, 160, 158, 133, 153, 144]
-            RIGHT = [362, 385, 387, 263, 373, 380]
-            def calc_ear(idxs):
-                A = _distance(pts[idxs[1]], pts[idxs[5]])
-                B = _distance(pts[idxs[2]], pts[idxs[4]])
-                C = _distance(pts[idxs[0]], pts[idxs[3]]) + 1e-6
-                return (A + B) / (2.0 * C)
-            ear = (calc_ear(LEFT) + calc_ear(RIGHT)) / 2.0
-            eye_state = "closed" if ear < 0.22 else "open"
-
-            # ---- MAR (Mouth) ----
-            mar = _distance(pts[13], pts[14]) / (_distance(pts[78], pts[308]) + 1e-6)
-            mouth_state = "yawn" if mar > 0.60 else "normal"
-
-            # =========================================================
-            # HEAD (deroll + static horizontal reference at nose level)
-            # =========================================================
-            L = pts[33]
-            R = pts[263]
-            nose = pts[1]
-            cx, cy = ((L[0]+R[0])/2, (L[1]+R[1])/2)
-            theta = np.arctan2(R[1]-L[1], R[0]-L[0])
-
-            L_r = self._rot(L, (cx, cy), -theta)
-            R_r = self._rot(R, (cx, cy), -theta)
-            nose_r = self._rot(nose, (cx, cy), -theta)
-
-            nose_y = float(nose_r[1])
-            if not self.ref_locked:
-                if self.ref_y is None:
-                    self.ref_y = nose_y
-                else:
-                    self.ref_y = (1 - self.ref_alpha)*self.ref_y + self.ref_alpha*nose_y
-                self.ref_frames += 1
-                if self.ref_frames >= self.ref_lock_after:
-                    self.ref_locked = True
-
-            eye_dist = max(1.0, _distance(L_r, R_r))
-            dy = (self.ref_y - nose_y) / eye_dist
-            head_ratio = float(dy)
-
-            UP_TH, DOWN_TH = +0.07, -0.07
-            if head_ratio >= UP_TH:
-                head_state = "up"
-            elif head_ratio <= DOWN_TH:
-                head_state = "down"
-            else:
-                head_state = "normal"
-
-            # ---------- Alert Condition ----------
-            now = time.time()
-            if eye_state == "closed":
-                if self.eye_closed_start is None:
-                    self.eye_closed_start = now
-                elif now - self.eye_closed_start >= 3.0:  # ปิดตาเกิน 3 วิ
-                    if head_state == "down" or mouth_state == "yawn":
-                        if now - self.last_alert_time >= self.alert_cooldown:
-                            self.last_alert_time = now
-                            triggered = "Drowsy Alert"
-                            threading.Thread(target=self._alert_action, args=(triggered,), daemon=True).start()
-            else:
-                self.eye_closed_start = None
-
-            # ---------- Draw Debug ----------
-            x_left_r  = min(L_r[0], R_r[0]) - 15
-            x_right_r = max(L_r[0], R_r[0]) + 15
-            left_ref_r  = (x_left_r,  self.ref_y)
-            right_ref_r = (x_right_r, self.ref_y)
-            left_ref_orig  = self._rot(left_ref_r,  (cx, cy), +theta)
-            right_ref_orig = self._rot(right_ref_r, (cx, cy), +theta)
-            nose_orig      = self._rot(nose_r,      (cx, cy), +theta)
-            cv2.line(frame, (int(left_ref_orig[0]), int(left_ref_orig[1])),
-                     (int(right_ref_orig[0]), int(right_ref_orig[1])), (255, 200, 80), 2)
-            cv2.circle(frame, (int(nose_orig[0]), int(nose_orig[1])), 5, (80, 255, 120), -1)
-            cv2.putText(frame, f"HeadRatio: {head_ratio:+.2f}", (20, 40),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1.1, (255,255,255), 2, cv2.LINE_AA)
-
-        return {
-            "eye_state": eye_state,
-            "mouth_state": mouth_state,
-            "head_state": head_state,
-            "ear": float(ear),
-            "mar": float(mar),
-            "head_ratio": float(head_ratio),
-            "triggered": triggered
-        }
+    def _process_frame(self, frame, now=None):
+        if self.scheduler is not None:
+            # scheduler อาจข้าม FaceMesh แล้วใช้ผลล่าสุด
+            info = self.scheduler.step(self.detector, frame, time.time() if now is None else now)
+        else:
+            info = self.detector.process(frame, now)
+        triggered = info["triggered"]
+        if triggered:
+            if metrics.enabled and now is not None:
+                metrics.observe("e2e.alert", time.time() - now)
+            incidents = self.incidents
+            if incidents is not None:
+                info["incident"] = incidents.trigger(
+                    triggered, time.time() if now is None else now, info)
+            if SNAP_BURST_ON_ALERT:
+                info["snapshot"] = self.snapshots.burst(tag="alert")
+            self._alert_action(triggered, dict(info))
+        return info
 
     # ------------------------------
     # Alert actions
     # ------------------------------
-    def _alert_action(self, reason="Drowsy Alert"):
-        """เล่นเสียง + ส่งสัญญาณเปลี่ยนรูป GAG"""
+    def _alert_action(self, reason="Drowsy Alert", info=None):
+        """สั่งเล่นเสียง (ไม่บล็อก) + แจ้ง alert callback พร้อม path รูป GAG"""
         print(f"⚠ ALERT: {reason}")
-        try:
-            if os.path.exists(self.sound_path):
-                threading.Thread(target=playsound, args=(self.sound_path,), daemon=True).start()
-        except Exception as e:
-            print("Sound error:", e)
-
-        gag_path = self._get_random_gag()
-        self.drowsy_alert.emit(reason, gag_path)
-
-    def _get_random_gag(self):
-        """สุ่มเลือกรูปจากโฟลเดอร์ gag"""
-        if not os.path.exists(self.gag_folder):
-            return ""
-        imgs = [f for f in os.listdir(self.gag_folder) if f.endswith(".png")]
-        if not imgs:
-            return ""
-        choice = random.choice(imgs)
-        return os.path.join(self.gag_folder, choice)
+        if self.audio is not None:
+            self.audio.trigger()
+        gag_path = self.gags.pick() if self.gags is not None else ""
+        for cb in self._alert_cbs:
+            cb(reason, gag_path, info or {})
@@ -0,0 +1,116 @@
+# app/qt_alerts.py
+# Alert assets ฝั่ง Qt: รูป gag decode + ย่อครั้งเดียวนอก GUI thread, เสียงผ่าน QMediaPlayer ตัวเดียว
+import os, queue, random, threading
+from collections import OrderedDict
+
+from PySide6.QtCore import QObject, Qt, QUrl, Signal
+from PySide6.QtGui import QImage, QPixmap
+
+from .alerts import AudioWorker
+from .config import GAG_W, GAG_H, GAG_CACHE_MAX, ALERT_SOUND_PATH
+
+
+class GagCache(QObject):
+    """
+    รูป gag ขนาด GAG_W x GAG_H พร้อมแสดง
+    - loader thread: decode + SmoothTransformation → QImage (QImage ใช้นอก GUI thread ได้)
+    - GUI thread: แปลงเป็น QPixmap ครั้งแรกที่ใช้ แล้ว cache แบบ LRU ไม่เกิน capacity รูป
+    รูปที่ถูก evict จะถูกโหลดใหม่ใน background เมื่อสุ่มโดนอีก (alert ไม่เคยรอ decode)
+    """
+    image_ready = Signal(str)
+
+    def __init__(self, files: list[str], size=(GAG_W, GAG_H), capacity: int = GAG_CACHE_MAX):
+        super().__init__()
+        self.files = list(files)
+        self.size = size
+        self.capacity = max(1, capacity)
+        self._images = {}               # path → QImage (ย่อแล้ว, รอแปลงเป็น pixmap)
+        self._pixmaps = OrderedDict()   # path → QPixmap (GUI thread เท่านั้น)
+        self._requested = set()
+        self._last = None
+        self._q = queue.SimpleQueue()
+        for path in self.files[:self.capacity]:
+            self._request(path)
+        self._thread = threading.Thread(target=self._loader, name="napnope-gag", daemon=True)
+        self._thread.start()
+
+    def _request(self, path: str):
+        if path not in self._requested:
+            self._requested.add(path)
+            self._q.put(path)
+
+    def _loader(self):
+        w, h = self.size
+        while True:
+            path = self._q.get()
+            if path is None:
+                return
+            img = QImage(path)
+            if img.isNull():
+                print("Gag image unreadable:", path)
+                continue
+            img = img.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self._images[path] = img.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+            self.image_ready.emit(path)
+
+    def get(self, path: str) -> QPixmap | None:
+        """pixmap ที่พร้อมแสดง หรือ None (ยังโหลดไม่เสร็จ → สั่งโหลดไว้แล้ว)"""
+        pix = self._pixmaps.get(path)
+        if pix is not None:
+            self._pixmaps.move_to_end(path)
+            return pix
+        img = self._images.pop(path, None)
+        if img is None:
+            self._request(path)
+            return None
+        pix = self._pixmaps[path] = QPixmap.fromImage(img)
+        while len(self._pixmaps) > self.capacity:
+            old, _ = self._pixmaps.popitem(last=False)
+            self._requested.discard(old)
+        return pix
+
+    def pick(self) -> QPixmap | None:
+        """สุ่มจากรูปที่พร้อมแล้ว (ไม่ซ้ำรูปเดิมติดกัน) + สั่งโหลดรูปอื่นเผื่อครั้งหน้า"""
+        ready = [p for p in self.files if p in self._pixmaps or p in self._images]
+        if len(ready) < len(self.files):
+            self._request(random.choice(self.files))
+        choices = [p for p in ready if p != self._last] or ready
+        if not choices:
+            return None
+        self._last = random.choice(choices)
+        return self.get(self._last)
+
+    def close(self):
+        self._q.put(None)
+
+
+class AlertSound:
+    """
+    QMediaPlayer สร้างครั้งเดียว (โหลด/decode ไฟล์เสียงค้างไว้) แล้วเล่นซ้ำจากต้น
+    alert ระหว่างที่เสียงยังเล่นอยู่ → ไม่เริ่มซ้อน
+    ไม่มี QtMultimedia → ใช้ alerts.AudioWorker (playsound thread เดียว)
+    """
+
+    def __init__(self, path: str = ALERT_SOUND_PATH):
+        self._player = None
+        self._fallback = None
+        try:
+            from PySide6.QtMultimedia import QAudioOutput, QMediaPlayer
+        except ImportError:
+            self._fallback = AudioWorker(path)
+            return
+        if not os.path.exists(path):
+            return
+        self._output = QAudioOutput()
+        self._player = QMediaPlayer()
+        self._player.setAudioOutput(self._output)
+        self._player.setSource(QUrl.fromLocalFile(os.path.abspath(path)))
+        self._playing = QMediaPlayer.PlaybackState.PlayingState
+
+    def play(self):
+        if self._player is not None:
+            if self._player.playbackState() != self._playing:
+                self._player.setPosition(0)
+                self._player.play()
+        elif self._fallback is not None:
+            self._fallback.trigger()
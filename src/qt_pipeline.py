@@ -0,0 +1,65 @@
+# app/qt_pipeline.py
+# Qt frontend adapter — ห่อ Pipeline (pure Python) ให้ส่งผลออกเป็น Signal
+from PySide6.QtCore import QObject, Signal
+
+from .config import CAM_INDEX, FLIP
+from .pipeline import Pipeline
+
+
+class QtPipeline(QObject):
+    """
+    สะพานระหว่าง Pipeline กับ GUI thread
+    callback ของ Pipeline ถูกเรียกจาก worker thread → emit Signal (Qt ส่งข้าม thread ให้เอง)
+    """
+    new_frame = Signal(object, dict)   # ส่งภาพ (RGB ย่อพอดีจอแล้ว) และข้อมูล
+    drowsy_alert = Signal(str, str)    # (เหตุผล, path รูป GAG)
+    ready = Signal(str)                # โหลดโมเดลเสร็จ ("" = สำเร็จ, ไม่งั้นข้อความ error)
+    snapshot_saved = Signal(str, str)  # (path, error "" = สำเร็จ) หลัง encoder เขียนไฟล์เสร็จ
+
+    def __init__(self, cam_index=CAM_INDEX, flip=FLIP, pipeline: Pipeline | None = None,
+                 lazy: bool = True):
+        super().__init__()
+        # เสียง alert เล่นฝั่ง UI (qt_alerts.AlertSound) → core ไม่ต้องเล่นซ้ำ
+        self.core = pipeline or Pipeline(cam_index, flip, sound=False, lazy=lazy)
+        # buffer ที่ส่งไปกับ new_frame เป็นของ GUI จนกว่าจะเรียก release_display(buf)
+        self.core.add_frame_callback(self.new_frame.emit, lease=True)
+        self.core.add_alert_callback(lambda reason, gag_path, info: self.drowsy_alert.emit(reason, gag_path))
+        self.core.add_ready_callback(lambda err: self.ready.emit("" if err is None else str(err)))
+        self.core.snapshots.add_saved_callback(lambda path, err: self.snapshot_saved.emit(path, err or ""))
+
+    @property
+    def last_frame(self):
+        return self.core.last_frame
+
+    @property
+    def running(self):
+        return self.core.running
+
+    @property
+    def is_ready(self):
+        return self.core.ready
+
+    def preload(self):
+        """เริ่มโหลด FaceMesh / classifier ใน background (ไม่บล็อก GUI)"""
+        self.core.preload(background=True)
+
+    def start(self):
+        self.core.start()
+
+    def stop(self):
+        self.core.stop()
+
+    def snapshot(self, burst: int = 1):
+        return self.core.snapshot(burst)
+
+    def close(self):
+        """หยุด pipeline แล้วรอ snapshot ที่ค้างเขียนให้เสร็จ"""
+        self.core.stop()
+        self.core.snapshots.close()
+
+    def set_display_size(self, w: int, h: int):
+        self.core.set_display_size(w, h)
+
+    def release_display(self, buf):
+        """GUI เลิกวาด buffer ที่ได้จาก new_frame แล้ว → render thread ใช้ซ้ำได้"""
+        self.core.release_display(buf)
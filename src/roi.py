@@ -0,0 +1,158 @@
+# app/roi.py
+# Landmark-driven ROI cropper (ตาซ้าย / ตาขวา / ปาก)
+#   - crop เป็น NumPy view ของเฟรมที่ capture มา (ไม่ copy ทั้งภาพ)
+#   - resize ลง buffer input ของโมเดลที่จองไว้แล้วโดยตรง
+#   - กรอบถูก smooth ข้ามเฟรม (EMA) กันภาพ crop สั่น
+import cv2
+import numpy as np
+
+from . import features as F
+from .config import (
+    ROI_SMOOTH_ALPHA, ROI_EYE_SCALE, ROI_MOUTH_SCALE,
+    TRACK_INPUT_SIZE, TRACK_EXPAND, TRACK_MIN_FACE_PX, TRACK_EDGE_MARGIN,
+)
+
+MOUTH_BOX_IDX = np.array([61, 291, 0, 17, 13, 14])
+
+# ชื่อ region → (landmark index, ขยายกรอบกี่เท่า)
+REGIONS = {
+    "eye_l": (F.LEFT_EYE_IDX,  ROI_EYE_SCALE),
+    "eye_r": (F.RIGHT_EYE_IDX, ROI_EYE_SCALE),
+    "mouth": (MOUTH_BOX_IDX,   ROI_MOUTH_SCALE),
+}
+
+
+class RoiCropper:
+    """คำนวณกรอบจาก landmark แล้วให้ view / crop-resize ลง buffer"""
+
+    def __init__(self, alpha: float = ROI_SMOOTH_ALPHA):
+        self.alpha = alpha              # 0..1 (1 = เนียนขึ้น/ช้าลง)
+        self._scratch = {}              # buffer BGR ชั่วคราวต่อขนาด output
+        self.reset()
+
+    def reset(self):
+        self._state = {}                # name → [cx, cy, half]
+        self.boxes = {}                 # name → (x0, y0, x1, y1) int
+
+    # ------------------------------
+    # Boxes
+    # ------------------------------
+    def update(self, pts: np.ndarray, w: int, h: int) -> dict:
+        """อัปเดตกรอบทุก region จาก landmark (n, 2) ของเฟรมนี้"""
+        for name, (idx, scale) in REGIONS.items():
+            sel = pts[idx]
+            lo, hi = sel.min(axis=0), sel.max(axis=0)
+            raw = np.array([(lo[0] + hi[0]) / 2, (lo[1] + hi[1]) / 2,
+                            max(hi[0] - lo[0], hi[1] - lo[1]) * scale / 2 + 1])
+
+            prev = self._state.get(name)
+            # ขยับเกินครึ่งกรอบ (หน้าเปลี่ยน/detect ใหม่) → ไม่ smooth ให้ตามทันที
+            if prev is None or np.abs(raw[:2] - prev[:2]).max() > prev[2]:
+                cur = raw
+            else:
+                cur = self.alpha * prev + (1 - self.alpha) * raw
+            self._state[name] = cur
+
+            cx, cy, half = cur
+            self.boxes[name] = (max(0, int(cx - half)), max(0, int(cy - half)),
+                                min(w, int(cx + half)), min(h, int(cy + half)))
+        return self.boxes
+
+    # ------------------------------
+    # Crops
+    # ------------------------------
+    def view(self, frame: np.ndarray, name: str) -> np.ndarray:
+        """NumPy view ของ region (แชร์หน่วยความจำกับ frame)"""
+        x0, y0, x1, y1 = self.boxes[name]
+        return frame[y0:y1, x0:x1]
+
+    def views(self, frame: np.ndarray) -> dict:
+        return {name: self.view(frame, name) for name in self.boxes}
+
+    def crop_into(self, frame: np.ndarray, name: str, dst: np.ndarray, rgb: bool = True):
+        """resize region ลง dst (H, W, 3 uint8) โดยตรง; rgb=True แปลง BGR→RGB ด้วย"""
+        src = self.view(frame, name) if name in self.boxes else None
+        if src is None or src.shape[0] < 2 or src.shape[1] < 2:
+            dst[:] = 0
+            return dst
+        size = (dst.shape[1], dst.shape[0])
+        if not rgb:
+            cv2.resize(src, size, dst=dst, interpolation=cv2.INTER_AREA)
+            return dst
+        tmp = self._scratch.get(dst.shape)
+        if tmp is None:
+            tmp = self._scratch[dst.shape] = np.empty(dst.shape, np.uint8)
+        cv2.resize(src, size, dst=tmp, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(tmp, cv2.COLOR_BGR2RGB, dst=dst)
+        return dst
+
+
+# ==============================
+# Face-ROI tracking (สำหรับ FaceMesh)
+# ==============================
+
+class FaceTracker:
+    """
+    จำกรอบหน้าจากเฟรมก่อน → crop + ย่อเหลือ size x size ส่งให้ FaceMesh
+    landmark ที่ได้ (normalized ใน crop) แปลงกลับเป็นพิกัดเฟรมด้วย transform
+    หลุด track (ไม่เจอหน้า / หน้าเล็กเกิน / ชิดขอบ crop) → เฟรมถัดไปใช้ทั้งเฟรม
+    """
+
+    def __init__(self, size: int = TRACK_INPUT_SIZE, expand: float = TRACK_EXPAND):
+        self.size = size
+        self.expand = expand
+        self._buf = np.empty((size, size, 3), np.uint8)
+        self.reset()
+
+    def reset(self):
+        self.box = None       # (x0, y0, x1, y1) ในพิกัดเฟรม
+        self.lost = 0         # จำนวนครั้งที่หลุด track (ไว้ดูสถิติ)
+
+    @property
+    def tracking(self) -> bool:
+        return self.box is not None
+
+    def prepare(self, frame: np.ndarray):
+        """
+        คืน (image, (ox, oy, sx, sy))
+          image    : ภาพที่จะส่ง FaceMesh (BGR)
+          ox, oy   : มุมซ้ายบนของ crop ในเฟรม
+          sx, sy   : ขนาด crop ในเฟรม (landmark.x * sx + ox = x ในเฟรม)
+        """
+        h, w = frame.shape[:2]
+        if self.box is None:
+            return frame, (0.0, 0.0, float(w), float(h))
+        x0, y0, x1, y1 = self.box
+        cv2.resize(frame[y0:y1, x0:x1], (self.size, self.size),
+                   dst=self._buf, interpolation=cv2.INTER_AREA)
+        return self._buf, (float(x0), float(y0), float(x1 - x0), float(y1 - y0))
+
+    def update(self, pts: np.ndarray | None, w: int, h: int):
+        """อัปเดตกรอบจาก landmark ของเฟรมนี้ (พิกัดเฟรม, None = ไม่เจอหน้า)"""
+        if pts is None:
+            if self.box is not None:
+                self.lost += 1
+            self.box = None
+            return
+
+        lo, hi = pts.min(axis=0), pts.max(axis=0)
+        face = float(max(hi[0] - lo[0], hi[1] - lo[1]))
+        if face < TRACK_MIN_FACE_PX:
+            self.box = None
+            return
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            m = TRACK_EDGE_MARGIN * (x1 - x0)
+            if lo[0] < x0 + m or lo[1] < y0 + m or hi[0] > x1 - m or hi[1] > y1 - m:
+                # หน้ากำลังออกนอก crop → ใช้ทั้งเฟรมหนึ่งรอบเพื่อ detect ใหม่
+                self.lost += 1
+                self.box = None
+                return
+
+        cx, cy = (lo[0] + hi[0]) / 2, (lo[1] + hi[1]) / 2
+        half = face * self.expand / 2
+        half = min(half, w / 2, h / 2)
+        x0 = int(np.clip(cx - half, 0, w - 2 * half))
+        y0 = int(np.clip(cy - half, 0, h - 2 * half))
+        side = int(2 * half)
+        self.box = (x0, y0, x0 + side, y0 + side)
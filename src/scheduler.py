@@ -0,0 +1,91 @@
+# app/scheduler.py
+# Adaptive detection-rate scheduler
+#   - วัดเวลา inference ต่อเฟรม (EMA)
+#   - ตอนหน้านิ่ง/ค่าห่างจาก threshold → ลดอัตรา FaceMesh ลงให้อยู่ใน CPU budget
+#   - ตอนค่าเข้าใกล้ threshold หรือหาหน้าไม่เจอ → กลับไป TARGET_FPS ทันที
+import time
+from .config import (
+    TARGET_FPS,
+    SCHED_STABLE_FPS, SCHED_MIN_FPS, SCHED_CPU_BUDGET, SCHED_COST_ALPHA,
+    SCHED_EAR_MARGIN, SCHED_MAR_MARGIN, SCHED_HEAD_MARGIN,
+    EAR_CLOSED_THRESH, MAR_OPEN_THRESH,
+    HEAD_RATIO_UP_TH, HEAD_RATIO_DOWN_TH,
+)
+
+
+class DetectionScheduler:
+    """ตัดสินใจว่าเฟรมไหนต้องรัน FaceMesh เฟรมไหนใช้ผลเดิมได้"""
+
+    def __init__(self, target_fps=TARGET_FPS, stable_fps=SCHED_STABLE_FPS,
+                 min_fps=SCHED_MIN_FPS, cpu_budget=SCHED_CPU_BUDGET):
+        self.full_interval   = 1.0 / target_fps
+        self.stable_interval = 1.0 / stable_fps
+        self.slow_interval   = 1.0 / min_fps
+        self.cpu_budget = cpu_budget
+        self.reset()
+
+    def reset(self):
+        self.cost = None          # วินาทีต่อการรัน 1 ครั้ง (EMA)
+        self.last_run = None
+        self.interval = self.full_interval
+        self.urgent = True
+        self.runs = 0
+        self.skips = 0
+        self.last_info = None
+
+    # ------------------------------
+    # Decision
+    # ------------------------------
+    def should_run(self, now: float) -> bool:
+        # เผื่อครึ่งเฟรม กัน jitter ของกล้องทำให้ข้ามเฟรมตอน full rate
+        if self.last_run is None or now - self.last_run >= self.interval - self.full_interval / 2:
+            return True
+        self.skips += 1
+        return False
+
+    def record(self, now: float, cost: float, info: dict):
+        """บันทึกผลการรันล่าสุด แล้วคำนวณช่วงเวลาถึงรอบถัดไป"""
+        self.last_run = now
+        self.runs += 1
+        self.cost = cost if self.cost is None else \
+            (1 - SCHED_COST_ALPHA) * self.cost + SCHED_COST_ALPHA * cost
+
+        self.urgent = self._is_urgent(info)
+        if self.urgent:
+            self.interval = self.full_interval
+        else:
+            # ลดเหลือ SCHED_STABLE_FPS และช้าลงอีกถ้าเกิน CPU budget (แต่ไม่ต่ำกว่า SCHED_MIN_FPS)
+            budget_interval = self.cost / self.cpu_budget
+            self.interval = min(self.slow_interval, max(self.stable_interval, budget_interval))
+
+    def step(self, detector, frame, now: float) -> dict:
+        """รัน detector ถ้าถึงรอบ ไม่งั้นคืนผลล่าสุด (ไม่มี triggered) + วาด overlay เดิม"""
+        if self.last_info is None or self.should_run(now):
+            t0 = time.perf_counter()
+            info = detector.process(frame, now)
+            self.record(now, time.perf_counter() - t0, info)
+            self.last_info = dict(info)
+            return info
+        detector.draw(frame)
+        return dict(self.last_info, triggered=None, skipped=True)
+
+    @staticmethod
+    def _is_urgent(info: dict) -> bool:
+        if info.get("triggered"):
+            return True
+        if info.get("eye_state") != "open" or info.get("mouth_state") != "normal" \
+                or info.get("head_state") != "normal":
+            return True   # หาหน้าไม่เจอ / อยู่ในสถานะเสี่ยงอยู่แล้ว
+        if abs(info["ear"] - info.get("ear_thresh", EAR_CLOSED_THRESH)) < SCHED_EAR_MARGIN:
+            return True
+        if abs(info["mar"] - info.get("mar_thresh", MAR_OPEN_THRESH)) < SCHED_MAR_MARGIN:
+            return True
+        hr = info["head_ratio"]
+        if hr - HEAD_RATIO_DOWN_TH < SCHED_HEAD_MARGIN or HEAD_RATIO_UP_TH - hr < SCHED_HEAD_MARGIN:
+            return True
+        return False
+
+    @property
+    def rate(self) -> float:
+        """อัตรา FaceMesh ปัจจุบัน (ครั้ง/วินาที)"""
+        return 1.0 / self.interval
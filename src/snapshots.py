@@ -0,0 +1,131 @@
+# app/snapshots.py
+# Snapshot encoder — บันทึกภาพนิ่งใน thread pool (ไม่ทำบน GUI / inference thread)
+#
+#   w = SnapshotWriter()                    # SNAP_FORMAT: jpg | webp | png, SNAP_QUALITY
+#   w.save(frame)                           คืน path ทันที ไฟล์เขียนเสร็จภายหลัง
+#   w.observe(frame, now)                   เรียกทุกเฟรม (เก็บอ้างอิงเฟรมล่าสุด ไม่ copy)
+#   w.burst(8)                              4 เฟรมก่อนกด + 4 เฟรมถัดไป
+#   w.add_saved_callback(fn)                fn(path, error) จาก worker thread
+import collections, os, threading, time, datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+from .config import (
+    SNAP_DIR, SNAP_FORMAT, SNAP_QUALITY, SNAP_PNG_COMPRESSION,
+    SNAP_WORKERS, SNAP_MAX_PENDING, SNAP_BURST_FRAMES,
+)
+
+FORMATS = {
+    "jpg":  (".jpg",  cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+    "png":  (".png",  cv2.IMWRITE_PNG_COMPRESSION),
+}
+
+
+class SnapshotWriter:
+    """
+    encode + เขียนไฟล์ใน ThreadPoolExecutor (cv2.imencode ปล่อย GIL → ไม่กระตุก preview)
+    งานค้างเกิน SNAP_MAX_PENDING → ทิ้งภาพใหม่แทนการรอ
+    เฟรมที่ส่งเข้ามาต้องไม่ถูกเขียนทับภายหลัง (Pipeline สร้าง array ใหม่ทุกเฟรมอยู่แล้ว)
+    """
+
+    def __init__(self, out_dir: str = SNAP_DIR, fmt: str = SNAP_FORMAT,
+                 quality: int = SNAP_QUALITY, workers: int = SNAP_WORKERS,
+                 history: int = SNAP_BURST_FRAMES):
+        if fmt not in FORMATS:
+            raise ValueError(f"snapshot format must be one of {sorted(FORMATS)}, got {fmt!r}")
+        self.out_dir = out_dir
+        self.ext, flag = FORMATS[fmt]
+        value = SNAP_PNG_COMPRESSION if fmt == "png" else max(1, min(100, int(quality)))
+        self._params = [flag, value]
+
+        self._pool = ThreadPoolExecutor(max(1, workers), thread_name_prefix="napnope-snap")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._history = collections.deque(maxlen=max(1, history))   # (now, frame)
+        self._bursts = []                                           # [base, next_index, remaining]
+        self._saved_cbs = []
+        self.dropped = 0
+
+    def add_saved_callback(self, fn):
+        self._saved_cbs.append(fn)
+
+    # ------------------------------
+    # Public API
+    # ------------------------------
+    def _path(self, now: float, tag: str) -> str:
+        stamp = dt.datetime.fromtimestamp(now).strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        return os.path.join(self.out_dir, f"{stamp}_{tag}" if tag else stamp)
+
+    def save(self, frame, now: float | None = None, tag: str = "") -> str | None:
+        """ส่งเฟรม BGR เข้าคิว encode คืน path (None = ไม่มีเฟรม / คิวเต็ม)"""
+        if frame is None:
+            return None
+        return self._submit(frame, self._path(time.time() if now is None else now, tag) + self.ext)
+
+    def observe(self, frame, now: float):
+        """เฟรมล่าสุดจาก pipeline: เก็บเป็นประวัติสำหรับ burst + ส่งเฟรมหลังกดของ burst ที่ค้าง"""
+        with self._lock:
+            self._history.append((now, frame))
+            if not self._bursts:
+                return
+            jobs = []
+            for b in self._bursts:
+                jobs.append(f"{b[0]}_{b[1]:02d}{self.ext}")
+                b[1] += 1
+                b[2] -= 1
+            self._bursts = [b for b in self._bursts if b[2] > 0]
+        for path in jobs:
+            self._submit(frame, path)
+
+    def burst(self, k: int = SNAP_BURST_FRAMES, tag: str = "burst") -> str:
+        """k เฟรมรอบจังหวะนี้: ครึ่งแรกจากประวัติ ที่เหลือจากเฟรมถัดไป คืน prefix ของชุดไฟล์"""
+        with self._lock:
+            before = list(self._history)[-(k // 2):] if k // 2 else []
+            base = self._path(before[-1][0] if before else time.time(), tag)
+            if k - len(before) > 0:
+                self._bursts.append([base, len(before), k - len(before)])
+        for i, (_, frame) in enumerate(before):
+            self._submit(frame, f"{base}_{i:02d}{self.ext}")
+        return base
+
+    def close(self, wait: bool = True):
+        with self._lock:
+            self._bursts = []
+            self._history.clear()
+        self._pool.shutdown(wait=wait)
+
+    # ------------------------------
+    # Workers
+    # ------------------------------
+    def _submit(self, frame, path: str) -> str | None:
+        with self._lock:
+            if self._pending >= SNAP_MAX_PENDING:
+                self.dropped += 1
+                return None
+            self._pending += 1
+        try:
+            self._pool.submit(self._write, frame, path)
+        except RuntimeError:        # pool ปิดแล้ว
+            with self._lock:
+                self._pending -= 1
+            return None
+        return path
+
+    def _write(self, frame, path: str):
+        error = None
+        try:
+            ok, buf = cv2.imencode(self.ext, frame, self._params)
+            if not ok:
+                raise OSError(f"encode {self.ext} failed")
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(buf.tobytes())
+        except Exception as e:
+            error = str(e)
+            print(f"Snapshot {path} failed:", e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+        for cb in list(self._saved_cbs):
+            cb(path, error)
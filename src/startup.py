@@ -0,0 +1,74 @@
+# app/startup.py
+# Startup timing — แยกเวลา import / init แต่ละส่วนนับจากเริ่มโปรเซส
+#
+#   python -m app.main --profile-startup
+#   NAPNOPE_PROFILE_STARTUP=1 python -m app.main --headless
+#
+# (อยากเห็นละเอียดระดับ module ใช้ `python -X importtime -m app.main` ควบคู่ได้)
+import os, sys, time, threading
+from contextlib import contextmanager
+
+_T0 = time.perf_counter()   # main.py import module นี้ก่อนอย่างอื่น
+
+
+class StartupProfiler:
+    """เก็บ (ชื่อ, เริ่ม, จบ, thread) ของแต่ละขั้นตอน — ปิดอยู่ = ไม่ทำอะไรเลย"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages = []
+        self._lock = threading.Lock()
+        self._reported = False
+
+    def _add(self, name: str, start: float, end: float):
+        with self._lock:
+            self.stages.append((name, start - _T0, end - _T0, threading.current_thread().name))
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, start, time.perf_counter())
+
+    def mark(self, name: str):
+        """เหตุการณ์ ณ จุดเวลา (เช่น หน้าต่างแสดงแล้ว)"""
+        if self.enabled:
+            t = time.perf_counter()
+            self._add(name, t, t)
+
+    def report(self, file=None):
+        """พิมพ์ตารางเวลา (ครั้งเดียว)"""
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        file = file or sys.stderr
+        with self._lock:
+            stages = sorted(self.stages, key=lambda s: s[1])
+        print("\n── startup profile ─────────────────────────────────────────", file=file)
+        print(f"{'stage':<36}{'at ms':>9}{'took ms':>10}  thread", file=file)
+        for name, start, end, thread in stages:
+            took = f"{(end - start) * 1e3:10.1f}" if end > start else f"{'·':>10}"
+            print(f"{name:<36}{start * 1e3:9.1f}{took}  {thread}", file=file)
+        total = max((s[2] for s in stages), default=0.0)
+        print(f"{'total':<36}{total * 1e3:9.1f}{'':>10}  rss={_rss_mb():.0f} MB", file=file)
+
+
+def _rss_mb() -> float:
+    try:
+        import resource
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return kb / 1024 if sys.platform != "darwin" else kb / 2**20
+    except Exception:
+        return 0.0
+
+
+profiler = StartupProfiler(enabled=os.environ.get("NAPNOPE_PROFILE_STARTUP") == "1")
+
+
+def enable():
+    profiler.enabled = True
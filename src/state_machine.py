@@ -1,79 +1,218 @@
 import time
+import numpy as np
 # app/state_machine.py
 from .config import (
-    CLOSED_EYE_MIN_FRAMES,
-    YAWN_MIN_FRAMES,
-    YAWN_BURST_FRAMES,
-    HEAD_DOWN_MIN_FRAMES,
-    ALERT_COOLDOWN_FRAMES,
-    ALERT_COOLDOWN_SEC,     
+    CLOSED_EYE_MIN_SEC,
+    YAWN_MIN_SEC,
+    HEAD_DOWN_MIN_SEC,
+    EYE_CLOSED_ALERT_SEC,
+    ALERT_COOLDOWN_SEC,
+    ALERT_RULES,
+    PERCLOS_WINDOW_SEC, PERCLOS_ALERT, PERCLOS_MIN_COVERAGE,
+    YAWN_RATE_WINDOW_SEC, YAWN_RATE_ALERT,
+    RULES_MAX_FPS, RULES_MAX_GAP_SEC,
 )
 
 
+class TimeWeightedRing:
+    """
+    สัดส่วนเวลาที่ค่าเป็น True ในช่วง window วินาทีล่าสุด
+    - ring buffer จองขนาดคงที่ไว้ตั้งแต่แรก (ไม่ append / ไม่ alloc ต่อเฟรม)
+    - แต่ละ sample มีน้ำหนักตามเวลาจริงถึง sample ถัดไป → fps แกว่ง/ข้ามเฟรมก็ยังถูก
+    """
+
+    def __init__(self, window: float, capacity: int, max_gap: float = RULES_MAX_GAP_SEC):
+        self.window = window
+        self.max_gap = max_gap
+        self._t  = np.zeros(capacity, np.float64)
+        self._v  = np.zeros(capacity, np.bool_)
+        self._dt = np.zeros(capacity, np.float64)
+        self.reset()
+
+    def reset(self):
+        self._head = 0          # index ของ sample เก่าสุด
+        self._n = 0
+        self._on = 0.0          # ผลรวมเวลาที่เป็น True
+        self._total = 0.0       # ผลรวมเวลาทั้งหมด
+
+    def push(self, now: float, value: bool):
+        cap = len(self._t)
+        if self._n:
+            # ปิดช่วงของ sample ก่อนหน้า
+            last = (self._head + self._n - 1) % cap
+            dt = min(max(0.0, now - self._t[last]), self.max_gap)
+            self._dt[last] = dt
+            self._total += dt
+            if self._v[last]:
+                self._on += dt
+        if self._n == cap:
+            self._evict()
+        i = (self._head + self._n) % cap
+        self._t[i], self._v[i], self._dt[i] = now, value, 0.0
+        self._n += 1
+        while self._n > 1 and self._t[self._head] < now - self.window:
+            self._evict()
+
+    def _evict(self):
+        h = self._head
+        self._total -= self._dt[h]
+        if self._v[h]:
+            self._on -= self._dt[h]
+        self._head = (h + 1) % len(self._t)
+        self._n -= 1
+
+    @property
+    def coverage(self) -> float:
+        """ข้อมูลครอบคลุมกี่ส่วนของ window (0..1)"""
+        return min(1.0, self._total / self.window)
+
+    @property
+    def ratio(self) -> float:
+        return self._on / self._total if self._total > 0 else 0.0
+
+
+class EventRing:
+    """นับเหตุการณ์ในช่วง window วินาทีล่าสุด (ring ของ timestamp ขนาดคงที่)"""
+
+    def __init__(self, window: float, capacity: int = 64):
+        self.window = window
+        self._t = np.zeros(capacity, np.float64)
+        self.reset()
+
+    def reset(self):
+        self._head = 0
+        self._n = 0
+
+    def add(self, now: float):
+        cap = len(self._t)
+        if self._n == cap:
+            self._head = (self._head + 1) % cap
+            self._n -= 1
+        self._t[(self._head + self._n) % cap] = now
+        self._n += 1
+
+    def count(self, now: float) -> int:
+        while self._n and self._t[self._head] < now - self.window:
+            self._head = (self._head + 1) % len(self._t)
+            self._n -= 1
+        return self._n
+
+
 class StateMachine:
-    """ติดตามสถานะการง่วง / หาว / หลับตา / ก้มศีรษะ"""
+    """
+    Temporal rules engine: ติดตามสถานะการง่วง / หาว / หลับตา / ก้มศีรษะ
+    ใช้ช่วงเวลา (timestamp) แทนการนับเฟรม → ถูกต้องแม้ fps แกว่งหรือ scheduler ข้ามเฟรม
+    rule ที่ใช้งานกำหนดใน config.ALERT_RULES:
+      drowsy     หลับตา ≥ EYE_CLOSED_ALERT_SEC และ (ก้มหัว หรือ หาว)
+      perclos    สัดส่วนเวลาหลับตาใน PERCLOS_WINDOW_SEC ≥ PERCLOS_ALERT
+      yawn_rate  หาว ≥ YAWN_RATE_ALERT ครั้งใน YAWN_RATE_WINDOW_SEC
+      (perclos / yawn_rate เป็น edge-triggered: เตือนครั้งเดียวตอนเงื่อนไขเริ่มจริง
+       แล้วรอให้เงื่อนไขหายก่อนจึงเตือนได้อีก — ไม่เตือนซ้ำทุก cooldown ระหว่าง window ยังไม่ว่าง)
+      eyes_closed / yawn / head_down   กฎเดี่ยวจาก *_MIN_SEC
+    """
 
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, rules=ALERT_RULES):
         self.logger = logger
+        self.rules = frozenset(rules)
+        self.perclos_ring = TimeWeightedRing(PERCLOS_WINDOW_SEC, int(PERCLOS_WINDOW_SEC * RULES_MAX_FPS))
+        self.yawn_ring = EventRing(YAWN_RATE_WINDOW_SEC)
         self.reset()
 
     def reset(self):
-        self.eye_counter = 0
-        self.yawn_counter = 0
-        self.head_counter = 0
-        self.last_alert_time = 0
+        self.eye_since = None      # เวลาที่เริ่มหลับตาต่อเนื่อง
+        self.yawn_since = None
+        self.head_since = None
+        self.yawn_counted = False  # หาวรอบนี้ถูกนับเข้า yawn_ring แล้ว
+        self.last_alert_time = None
+        self.latched = set()       # rule สถิติที่เตือนไปแล้วและเงื่อนไขยังจริงอยู่
         self.current_state = "OK"
+        self.perclos_ring.reset()
+        self.yawn_ring.reset()
+        self.eye_closed_sec = 0.0
+        self.perclos = 0.0
+        self.yawn_per_min = 0.0
 
-    def update(self, eye_state: str, mouth_state: str, head_state: str):
-        """อัปเดตสถานะจากผลโมเดลในแต่ละเฟรม"""
-        now = time.time()
-        triggered = None
+    @staticmethod
+    def _held(since, active: bool, now: float):
+        """คืน (since ใหม่, ระยะเวลาที่ค้างสถานะนี้)"""
+        if not active:
+            return None, 0.0
+        if since is None:
+            since = now
+        return since, now - since
 
-        # --- ตรวจการหลับตา ---
-        if eye_state == "closed":
-            self.eye_counter += 1
-        else:
-            self.eye_counter = 0
+    def features(self) -> dict:
+        """ค่าสถิติต่อเนื่องสำหรับใส่ใน info"""
+        return {
+            "eye_closed_sec": self.eye_closed_sec,
+            "perclos": self.perclos,
+            "yawn_per_min": self.yawn_per_min,
+        }
 
-        if self.eye_counter >= CLOSED_EYE_MIN_FRAMES:
-            triggered = "Drowsy (Eyes Closed)"
-            self.eye_counter = 0
+    def update(self, eye_state: str, mouth_state: str, head_state: str, now: float | None = None):
+        """
+        อัปเดตสถานะจากผลโมเดลในแต่ละเฟรม (now = เวลาของเฟรม, None = เวลาจริง)
+        คืนชื่อ alert ที่เกิดในเฟรมนี้ หรือ None
+        """
+        now = time.time() if now is None else now
+        rules = self.rules
+        triggered = None
 
-        # --- ตรวจการหาว ---
-        if mouth_state == "yawn":
-            self.yawn_counter += 1
-        else:
-            self.yawn_counter = 0
+        # --- rolling statistics ---
+        if eye_state in ("open", "closed"):
+            self.perclos_ring.push(now, eye_state == "closed")
+        self.perclos = self.perclos_ring.ratio
 
-        if self.yawn_counter >= YAWN_MIN_FRAMES:
-            triggered = "Yawning"
-            self.yawn_counter = 0
+        self.eye_since, eye_dur = self._held(self.eye_since, eye_state == "closed", now)
+        self.yawn_since, yawn_dur = self._held(self.yawn_since, mouth_state == "yawn", now)
+        self.head_since, head_dur = self._held(self.head_since, head_state == "down", now)
+        self.eye_closed_sec = eye_dur
 
-        # --- ตรวจการก้มศีรษะ ---
-        if head_state == "down":
-            self.head_counter += 1
-        else:
-            self.head_counter = 0
+        if yawn_dur == 0.0:
+            self.yawn_counted = False
+        elif yawn_dur >= YAWN_MIN_SEC and not self.yawn_counted:
+            self.yawn_ring.add(now)
+            self.yawn_counted = True
+        yawns = self.yawn_ring.count(now)
+        self.yawn_per_min = yawns * 60.0 / YAWN_RATE_WINDOW_SEC
 
-        if self.head_counter >= HEAD_DOWN_MIN_FRAMES:
+        # --- กฎเดี่ยว (เดิมนับเฟรม) ---
+        if "eyes_closed" in rules and eye_dur >= CLOSED_EYE_MIN_SEC:
+            triggered = "Drowsy (Eyes Closed)"
+        if "yawn" in rules and yawn_dur >= YAWN_MIN_SEC:
+            triggered = "Yawning"
+        if "head_down" in rules and head_dur >= HEAD_DOWN_MIN_SEC:
             triggered = "Head Down"
-            self.head_counter = 0
 
-        # --- ตรวจช่วง burst ของการหาว (กรณีพิเศษ) ---
-        if triggered == "Yawning" and self.yawn_counter >= YAWN_BURST_FRAMES:
+        # --- กฎจากสถิติช่วงยาว (edge: เตือนตอนเริ่มเป็นจริง, ปลด latch เมื่อเป็นเท็จ) ---
+        yawn_rate_on = "yawn_rate" in rules and yawns >= YAWN_RATE_ALERT
+        perclos_on = ("perclos" in rules and self.perclos >= PERCLOS_ALERT
+                      and self.perclos_ring.coverage >= PERCLOS_MIN_COVERAGE)
+        if not yawn_rate_on:
+            self.latched.discard("Repeated Yawning")
+        elif "Repeated Yawning" not in self.latched:
             triggered = "Repeated Yawning"
+        if not perclos_on:
+            self.latched.discard("High PERCLOS")
+        elif "High PERCLOS" not in self.latched:
+            triggered = "High PERCLOS"
+
+        # --- หลับตานาน + ก้มหัว/หาว (สำคัญสุด) ---
+        if ("drowsy" in rules and eye_dur >= EYE_CLOSED_ALERT_SEC
+                and (head_state == "down" or mouth_state == "yawn")):
+            triggered = "Drowsy Alert"
 
         # --- ตรวจการ Cooldown (ป้องกันเตือนรัวเกินไป) ---
         if triggered:
-            if now - self.last_alert_time >= ALERT_COOLDOWN_SEC:
+            if self.last_alert_time is None or now - self.last_alert_time >= ALERT_COOLDOWN_SEC:
                 self.last_alert_time = now
                 self.current_state = triggered
+                if triggered in ("Repeated Yawning", "High PERCLOS"):
+                    self.latched.add(triggered)
                 if self.logger:
-                    self.logger.log("ALERT", triggered)
-                print(f"⚠️ ALERT TRIGGERED: {triggered}")
+                    self.logger.log(triggered, self.features())
             else:
-                # ยังอยู่ในช่วงคูลดาวน์
+                # ยังอยู่ในช่วงคูลดาวน์ (rule สถิติที่ถูกกันไว้ยังไม่ latch → เตือนได้หลังคูลดาวน์)
                 triggered = None
 
-        # คืนค่าสถานะปัจจุบัน
-        return self.current_state
\ No newline at end of file
+        return triggered
@@ -0,0 +1,419 @@
+# app/store.py
+# Session store — SQLite (WAL) เก็บ session / event / telemetry พร้อม index สำหรับ query ย้อนหลัง
+#
+#   python -m app.store import Data/logs/*.csv telemetry/*.ntl [--driver ID]
+#   python -m app.store report [--since 7d] [--driver ID] [--by driver,hour]
+#   python -m app.store sessions [--since 30d]
+#
+# ระหว่างรัน EventLogger เขียน event เป็นชุดลง STORE_PATH ด้วย (1 session ต่อการเปิดโปรแกรม)
+# → import CSV ที่ logger เขียนตอนเปิด store อยู่ได้ แถวที่มีแล้ว (driver, ts, event เดียวกัน) จะถูกข้าม
+# importer อ่าน CSV ได้ทุก schema ที่เคยมี:
+#   events.csv schema=2      '# napnope-events schema=2' + timestamp,event,eye_state,...,head_ratio
+#   events.csv เก่า          timestamp,event,detail (ALERT,<reason>) ปนกับแถว 8 คอลัมน์ไม่มี header
+#   drowsy_log.csv           timestamp,EAR,MAR,Pitch,Event (EYE_CLOSE / YAWN)
+import argparse, collections, csv, datetime as dt, functools, os, sqlite3, time
+
+from .config import DRIVER_ID, STORE_PATH, STORE_TELEMETRY_STRIDE
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id       INTEGER PRIMARY KEY,
+    driver   TEXT NOT NULL,
+    source   TEXT NOT NULL DEFAULT '',
+    started  REAL NOT NULL,
+    ended    REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_driver ON sessions(driver, started);
+
+CREATE TABLE IF NOT EXISTS events (
+    id          INTEGER PRIMARY KEY,
+    session_id  INTEGER NOT NULL REFERENCES sessions(id),
+    ts          REAL NOT NULL,
+    event       TEXT NOT NULL,
+    eye_state   TEXT,
+    mouth_state TEXT,
+    head_state  TEXT,
+    ear         REAL,
+    mar         REAL,
+    head_ratio  REAL,
+    pitch       REAL,
+    detail      TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts      ON events(ts, session_id, event);
+CREATE INDEX IF NOT EXISTS events_session ON events(session_id, ts);
+
+-- rollup รายชั่วโมง (อัปเดตด้วย trigger) → report ไม่ต้องสแกน events ทีละแถว
+CREATE TABLE IF NOT EXISTS events_hourly (
+    hour        INTEGER NOT NULL,          -- epoch // 3600 (UTC)
+    session_id  INTEGER NOT NULL,
+    event       TEXT NOT NULL,
+    n           INTEGER NOT NULL,
+    PRIMARY KEY (hour, session_id, event)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS events_hourly_ins AFTER INSERT ON events BEGIN
+    INSERT INTO events_hourly VALUES (CAST(NEW.ts / 3600 AS INTEGER), NEW.session_id, NEW.event, 1)
+    ON CONFLICT(hour, session_id, event) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS events_hourly_del AFTER DELETE ON events BEGIN
+    UPDATE events_hourly SET n = n - 1
+    WHERE hour = CAST(OLD.ts / 3600 AS INTEGER) AND session_id = OLD.session_id AND event = OLD.event;
+END;
+
+CREATE TABLE IF NOT EXISTS telemetry (
+    session_id  INTEGER NOT NULL REFERENCES sessions(id),
+    ts          REAL NOT NULL,
+    frame_id    INTEGER,
+    ear         REAL,
+    mar         REAL,
+    head_ratio  REAL,
+    eye         INTEGER,
+    mouth       INTEGER,
+    head        INTEGER,
+    flags       INTEGER,
+    PRIMARY KEY (session_id, ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS imports (
+    path        TEXT PRIMARY KEY,
+    size        INTEGER,
+    mtime       INTEGER,
+    session_id  INTEGER,
+    rows        INTEGER
+);
+"""
+
+EVENT_COLUMNS = ("ts", "event", "eye_state", "mouth_state", "head_state",
+                 "ear", "mar", "head_ratio", "pitch", "detail")
+
+# ชื่อ event ของ drowsy_log.csv → ชื่อเดียวกับ StateMachine (นับรวมกันได้)
+EVENT_ALIASES = {"EYE_CLOSE": "Eyes Closed", "YAWN": "Yawning", "HEAD_DOWN": "Head Down"}
+
+# คีย์ที่ใช้ group ใน report → label จากแถว (driver, event, hour) ของ events_hourly
+# (เวลาท้องถิ่นคิดจากชั่วโมง UTC → ถูกต้องเมื่อ timezone ต่างจาก UTC เป็นจำนวนชั่วโมงเต็ม)
+@functools.lru_cache(maxsize=65536)
+def _local(hour: int) -> tuple[str, str, str]:
+    """ชั่วโมง UTC → (ชั่วโมง, วัน, ชั่วโมงของวัน) เวลาท้องถิ่น"""
+    t = dt.datetime.fromtimestamp(hour * 3600)
+    return t.strftime("%Y-%m-%d %H:00"), t.strftime("%Y-%m-%d"), t.strftime("%H")
+
+
+GROUP_KEYS = {
+    "driver": lambda driver, event, hour: driver,
+    "event":  lambda driver, event, hour: event,
+    "hour":   lambda driver, event, hour: _local(hour)[0],
+    "day":    lambda driver, event, hour: _local(hour)[1],
+    "hod":    lambda driver, event, hour: _local(hour)[2],
+}
+
+
+def parse_ts(text: str) -> float | None:
+    """'2025-10-17 21:41:34' / '2025-10-17T11:26:11' (เวลาท้องถิ่น) → epoch"""
+    try:
+        return dt.datetime.fromisoformat(text.strip()).timestamp()
+    except ValueError:
+        return None
+
+
+def _num(text: str) -> float | None:
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def event_row(row) -> tuple | None:
+    """แถว CSV ของ EventLogger (logger.FIELDS) → tuple ตาม EVENT_COLUMNS"""
+    ts = parse_ts(row[0])
+    if ts is None:
+        return None
+    return (ts, row[1], row[2] or None, row[3] or None, row[4] or None,
+            _num(row[5]), _num(row[6]), _num(row[7]), None, None)
+
+
+def read_legacy_csv(path: str) -> tuple[list[tuple], int]:
+    """อ่าน CSV ทุก schema → (rows ตาม EVENT_COLUMNS, จำนวนแถวที่อ่านไม่ได้)"""
+    rows, bad = [], 0
+    header = None
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        for rec in csv.reader(f):
+            if not rec or rec[0].startswith("#"):
+                continue
+            if rec[0].strip().lower() == "timestamp":
+                header = [c.strip().lower() for c in rec]
+                continue
+            out = None
+            if len(rec) == 8:
+                # logger.FIELDS (schema 2 หรือแถว 8 คอลัมน์ที่ต่อท้ายไฟล์เก่า)
+                out = event_row(rec)
+            elif header is not None and len(rec) == len(header):
+                d = dict(zip(header, rec))
+                ts = parse_ts(d.get("timestamp", ""))
+                event = d.get("event", "").strip()
+                detail = d.get("detail", "").strip() or None
+                if event.upper() == "ALERT" and detail:
+                    event, detail = detail, event       # ALERT,<reason> → <reason>
+                elif event in EVENT_ALIASES:
+                    event, detail = EVENT_ALIASES[event], event
+                if ts is not None and event:
+                    out = (ts, event, d.get("eye_state") or None, d.get("mouth_state") or None,
+                           d.get("head_state") or None, _num(d.get("ear")), _num(d.get("mar")),
+                           _num(d.get("head_ratio")), _num(d.get("pitch")), detail)
+            if out is None:
+                bad += 1
+            else:
+                rows.append(out)
+    return rows, bad
+
+
+def parse_since(text: str | None) -> float | None:
+    """'7d' / '12h' / '30m' / '2025-10-01' / 'all' → epoch (None = ทั้งหมด)"""
+    if not text or text == "all":
+        return None
+    units = {"d": 86400, "h": 3600, "m": 60}
+    if text[-1] in units and text[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(text[:-1]) * units[text[-1]]
+    ts = parse_ts(text)
+    if ts is None:
+        raise ValueError(f"bad time: {text!r}")
+    return ts
+
+
+class SessionStore:
+    """
+    SQLite 1 ไฟล์ (WAL: ผู้อ่าน report ไม่บล็อกผู้เขียน)
+    connection ผูกกับ thread ที่สร้าง — EventLogger สร้างใน writer thread ของมันเอง
+    """
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=10.0)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        with self.db:
+            self.db.executescript(SCHEMA)
+            self.db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self):
+        self.db.close()
+
+    # ------------------------------
+    # Write
+    # ------------------------------
+    def begin_session(self, driver: str = DRIVER_ID, source: str = "",
+                      started: float | None = None) -> int:
+        with self.db:
+            cur = self.db.execute("INSERT INTO sessions(driver, source, started) VALUES (?, ?, ?)",
+                                  (driver, source, time.time() if started is None else started))
+        return cur.lastrowid
+
+    def end_session(self, session_id: int, ended: float | None = None):
+        with self.db:
+            self.db.execute("UPDATE sessions SET ended = ? WHERE id = ?",
+                            (time.time() if ended is None else ended, session_id))
+
+    def add_events(self, session_id: int, rows):
+        """rows: tuple ตาม EVENT_COLUMNS — 1 transaction ต่อชุด"""
+        with self.db:
+            self._insert_events(session_id, rows)
+
+    def add_telemetry(self, session_id: int, rec: dict, stride: int = STORE_TELEMETRY_STRIDE):
+        """rec = telemetry.load_session(...) — เก็บทุก `stride` เฟรม + ทุกเฟรมที่ trigger"""
+        with self.db:
+            return self._insert_telemetry(session_id, rec, stride)
+
+    # ไม่เปิด transaction เอง (ผู้เรียกอยู่ใน `with self.db:`)
+    def _insert_events(self, session_id: int, rows):
+        self.db.executemany(
+            f"INSERT INTO events(session_id, {', '.join(EVENT_COLUMNS)}) "
+            f"VALUES (?, {', '.join('?' * len(EVENT_COLUMNS))})",
+            ((session_id, *r) for r in rows))
+
+    def _insert_telemetry(self, session_id: int, rec: dict, stride: int = STORE_TELEMETRY_STRIDE) -> int:
+        import numpy as np
+        keep = np.zeros(len(rec["t"]), bool)
+        keep[::max(1, stride)] = True
+        keep |= rec["triggered"]
+        cols = ("t", "frame_id", "ear", "mar", "head_ratio", "eye", "mouth", "head", "flags")
+        data = zip(*(rec[c][keep].tolist() for c in cols))
+        self.db.executemany(
+            "INSERT OR IGNORE INTO telemetry(session_id, ts, frame_id, ear, mar, head_ratio, "
+            "eye, mouth, head, flags) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((session_id, *r) for r in data))
+        return int(keep.sum())
+
+    # ------------------------------
+    # Import
+    # ------------------------------
+    def _import_state(self, path: str):
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        row = self.db.execute("SELECT size, mtime, session_id FROM imports WHERE path = ?",
+                              (key,)).fetchone()
+        return key, (st.st_size, int(st.st_mtime)), row
+
+    def _dedup(self, rows: list[tuple], driver: str, skip_session) -> tuple[list[tuple], int]:
+        """
+        ตัดแถวที่มีอยู่แล้วใน session อื่นของคนขับเดียวกัน (ts, event ตรงกัน)
+        — เช่น CSV ที่ EventLogger เขียนพร้อมกับลง store แบบ live
+        นับเป็น multiset: event ซ้ำในวินาทีเดียวกันตัดออกเท่าที่มีใน DB เท่านั้น
+        """
+        if not rows:
+            return rows, 0
+        have = collections.Counter(self.db.execute(
+            "SELECT e.ts, e.event FROM events e JOIN sessions s ON s.id = e.session_id "
+            "WHERE e.ts BETWEEN ? AND ? AND s.driver = ? AND s.id IS NOT ?",
+            (min(r[0] for r in rows), max(r[0] for r in rows), driver, skip_session)))
+        if not have:
+            return rows, 0
+        out = []
+        for r in rows:
+            k = (r[0], r[1])
+            if have[k] > 0:
+                have[k] -= 1
+            else:
+                out.append(r)
+        return out, len(rows) - len(out)
+
+    def _forget(self, session_id: int):
+        self.db.execute("DELETE FROM events WHERE session_id = ?", (session_id,))
+        self.db.execute("DELETE FROM telemetry WHERE session_id = ?", (session_id,))
+        self.db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def import_file(self, path: str, driver: str = DRIVER_ID) -> tuple[int, int, int] | None:
+        """
+        นำเข้า CSV / .ntl เป็น 1 session — ไฟล์เดิมที่ไม่เปลี่ยนจะข้าม (None)
+        ไฟล์ที่เปลี่ยนไป (ต่อท้ายเพิ่ม) ลบ session เดิมแล้วนำเข้าใหม่ คืน (rows, อ่านไม่ได้, ซ้ำกับใน DB)
+        ทั้งไฟล์เป็น transaction เดียว → crash กลางทางไม่ทิ้ง session ค้างไว้ให้ import ซ้ำ
+        """
+        key, stamp, prev = self._import_state(path)
+        if prev is not None and tuple(prev[:2]) == stamp:
+            return None
+
+        if path.endswith(".ntl"):
+            from .telemetry import load_session
+            rec = load_session(path)
+            rows, bad = [], 0
+            t = rec["t"]
+        else:
+            rows, bad = read_legacy_csv(path)
+            rec, t = None, [r[0] for r in rows]
+        if not len(t):
+            return 0, bad, 0
+
+        with self.db:
+            old = prev[2] if prev is not None else None
+            rows, dup = self._dedup(rows, driver, old)
+            if old is not None:
+                self._forget(old)
+            session_id, n = None, 0
+            if rec is not None or rows:
+                cur = self.db.execute(
+                    "INSERT INTO sessions(driver, source, started, ended) VALUES (?, ?, ?, ?)",
+                    (driver, key, float(min(t)), float(max(t))))
+                session_id = cur.lastrowid
+                if rec is not None:
+                    n = self._insert_telemetry(session_id, rec)
+                else:
+                    self._insert_events(session_id, rows)
+                    n = len(rows)
+            self.db.execute("INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?, ?)",
+                            (key, *stamp, session_id, n))
+        return n, bad, dup
+
+    # ------------------------------
+    # Query
+    # ------------------------------
+    def alert_counts(self, since: float | None = None, until: float | None = None,
+                     driver: str | None = None, by=("driver", "hour")) -> list[tuple]:
+        """
+        จำนวน alert แยกตาม `by` (คีย์ใน GROUP_KEYS) เรียงตามคีย์
+        อ่านจาก events_hourly → ความละเอียดของ since / until คือชั่วโมง
+        """
+        keys = [GROUP_KEYS[k] for k in by]
+        where, args = [], []
+        if since is not None:
+            where.append("h.hour >= ?")
+            args.append(int(since // 3600))
+        if until is not None:
+            where.append("h.hour < ?")
+            args.append(int(-(-until // 3600)))
+        if driver is not None:
+            where.append("s.driver = ?")
+            args.append(driver)
+        sql = (f"SELECT s.driver, h.event, h.hour, SUM(h.n) FROM events_hourly h "
+               f"JOIN sessions s ON s.id = h.session_id "
+               f"{'WHERE ' + ' AND '.join(where) if where else ''} "
+               f"GROUP BY 1, 2, 3")
+        counts = {}
+        for drv, event, hour, n in self.db.execute(sql, args):
+            if n:
+                key = tuple(f(drv, event, hour) for f in keys)
+                counts[key] = counts.get(key, 0) + n
+        return [(*k, n) for k, n in sorted(counts.items())]
+
+    def sessions(self, since: float | None = None, driver: str | None = None) -> list[tuple]:
+        """(id, driver, source, started, ended, events)"""
+        sql = ("SELECT s.id, s.driver, s.source, s.started, s.ended, "
+               "(SELECT COUNT(*) FROM events e WHERE e.session_id = s.id) "
+               "FROM sessions s WHERE s.started >= ? AND (? IS NULL OR s.driver = ?) "
+               "ORDER BY s.started")
+        return self.db.execute(sql, (since or 0.0, driver, driver)).fetchall()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nap?Nope! session store (SQLite)")
+    ap.add_argument("--db", default=STORE_PATH)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="import legacy CSV logs / telemetry .ntl files")
+    imp.add_argument("files", nargs="+")
+    imp.add_argument("--driver", default=DRIVER_ID)
+    rep = sub.add_parser("report", help="alert counts")
+    rep.add_argument("--since", default="7d", help="7d / 24h / 2025-10-01 / all")
+    rep.add_argument("--until", default=None)
+    rep.add_argument("--driver", default=None)
+    rep.add_argument("--by", default="driver,hour", help=f"จาก {', '.join(GROUP_KEYS)}")
+    ses = sub.add_parser("sessions", help="list sessions")
+    ses.add_argument("--since", default="all")
+    ses.add_argument("--driver", default=None)
+    args = ap.parse_args(argv)
+
+    store = SessionStore(args.db)
+    try:
+        if args.cmd == "import":
+            for path in args.files:
+                res = store.import_file(path, args.driver)
+                if res is None:
+                    print(f"{path}: unchanged, skipped")
+                else:
+                    n, bad, dup = res
+                    print(f"{path}: {n} rows" + (f" ({bad} unreadable)" if bad else "")
+                          + (f" ({dup} already in store, skipped)" if dup else ""))
+
+        elif args.cmd == "report":
+            by = [k.strip() for k in args.by.split(",") if k.strip()]
+            unknown = [k for k in by if k not in GROUP_KEYS]
+            if unknown:
+                ap.error(f"unknown --by {unknown}, choose from {list(GROUP_KEYS)}")
+            t0 = time.perf_counter()
+            rows = store.alert_counts(parse_since(args.since), parse_since(args.until),
+                                      args.driver, by)
+            took = (time.perf_counter() - t0) * 1e3
+            print("  ".join(f"{k:<16}" for k in by) + "  alerts")
+            for r in rows:
+                print("  ".join(f"{str(v):<16}" for v in r[:-1]) + f"  {r[-1]}")
+            print(f"{len(rows)} rows, {sum(r[-1] for r in rows)} alerts, {took:.1f} ms")
+
+        else:
+            fmt = lambda t: "–" if t is None else dt.datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M")
+            for sid, driver, source, started, ended, n in store.sessions(parse_since(args.since),
+                                                                         args.driver):
+                print(f"#{sid:<5} {driver:<16} {fmt(started)} → {fmt(ended)}  events={n:<6} {source}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
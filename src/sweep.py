@@ -0,0 +1,282 @@
+# app/sweep.py
+# Threshold sweep / auto-calibration บน landmark ที่ cache ไว้ (framecache.py) — ไม่รัน FaceMesh / pipeline ซ้ำ
+#
+#   python -m app.framecache ingest --landmarks-only        (ครั้งเดียว)
+#   python -m app.sweep                                     random 20000 จุดบน lattice
+#   python -m app.sweep --mode grid --activate              ทุกจุด + ใช้เป็น profile ทันที
+#
+# ขั้นตอน:
+#   1) ต่อคลิป: features.extract ทั้ง batch → EAR / MAR / head_ratio (เฉพาะเฟรมที่เจอหน้า เหมือน Detector)
+#   2) ต่อคลิป: ย่อเป็นสถิติสูงสุดของแต่ละ rule ต่อค่าที่เป็นไปได้ของแต่ละ threshold
+#        drowsy     max(eye_closed_sec ขณะ ก้ม/หาว)   [ear, mar, head]
+#        perclos    max(PERCLOS ที่ coverage พอ)      [ear]
+#        yawn_rate  max(จำนวนหาวใน window)            [mar, yawn_min_sec]
+#   3) ทุก combination = แค่เปรียบเทียบสถิติกับ threshold → precision / recall / F1 ระดับคลิป (เหมือน evaluate)
+#
+# CALIB_ENABLED (หรือ --calib) → threshold EAR / MAR ต่อเฟรมผ่าน calibration.session_track + blend
+# รอบค่าบน lattice เหมือน Detector ที่มี calibration ใหม่ทุกคลิป
+import argparse, json, os, shutil, time, datetime as dt
+import numpy as np
+
+from . import calibration as CAL
+from . import features as F
+from . import config as C
+from .config import (
+    ALERT_RULES, CACHE_DIR, CONFIG_PROFILE, CALIB_ENABLED,
+    PERCLOS_WINDOW_SEC, PERCLOS_MIN_COVERAGE, RULES_MAX_GAP_SEC,
+    YAWN_RATE_WINDOW_SEC, CLOSED_EYE_MIN_SEC, HEAD_DOWN_MIN_SEC,
+)
+from .framecache import FrameCache
+
+# ชื่อใน config → (ต่ำสุด, สูงสุด, ขั้น) ของ lattice
+SEARCH_SPACE = {
+    "EAR_CLOSED_THRESH":    (0.15, 0.30, 0.01),
+    "MAR_OPEN_THRESH":      (0.40, 0.90, 0.05),
+    "HEAD_RATIO_DOWN_TH":   (-0.20, -0.03, 0.01),
+    "EYE_CLOSED_ALERT_SEC": (1.0, 4.0, 0.5),
+    "PERCLOS_ALERT":        (0.15, 0.50, 0.05),
+    "YAWN_MIN_SEC":         (0.2, 1.0, 0.1),
+    "YAWN_RATE_ALERT":      (2, 5, 1),
+}
+PARAMS = list(SEARCH_SPACE)
+
+REF_LOCK_AFTER = C.HEAD_CALIB_FRAMES     # เท่ากับ Detector.ref_lock_after / ref_alpha
+REF_ALPHA = 0.10
+
+
+def lattice(name: str) -> np.ndarray:
+    lo, hi, step = SEARCH_SPACE[name]
+    return np.round(np.arange(lo, hi + step / 2, step), 4)
+
+
+# ==============================
+# Per-clip features
+# ==============================
+
+def clip_features(cache: FrameCache, key: str, calib: bool = CALIB_ENABLED) -> dict:
+    """t / ear / mar / head_ratio ของเฟรมที่เจอหน้า (ตรงกับค่าที่ Detector ส่งเข้า StateMachine)
+    calib → เพิ่ม ear_cal / mar_cal: threshold ส่วนตัวก่อน blend ต่อเฟรม (NaN = ใช้ค่า lattice)"""
+    pts = cache.landmarks_px(key)
+    face = ~np.isnan(pts[:, 0, 0])
+    t = cache.times(key)[face]
+    feats = F.extract(np.ascontiguousarray(pts[face]))
+
+    # head reference: EMA ของ nose_y ช่วง REF_LOCK_AFTER เฟรมแรกแล้วล็อก
+    nose_y = feats["nose_y"]
+    ref = nose_y[0] if len(nose_y) else 0.0
+    for y in nose_y[1:REF_LOCK_AFTER]:
+        ref = (1 - REF_ALPHA) * ref + REF_ALPHA * y
+    hr = F.head_ratio(ref, nose_y, feats["eye_dist"])
+    out = {"t": t, "ear": feats["ear"], "mar": feats["mar"], "head_ratio": hr}
+    if calib:
+        out["ear_cal"], out["mar_cal"] = CAL.session_track(t, feats["ear"], feats["mar"])
+    return out
+
+
+def _held(active: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """ระยะเวลาที่ค้างสถานะ True ต่อเนื่อง ณ แต่ละเฟรม (เหมือน StateMachine._held) — active (..., n)"""
+    n = active.shape[-1]
+    idx = np.arange(n)
+    last_off = np.maximum.accumulate(np.where(active, -1, idx), axis=-1)
+    start = np.minimum(last_off + 1, n - 1)
+    return np.where(active, t - t[start], 0.0)
+
+
+def _window_lo(t: np.ndarray, window: float) -> np.ndarray:
+    """index แรกที่ยังอยู่ใน window ของแต่ละเฟรม (ring evict t < now - window)"""
+    return np.searchsorted(t, t - window, side="left")
+
+
+def clip_stats(f: dict, ears, mars, heads, yawn_secs) -> dict:
+    """สถิติสูงสุดต่อ rule สำหรับทุกค่าของ lattice"""
+    t, n = f["t"], len(f["t"])
+    if n < 2:
+        z = np.zeros
+        return {"drowsy": z((len(ears), len(mars), len(heads))), "perclos": z(len(ears)),
+                "yawn_rate": z((len(mars), len(yawn_secs))), "eye_max": z(len(ears)),
+                "yawn_max": z(len(mars)), "down_max": z(len(heads))}
+
+    ear_th, mar_th = ears[:, None], mars[:, None]
+    if "ear_cal" in f:
+        be, bm = CAL.blend(f["ear_cal"][None, :], f["mar_cal"][None, :], ear_th, mar_th)
+        ear_th = np.where(np.isnan(be), ear_th, be)         # (E, n)
+        mar_th = np.where(np.isnan(bm), mar_th, bm)         # (M, n)
+    closed = f["ear"][None, :] < ear_th                     # (E, n)
+    yawn   = f["mar"][None, :] > mar_th                     # (M, n)
+    down   = f["head_ratio"][None, :] <= heads[:, None]     # (H, n)
+    eye_dur  = _held(closed, t)
+    yawn_dur = _held(yawn, t)
+    down_dur = _held(down, t)
+
+    # drowsy: หลับตานาน ขณะที่ก้มหรือหาว
+    dy = yawn[:, None, :] | down[None, :, :]                # (M, H, n)
+    drowsy = np.where(dy[None], eye_dur[:, None, None, :], -1.0).max(axis=-1)
+
+    # perclos: time-weighted เหมือน TimeWeightedRing (dt ของ sample ถูกตัดที่ max gap)
+    dt_ = np.minimum(np.diff(t, append=t[-1]), RULES_MAX_GAP_SEC)
+    lo = _window_lo(t, PERCLOS_WINDOW_SEC)
+    ct = np.concatenate([[0.0], np.cumsum(dt_)])
+    total = ct[:n] - ct[lo]                                 # sample ล่าสุดยังไม่มีน้ำหนัก
+    cs = np.concatenate([np.zeros((len(ears), 1)), np.cumsum(closed * dt_, axis=-1)], axis=-1)
+    on = cs[:, :n] - cs[:, lo]
+    ok = total / PERCLOS_WINDOW_SEC >= PERCLOS_MIN_COVERAGE
+    perclos = np.where(ok, on / np.maximum(total, 1e-9), 0.0).max(axis=-1)
+
+    # yawn_rate: นับ 1 ครั้งตอน yawn_dur ข้าม yawn_min_sec
+    ys = np.asarray(yawn_secs)[None, :, None]
+    d = yawn_dur[:, None, :]                                 # (M, 1, n)
+    prev = np.concatenate([np.zeros(d.shape[:-1] + (1,)), d[..., :-1]], axis=-1)
+    cross = (d >= ys) & (prev < ys)                          # yawn_min_sec > 0 → d ≥ ys แปลว่ากำลังหาว
+    ev = np.concatenate([np.zeros(cross.shape[:-1] + (1,)), np.cumsum(cross, axis=-1)], axis=-1)
+    lo_y = _window_lo(t, YAWN_RATE_WINDOW_SEC)
+    count = ev[..., 1:] - ev[..., lo_y]
+    yawn_rate = count.max(axis=-1)                           # (M, Y)
+
+    return {"drowsy": drowsy, "perclos": perclos, "yawn_rate": yawn_rate,
+            "eye_max": eye_dur.max(axis=-1), "yawn_max": yawn_dur.max(axis=-1),
+            "down_max": down_dur.max(axis=-1)}
+
+
+# ==============================
+# Scoring
+# ==============================
+
+class Sweep:
+    def __init__(self, cache: FrameCache, rules=ALERT_RULES, keys=None, calib: bool = CALIB_ENABLED):
+        self.rules = frozenset(rules)
+        self.calib = calib
+        self.axes = {name: lattice(name) for name in PARAMS}
+        self.keys = keys or cache.keys()
+        self.labels = np.array([cache.clips[k]["label"] for k in self.keys], bool)
+        a = self.axes
+        stats = [clip_stats(clip_features(cache, k, calib), a["EAR_CLOSED_THRESH"], a["MAR_OPEN_THRESH"],
+                            a["HEAD_RATIO_DOWN_TH"], a["YAWN_MIN_SEC"]) for k in self.keys]
+        # (clips, ...) ต่อ rule
+        self.stats = {name: np.stack([s[name] for s in stats]) for name in stats[0]} if stats else {}
+
+    def size(self) -> int:
+        return int(np.prod([len(v) for v in self.axes.values()]))
+
+    def grid(self) -> np.ndarray:
+        """index ทุก combination (K, len(PARAMS))"""
+        shape = [len(self.axes[p]) for p in PARAMS]
+        return np.stack(np.unravel_index(np.arange(int(np.prod(shape))), shape), axis=-1).astype(np.int16)
+
+    def random(self, k: int, seed: int = 0) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        idx = np.stack([rng.integers(0, len(self.axes[p]), k) for p in PARAMS], axis=-1)
+        return np.unique(idx.astype(np.int16), axis=0)
+
+    def values(self, idx: np.ndarray) -> dict:
+        return {p: self.axes[p][idx[..., i]] for i, p in enumerate(PARAMS)}
+
+    def predict(self, idx: np.ndarray) -> np.ndarray:
+        """(K, clips) — คลิปมี alert อย่างน้อย 1 ครั้ง"""
+        ie, im, ih, iy = (idx[:, PARAMS.index(p)] for p in
+                          ("EAR_CLOSED_THRESH", "MAR_OPEN_THRESH", "HEAD_RATIO_DOWN_TH", "YAWN_MIN_SEC"))
+        v = self.values(idx)
+        s = self.stats
+        pred = np.zeros((len(idx), len(self.keys)), bool)
+        if "drowsy" in self.rules:
+            pred |= s["drowsy"][:, ie, im, ih].T >= v["EYE_CLOSED_ALERT_SEC"][:, None]
+        if "perclos" in self.rules:
+            pred |= s["perclos"][:, ie].T >= v["PERCLOS_ALERT"][:, None]
+        if "yawn_rate" in self.rules:
+            pred |= s["yawn_rate"][:, im, iy].T >= v["YAWN_RATE_ALERT"][:, None]
+        if "eyes_closed" in self.rules:
+            pred |= s["eye_max"][:, ie].T >= CLOSED_EYE_MIN_SEC
+        if "yawn" in self.rules:
+            pred |= s["yawn_max"][:, im].T >= v["YAWN_MIN_SEC"][:, None]
+        if "head_down" in self.rules:
+            pred |= s["down_max"][:, ih].T >= HEAD_DOWN_MIN_SEC
+        return pred
+
+    def score(self, idx: np.ndarray, chunk: int = 65536) -> dict:
+        tp, fp, fn = (np.empty(len(idx), np.int64) for _ in range(3))
+        y = self.labels[None, :]
+        for a in range(0, len(idx), chunk):
+            p = self.predict(idx[a:a + chunk])
+            tp[a:a + chunk] = (p & y).sum(axis=1)
+            fp[a:a + chunk] = (p & ~y).sum(axis=1)
+            fn[a:a + chunk] = (~p & y).sum(axis=1)
+        precision = np.where(tp + fp > 0, tp / np.maximum(tp + fp, 1), 0.0)
+        recall = np.where(tp + fn > 0, tp / np.maximum(tp + fn, 1), 0.0)
+        f1 = np.where(precision + recall > 0,
+                      2 * precision * recall / np.maximum(precision + recall, 1e-12), 0.0)
+        return {"tp": tp, "fp": fp, "fn": fn, "precision": precision, "recall": recall, "f1": f1}
+
+    def current(self) -> np.ndarray:
+        """index บน lattice ที่ใกล้ค่าใน config ปัจจุบันที่สุด"""
+        return np.array([int(np.abs(self.axes[p] - getattr(C, p)).argmin()) for p in PARAMS])
+
+    def best(self, idx: np.ndarray, top: int = 10):
+        """เรียงตาม F1 ↓, FP ↑, recall ↓ แล้ว (เสมอกัน) ใกล้ค่าเดิมใน config ที่สุด"""
+        sc = self.score(idx)
+        span = np.array([max(len(self.axes[p]) - 1, 1) for p in PARAMS])
+        dist = (np.abs(idx - self.current()) / span).sum(axis=1)
+        order = np.lexsort((dist, -sc["recall"], sc["fp"], -sc["f1"]))[:top]
+        return [(idx[i], {k: v[i].item() for k, v in sc.items()}) for i in order]
+
+
+# ==============================
+# Profile output
+# ==============================
+
+def write_profile(path: str, values: dict, score: dict, meta: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    out = {k: (int(v) if isinstance(getattr(C, k), int) else round(float(v), 4)) for k, v in values.items()}
+    out["_meta"] = {**meta, "score": score}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nap?Nope! threshold sweep over cached landmarks")
+    ap.add_argument("--cache", default=CACHE_DIR)
+    ap.add_argument("--mode", choices=("random", "grid"), default="random")
+    ap.add_argument("--samples", type=int, default=20000, help="จำนวนจุด (random)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--rules", default=",".join(ALERT_RULES))
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--out", default=None, help="profile JSON (default profiles/sweep_<stamp>.json)")
+    ap.add_argument("--activate", action="store_true", help=f"คัดลอกไปที่ {CONFIG_PROFILE} (config โหลดอัตโนมัติ)")
+    ap.add_argument("--calib", action=argparse.BooleanOptionalAction, default=CALIB_ENABLED,
+                    help="จำลอง driver calibration แบบเดียวกับ pipeline (default = CALIB_ENABLED)")
+    args = ap.parse_args(argv)
+
+    cache = FrameCache(args.cache)
+    if not cache.clips:
+        raise SystemExit(f"cache ว่าง — รัน `python -m app.framecache ingest --landmarks-only` ก่อน")
+
+    t0 = time.perf_counter()
+    sweep = Sweep(cache, rules=[r.strip() for r in args.rules.split(",") if r.strip()], calib=args.calib)
+    t1 = time.perf_counter()
+    idx = sweep.grid() if args.mode == "grid" else sweep.random(args.samples, args.seed)
+    idx = np.vstack([sweep.current()[None].astype(idx.dtype), idx])     # ค่าปัจจุบันไว้เทียบ
+    top = sweep.best(idx, args.top)
+    t2 = time.perf_counter()
+    base = sweep.best(sweep.current()[None], 1)[0][1]
+
+    print(f"clips={len(sweep.keys)} (pos={int(sweep.labels.sum())})  lattice={sweep.size():,}"
+          f"  scored={len(idx):,}  features={t1 - t0:.1f}s  sweep={t2 - t1:.2f}s")
+    print(f"current config: f1={base['f1']:.3f}  P={base['precision']:.3f}  R={base['recall']:.3f}  FP={base['fp']}")
+    for rank, (i, s) in enumerate(top, 1):
+        vals = "  ".join(f"{p}={v.item():g}" for p, v in sweep.values(i).items())
+        print(f"#{rank:<2} f1={s['f1']:.3f} P={s['precision']:.3f} R={s['recall']:.3f} FP={s['fp']}  {vals}")
+
+    best_idx, best_score = top[0]
+    path = args.out or os.path.join(os.path.dirname(CONFIG_PROFILE) or ".",
+                                    dt.datetime.now().strftime("sweep_%Y%m%d_%H%M%S.json"))
+    write_profile(path, {p: v.item() for p, v in sweep.values(best_idx).items()}, best_score, {
+        "time": dt.datetime.now().isoformat(timespec="seconds"),
+        "mode": args.mode, "scored": int(len(idx)), "clips": len(sweep.keys),
+        "rules": sorted(sweep.rules), "calibration": sweep.calib, "baseline": base,
+    })
+    print(f"→ {path}")
+    if args.activate:
+        shutil.copyfile(path, CONFIG_PROFILE)
+        print(f"→ {CONFIG_PROFILE} (active)")
+
+
+if __name__ == "__main__":
+    main()
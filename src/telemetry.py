@@ -0,0 +1,170 @@
+# app/telemetry.py
+# Per-frame telemetry (ทุกเฟรม ไม่ใช่แค่ alert)
+#
+# ไฟล์ .ntl = header 16 byte + record ขนาดคงที่ บน memory-mapped file ที่จองไว้ล่วงหน้า
+#   header : b"NNTEL" + version(u1) + pad(2) | count(u4) | capacity(u4)
+#   record : RECORD_DTYPE (28 byte)
+# เต็มแล้วขึ้น segment ใหม่ <session>_001.ntl, _002.ntl, ...
+#
+#   python -m app.telemetry telemetry/session_20251017_101500
+import argparse, glob, os, datetime as dt
+import numpy as np
+
+from .config import TELEMETRY_DIR, TELEMETRY_SEGMENT_FRAMES
+
+MAGIC = b"NNTEL"
+VERSION = 1
+HEADER_BYTES = 16
+
+RECORD_DTYPE = np.dtype([
+    ("t",          "<f8"),   # เวลา capture (epoch sec)
+    ("frame_id",   "<u4"),
+    ("ear",        "<f4"),
+    ("mar",        "<f4"),
+    ("head_ratio", "<f4"),
+    ("eye",        "u1"),    # STATE_CODES
+    ("mouth",      "u1"),
+    ("head",       "u1"),
+    ("flags",      "u1"),    # FLAG_*
+])
+
+STATE_NAMES = ["unknown", "open", "closed", "normal", "yawn", "up", "down"]
+STATE_CODES = {name: i for i, name in enumerate(STATE_NAMES)}
+
+FLAG_TRIGGERED = 1
+FLAG_SKIPPED   = 2   # scheduler ใช้ผลเดิม (ไม่ได้รัน FaceMesh)
+FLAG_TRACKING  = 4   # FaceMesh รันบน face-ROI crop
+
+
+# ==============================
+# Writer
+# ==============================
+
+class TelemetryRecorder:
+    """เขียน 1 record ต่อเฟรมลง memmap (แค่ assign ค่าในหน่วยความจำ ไม่มี syscall ต่อเฟรม)"""
+
+    def __init__(self, session: str | None = None, capacity: int = TELEMETRY_SEGMENT_FRAMES):
+        if session is None:
+            os.makedirs(TELEMETRY_DIR, exist_ok=True)
+            session = os.path.join(TELEMETRY_DIR, dt.datetime.now().strftime("session_%Y%m%d_%H%M%S"))
+        self.session = session
+        self.capacity = capacity
+        self.segment = -1
+        self.count = 0
+        self.closed = False
+        self._rec = None
+        self._hdr = None
+        self._open_segment()
+
+    def _segment_path(self, i: int) -> str:
+        return f"{self.session}.ntl" if i == 0 else f"{self.session}_{i:03d}.ntl"
+
+    def _open_segment(self):
+        self._flush_segment()
+        self.segment += 1
+        path = self._segment_path(self.segment)
+        with open(path, "wb") as f:
+            f.write(MAGIC + bytes([VERSION, 0, 0]))
+            f.write(np.array([0, self.capacity], "<u4").tobytes())
+            f.truncate(HEADER_BYTES + self.capacity * RECORD_DTYPE.itemsize)
+        self._hdr = np.memmap(path, dtype="<u4", mode="r+", offset=8, shape=(2,))
+        self._rec = np.memmap(path, dtype=RECORD_DTYPE, mode="r+",
+                              offset=HEADER_BYTES, shape=(self.capacity,))
+        self._n = 0
+
+    def _flush_segment(self):
+        if self._rec is not None:
+            self._hdr[0] = self._n
+            self._rec.flush()
+            self._hdr.flush()
+            self._rec = self._hdr = None
+
+    def record(self, info: dict):
+        if self.closed:
+            return
+        if self._n >= self.capacity:
+            self._open_segment()
+        r = self._rec[self._n]
+        r["t"] = info.get("t_capture", 0.0)
+        r["frame_id"] = info.get("frame_id", self.count)
+        r["ear"] = info.get("ear", 0.0)
+        r["mar"] = info.get("mar", 0.0)
+        r["head_ratio"] = info.get("head_ratio", 0.0)
+        r["eye"] = STATE_CODES.get(info.get("eye_state"), 0)
+        r["mouth"] = STATE_CODES.get(info.get("mouth_state"), 0)
+        r["head"] = STATE_CODES.get(info.get("head_state"), 0)
+        r["flags"] = ((FLAG_TRIGGERED if info.get("triggered") else 0)
+                      | (FLAG_SKIPPED if info.get("skipped") else 0)
+                      | (FLAG_TRACKING if info.get("tracking") else 0))
+        self._n += 1
+        self.count += 1
+        self._hdr[0] = self._n   # อัปเดต count ใน header (อ่านได้แม้โปรแกรมค้าง)
+
+    def close(self):
+        """flush segment สุดท้าย — record() หลังจากนี้ไม่ทำอะไร"""
+        self.closed = True
+        self._flush_segment()
+
+
+# ==============================
+# Reader
+# ==============================
+
+def _read_segment(path: str) -> np.ndarray:
+    with open(path, "rb") as f:
+        head = f.read(HEADER_BYTES)
+    if head[:5] != MAGIC:
+        raise ValueError(f"not a telemetry file: {path}")
+    count, capacity = np.frombuffer(head[8:16], "<u4")
+    rec = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_BYTES, shape=(int(capacity),))
+    return np.asarray(rec[:int(count)])
+
+
+def session_files(session: str) -> list[str]:
+    session = session[:-4] if session.endswith(".ntl") else session
+    first = f"{session}.ntl"
+    return ([first] if os.path.exists(first) else []) + sorted(glob.glob(f"{session}_[0-9][0-9][0-9].ntl"))
+
+
+def load_session(session: str) -> dict:
+    """
+    โหลดทั้ง session เป็น dict ของ ndarray:
+      t, frame_id, ear, mar, head_ratio, eye, mouth, head (รหัส STATE_CODES), flags,
+      triggered / skipped / tracking (bool)
+    """
+    files = session_files(session)
+    if not files:
+        raise FileNotFoundError(session)
+    rec = np.concatenate([_read_segment(p) for p in files])
+    out = {name: rec[name] for name in RECORD_DTYPE.names}
+    out["triggered"] = (rec["flags"] & FLAG_TRIGGERED) != 0
+    out["skipped"]   = (rec["flags"] & FLAG_SKIPPED) != 0
+    out["tracking"]  = (rec["flags"] & FLAG_TRACKING) != 0
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nap?Nope! telemetry session summary")
+    ap.add_argument("session")
+    args = ap.parse_args(argv)
+
+    s = load_session(args.session)
+    n = len(s["t"])
+    if n == 0:
+        print("empty session")
+        return
+    dur = float(s["t"][-1] - s["t"][0])
+    face = s["eye"] != STATE_CODES["unknown"]
+    print(f"frames={n}  duration={dur:.1f}s  fps={n / max(dur, 1e-6):.1f}")
+    print(f"face={face.mean():.1%}  skipped={s['skipped'].mean():.1%}  tracking={s['tracking'].mean():.1%}")
+    if face.any():
+        print(f"EAR  mean={s['ear'][face].mean():.3f}  p5={np.percentile(s['ear'][face], 5):.3f}")
+        print(f"MAR  mean={s['mar'][face].mean():.3f}  p95={np.percentile(s['mar'][face], 95):.3f}")
+        print(f"closed={np.mean(s['eye'][face] == STATE_CODES['closed']):.1%}  "
+              f"yawn={np.mean(s['mouth'][face] == STATE_CODES['yawn']):.1%}  "
+              f"down={np.mean(s['head'][face] == STATE_CODES['down']):.1%}")
+    print(f"alerts={int(s['triggered'].sum())}")
+
+
+if __name__ == "__main__":
+    main()
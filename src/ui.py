@@ -1,27 +1,24 @@
 # app/ui.py
 from __future__ import annotations
-import sys, time, os, cv2, threading, random, glob
+import sys, time, os, cv2
 import numpy as np
 
 from PySide6 import QtCore, QtGui, QtWidgets
 from PySide6.QtCore import Qt
-from PySide6.QtGui import QImage, QPixmap, QShortcut, QKeySequence
+from PySide6.QtGui import QImage, QShortcut, QKeySequence
 
-try:
-    from playsound import playsound
-    HAS_PLAYSOUND = True
-except Exception:
-    HAS_PLAYSOUND = False
-
-from .pipeline import Pipeline         # ✅ ใช้ mediapipe pipeline
-from .state_machine import StateMachine
+from .alerts import list_gags
+from .qt_alerts import GagCache, AlertSound
+from .qt_pipeline import QtPipeline      # ✅ mediapipe pipeline + Qt signal
 from .logger import EventLogger
+from .metrics import metrics
 from .config import (
     # layout / ui sizes
     START_W, START_H,
     MARGIN, HSPACE, VSPACE,
     BOTTOM_H, LIVE_H,
-    GAG_W, GAG_H, GAG_IMAGE_PATH,
+    GAG_W, GAG_H, GAG_IMAGE_PATH, GAG_DIR,
+    SNAP_BURST_FRAMES,
     # camera / runtime (Pipeline ใช้เองอยู่แล้ว)
     CAM_INDEX, FLIP,
 )
@@ -39,6 +36,76 @@ def cv_bgr_to_qimage(bgr: np.ndarray) -> QImage:
     bytes_per_line = ch * w
     return QImage(rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
 
+class VideoView(QtWidgets.QWidget):
+    """
+    วาดภาพ RGB ที่ pipeline ย่อมาพอดีแล้วตรง ๆ (ไม่ scale / ไม่แปลงเป็น QPixmap ทุกเฟรม)
+    QImage ห่อ buffer ของ pipeline โดยไม่ copy และ cache ไว้ต่อ buffer
+    release(buf) ถูกเรียกเมื่อเลิกวาด buffer เดิม → pipeline จึงเขียน buffer นั้นได้อีก (ไม่มีภาพฉีก)
+    """
+    resized = QtCore.Signal(int, int)
+
+    def __init__(self, parent=None, release=None):
+        super().__init__(parent)
+        self._release = release
+        self._buf = None     # buffer ที่ _img ห่ออยู่
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
+        self._img = None
+        self._cache = {}     # (address, shape) → (buffer, QImage)
+        self._hud = []       # บรรทัด metrics overlay (ว่าง = ไม่วาด)
+
+    def set_frame(self, rgb: np.ndarray):
+        key = (rgb.__array_interface__["data"][0], rgb.shape)
+        hit = self._cache.get(key)
+        if hit is None or hit[0] is not rgb:
+            h, w, _ = rgb.shape
+            img = QImage(rgb.data, w, h, rgb.strides[0], QImage.Format_RGB888)
+            if len(self._cache) > 8:
+                self._cache.clear()
+            hit = self._cache[key] = (rgb, img)
+        prev, self._buf, self._img = self._buf, rgb, hit[1]
+        if prev is not None and prev is not rgb and self._release is not None:
+            self._release(prev)
+        self.update()
+
+    def set_hud(self, lines: list[str]):
+        self._hud = lines
+
+    def clear(self):
+        if self._buf is not None and self._release is not None:
+            self._release(self._buf)
+        self._img = self._buf = None
+        self._cache.clear()
+        self.update()
+
+    def paintEvent(self, ev):
+        t0 = metrics.now()
+        p = QtGui.QPainter(self)
+        p.fillRect(self.rect(), Qt.black)
+        if self._img is not None:
+            x = (self.width() - self._img.width()) // 2
+            y = (self.height() - self._img.height()) // 2
+            p.drawImage(x, y, self._img)
+        if self._hud:
+            self._paint_hud(p)
+        p.end()
+        metrics.since("ui.paint", t0)
+
+    def _paint_hud(self, p: QtGui.QPainter):
+        font = QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont)
+        p.setFont(font)
+        lh = p.fontMetrics().height()
+        box = QtCore.QRect(8, 8, 30 * p.fontMetrics().averageCharWidth(), lh * (len(self._hud) + 1) + 8)
+        p.fillRect(box, QtGui.QColor(0, 0, 0, 160))
+        p.setPen(QtGui.QColor(120, 255, 160))
+        p.drawText(box.left() + 6, box.top() + lh, f"{'stage':<14}{'p50':>7}{'p95':>7}")
+        for i, line in enumerate(self._hud, start=2):
+            p.drawText(box.left() + 6, box.top() + lh * i, line)
+
+    def resizeEvent(self, ev):
+        super().resizeEvent(ev)
+        self.resized.emit(self.width(), self.height())
+
 def make_btn(text: str) -> QtWidgets.QPushButton:
     b = QtWidgets.QPushButton(text)
     b.setFixedHeight(44)
@@ -71,8 +138,7 @@ class NapNopeApp(QtWidgets.QMainWindow):
         self.setStatusBar(QtWidgets.QStatusBar(self))
 
         # ---- core components ----
-        self.pipe = Pipeline()            # Pipeline แบบ mediapipe
-        self.fsm  = StateMachine()        # (ใช้งานได้หาก pipeline ส่ง triggered จาก FSM)
+        self.pipe = QtPipeline()          # Pipeline แบบ mediapipe (โหลดโมเดลทีหลัง)
         self.log  = EventLogger()
 
         # ---- central layout ----
@@ -90,13 +156,10 @@ class NapNopeApp(QtWidgets.QMainWindow):
         live_layout = QtWidgets.QVBoxLayout(live_container)
         live_layout.setContentsMargins(0, 0, 0, 0)
 
-        self.live_lbl = QtWidgets.QLabel()
-        self.live_lbl.setAlignment(Qt.AlignCenter)
-        self.live_lbl.setStyleSheet("background:#000; border-radius:10px;")
-        self.live_lbl.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
-        # แสดงแบบคงอัตราส่วน ไม่ครอป
-        self.live_lbl.setScaledContents(False)
-        live_layout.addWidget(self.live_lbl)
+        # แสดงแบบคงอัตราส่วน ไม่ครอป (pipeline ย่อให้พอดีขนาดนี้ใน render thread)
+        self.live_view = VideoView(release=self.pipe.release_display)
+        self.live_view.resized.connect(self.pipe.set_display_size)
+        live_layout.addWidget(self.live_view)
 
         # ===== Right: GAG (fixed 300x700) =====
         gag_container = QtWidgets.QWidget()
@@ -110,9 +173,13 @@ class NapNopeApp(QtWidgets.QMainWindow):
         self.gag_lbl.setStyleSheet("background:#1E1E28; color:#B8B8C8; border-radius:10px;")
         gag_layout.addWidget(self.gag_lbl)
 
-        # เตรียมรายการไฟล์ GAG
-        self.gag_files = self._collect_gags()
-        self._load_gag_initial()
+        # รูป GAG: decode + ย่อครั้งเดียวใน background, เสียง alert: player ตัวเดียว
+        self.gags = GagCache(list_gags(GAG_DIR) or [GAG_IMAGE_PATH])
+        self.gags.image_ready.connect(self._on_gag_ready)
+        self.sound = AlertSound()
+        self._gag_shown = False
+        if not any(os.path.exists(p) for p in self.gags.files):
+            self.gag_lbl.setText("Gag (300×700)\nnot found\n→ assets/gag.png")
 
         # ===== Bottom controls =====
         controls = QtWidgets.QWidget()
@@ -171,62 +238,61 @@ class NapNopeApp(QtWidgets.QMainWindow):
         elif hasattr(self.pipe, "frame_ready"):
             self.pipe.frame_ready.connect(self.on_new_frame)
 
+        self.pipe.ready.connect(self.on_pipeline_ready)
+        self.pipe.snapshot_saved.connect(self.on_snapshot_saved)
+
         QShortcut(QKeySequence(Qt.Key_Escape), self, activated=self.close_app)
+        QShortcut(QKeySequence(Qt.Key_S), self, activated=self.save_snapshot)
+        QShortcut(QKeySequence(Qt.Key_B), self, activated=self.save_burst)
+        QShortcut(QKeySequence(Qt.Key_H), self, activated=self.toggle_hud)
+
+        # metrics HUD (เฉพาะเมื่อเปิด --metrics) อัปเดต 2 ครั้ง/วินาที ไม่ใช่ทุกเฟรม
+        self._hud_on = metrics.enabled
+        self._hud_ts = 0.0
 
         self._last_status_ts = 0.0
-        self.statusBar().showMessage("Ready")
+        self.statusBar().showMessage("Loading face model…")
+        # โหลด mediapipe / FaceMesh หลังหน้าต่างวาดเสร็จ (event loop รอบแรก) → ไม่ค้างจอขาว
+        QtCore.QTimer.singleShot(0, self.pipe.preload)
 
     # ---------------------------
     # GAG helpers
     # ---------------------------
 
-    def _collect_gags(self) -> list[str]:
-        """
-        รวมไฟล์จากโฟลเดอร์ 'gag' ถ้ามี (รองรับ .png .jpg .jpeg).
-        ถ้าไม่มี ให้ใช้ GAG_IMAGE_PATH จาก config เป็น default display.
-        """
-        files = []
-        try:
-            files = (
-                glob.glob(os.path.join("gag", "*.png")) +
-                glob.glob(os.path.join("gag", "*.jpg")) +
-                glob.glob(os.path.join("gag", "*.jpeg"))
-            )
-            files.sort()
-        except Exception:
-            files = []
-        return files
-
-    def _set_gag_pixmap(self, path: str | None):
-        if path and os.path.exists(path):
-            pix = QtGui.QPixmap(path).scaled(GAG_W, GAG_H, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.gag_lbl.setPixmap(pix)
-        elif os.path.exists(GAG_IMAGE_PATH):
-            pix = QtGui.QPixmap(GAG_IMAGE_PATH).scaled(GAG_W, GAG_H, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.gag_lbl.setPixmap(pix)
-        else:
-            self.gag_lbl.setText("Gag (300×700)\nnot found\n→ assets/gag.png")
-
-    def _load_gag_initial(self):
-        # ถ้ามีหลายไฟล์ใน gag/ ใช้อันแรกเป็นค่าเริ่มต้น ไม่งั้นใช้ GAG_IMAGE_PATH
-        path = self.gag_files[0] if self.gag_files else GAG_IMAGE_PATH
-        self._set_gag_pixmap(path)
+    @QtCore.Slot(str)
+    def _on_gag_ready(self, path: str):
+        # รูปแรกที่โหลดเสร็จ (ตามลำดับชื่อไฟล์) เป็นค่าเริ่มต้น
+        if not self._gag_shown and path == self.gags.files[0]:
+            pix = self.gags.get(path)
+            if pix is not None:
+                self.gag_lbl.setPixmap(pix)
+                self._gag_shown = True
 
     def _swap_gag_random(self):
-        if not self.gag_files:
-            # ไม่มีรูปในโฟลเดอร์ gag → ใช้ default
-            self._set_gag_pixmap(GAG_IMAGE_PATH)
-            return
-        self._set_gag_pixmap(random.choice(self.gag_files))
+        # ใช้แค่ pixmap ที่ย่อไว้แล้ว — ไม่ decode / scale บน GUI thread
+        pix = self.gags.pick()
+        if pix is not None:
+            self.gag_lbl.setPixmap(pix)
+            self._gag_shown = True
 
     # ---------------------------
     # Buttons
     # ---------------------------
 
+    @QtCore.Slot(str)
+    def on_pipeline_ready(self, error: str):
+        if error:
+            self.statusBar().showMessage(f"Model load error: {error}")
+        elif self.pipe.running:
+            self.statusBar().showMessage("Detection started…")
+        else:
+            self.statusBar().showMessage("Ready")
+
     def start_detection(self):
         try:
             self.pipe.start()
-            self.statusBar().showMessage("Detection started…")
+            self.statusBar().showMessage("Detection started…" if self.pipe.is_ready
+                                         else "Starting… (loading face model)")
         except Exception as e:
             self.statusBar().showMessage(f"Start error: {e}")
 
@@ -238,46 +304,58 @@ class NapNopeApp(QtWidgets.QMainWindow):
             self.statusBar().showMessage(f"Stop error: {e}")
 
     def save_snapshot(self):
-        frame = getattr(self.pipe, "last_frame", None)
-        if frame is None:
+        # encode ใน background (SnapshotWriter) — กด Shift ค้างไว้ = burst
+        burst = SNAP_BURST_FRAMES if QtWidgets.QApplication.keyboardModifiers() & Qt.ShiftModifier else 1
+        self.save_burst(burst)
+
+    def save_burst(self, k: int = SNAP_BURST_FRAMES):
+        if self.pipe.last_frame is None:
             self.statusBar().showMessage("No frame to save.")
             return
-        img = cv_bgr_to_qimage(frame)
-        pix = QPixmap.fromImage(img)
-        os.makedirs("snapshots", exist_ok=True)
-        fn = time.strftime("snapshots/%Y%m%d_%H%M%S.png")
-        pix.save(fn)
-        self.statusBar().showMessage(f"Saved {fn}", 3000)
+        path = self.pipe.snapshot(k)
+        if path is None:
+            self.statusBar().showMessage("Snapshot queue full — skipped.", 2000)
+        elif k > 1 and self.pipe.running:
+            self.statusBar().showMessage(f"Burst ×{k} → {path}_*", 3000)
+
+    @QtCore.Slot(str, str)
+    def on_snapshot_saved(self, path: str, error: str):
+        if error:
+            self.statusBar().showMessage(f"Snapshot error: {error}", 3000)
+        else:
+            self.statusBar().showMessage(f"Saved {path}", 3000)
+
+    def toggle_hud(self):
+        self._hud_on = metrics.enabled and not self._hud_on
+        self.live_view.set_hud([])
+        self.live_view.update()
 
     def close_app(self):
         try:
-            self.pipe.stop()
+            self.pipe.close()
         except Exception:
             pass
+        self.log.close()
+        self.gags.close()
         self.close()
 
-    # ---------------------------
-    # Sound (async)
-    # ---------------------------
-
-    def _play_alert_sound(self, path: str):
-        if not HAS_PLAYSOUND or not os.path.exists(path):
-            return
-        threading.Thread(target=lambda: playsound(path), daemon=True).start()
-
     # ---------------------------
     # Slot: receive frames
     # ---------------------------
 
     @QtCore.Slot(object, dict)
     def on_new_frame(self, frame, info):
-        # --- แสดงภาพแบบคงอัตราส่วน (Letterbox) ---
-        qimg = cv_bgr_to_qimage(frame)
-        pix = QPixmap.fromImage(qimg).scaled(
-            self.live_lbl.width(), self.live_lbl.height(),
-            Qt.KeepAspectRatio, Qt.SmoothTransformation
-        )
-        self.live_lbl.setPixmap(pix)
+        t0 = metrics.now()
+        if metrics.enabled:
+            if "t_emit" in info:
+                metrics.since("signal", info["t_emit"])
+            metrics.observe("e2e.display", time.time() - info.get("t_capture", time.time()))
+            if self._hud_on and t0 - self._hud_ts >= 0.5:
+                self._hud_ts = t0
+                self.live_view.set_hud(metrics.hud_lines())
+
+        # --- แสดงภาพ (RGB ย่อแบบ letterbox มาจาก pipeline แล้ว) ---
+        self.live_view.set_frame(frame)
 
         # --- อัปเดตค่าด้านล่าง ---
         eye_state   = str(info.get("eye_state", "–")).upper()
@@ -305,9 +383,10 @@ class NapNopeApp(QtWidgets.QMainWindow):
                 self.statusBar().showMessage(f"⚠ {triggered}", 2000)
                 self._last_status_ts = now
             # 3) เล่นเสียง
-            self._play_alert_sound(os.path.join("notification", "sound_notification.mp3"))
+            self.sound.play()
             # 4) เปลี่ยนรูป gag แบบสุ่ม
             self._swap_gag_random()
+        metrics.since("ui.frame", t0)
 
 
 # ---------------------------
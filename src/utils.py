@@ -0,0 +1,53 @@
+# app/utils.py
+import threading
+from collections import deque
+
+
+# ==============================
+# Latest-frame-wins ring buffer
+# ==============================
+
+class FrameRing:
+    """
+    Bounded ring buffer ระหว่าง stage (capture → inference → render)
+    - put()  ไม่บล็อก: ถ้าเต็ม ของเก่าสุดถูกทิ้ง
+    - get_latest() คืนของใหม่สุด แล้วทิ้งของค้างที่เก่ากว่าทั้งหมด
+    """
+
+    def __init__(self, capacity: int = 2):
+        self._buf = deque(maxlen=max(1, capacity))
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        """ใส่ item แล้วคืน item ที่ถูกเบียดตกไป (ถ้ามี) ให้ผู้เรียกจัดการต่อ"""
+        with self._cond:
+            evicted = None
+            if len(self._buf) == self._buf.maxlen:
+                evicted = self._buf[0]
+                self.dropped += 1
+            self._buf.append(item)
+            self._cond.notify()
+            return evicted
+
+    def get_latest(self, timeout: float | None = None):
+        """รอจนมีของ (หรือหมดเวลา / ถูกปิด → None)"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._buf or self._closed, timeout):
+                return None
+            if not self._buf:
+                return None
+            item = self._buf.pop()
+            self.dropped += len(self._buf)
+            self._buf.clear()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._buf.clear()
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._buf)
@@ -0,0 +1,47 @@
+# tests/test_state_machine.py
+# replay ลำดับเฟรมผ่าน StateMachine — rule สถิติ (perclos / yawn_rate) ต้องเตือนครั้งเดียวต่อเหตุการณ์
+from src.config import YAWN_MIN_SEC, YAWN_RATE_ALERT, YAWN_RATE_WINDOW_SEC, PERCLOS_WINDOW_SEC
+from src.state_machine import StateMachine
+
+FPS = 30.0
+
+
+def replay(sm, frames, t0=0.0):
+    """frames = [(eye, mouth, head, วินาที)] → รายการ (t, alert)"""
+    alerts, t = [], t0
+    for eye, mouth, head, sec in frames:
+        for _ in range(int(sec * FPS)):
+            a = sm.update(eye, mouth, head, now=t)
+            if a:
+                alerts.append((t, a))
+            t += 1.0 / FPS
+    return alerts, t
+
+
+def yawn_burst(n=YAWN_RATE_ALERT):
+    frames = []
+    for _ in range(n):
+        frames += [("open", "yawn", "normal", YAWN_MIN_SEC + 1.0), ("open", "normal", "normal", 4.0)]
+    return frames
+
+
+def test_yawn_burst_alerts_once():
+    sm = StateMachine(rules=("yawn_rate",))
+    frames = yawn_burst() + [("open", "normal", "normal", YAWN_RATE_WINDOW_SEC + 5.0)]
+    alerts, _ = replay(sm, frames)
+    assert [a for _, a in alerts] == ["Repeated Yawning"]
+
+
+def test_yawn_rate_rearms_after_window_drains():
+    sm = StateMachine(rules=("yawn_rate",))
+    quiet = [("open", "normal", "normal", YAWN_RATE_WINDOW_SEC + 5.0)]
+    alerts, _ = replay(sm, yawn_burst() + quiet + yawn_burst() + quiet)
+    assert [a for _, a in alerts] == ["Repeated Yawning", "Repeated Yawning"]
+
+
+def test_high_perclos_alerts_once():
+    sm = StateMachine(rules=("perclos",))
+    # ตาปิด 50% ของเวลาไปเรื่อย ๆ นาน 2 window → PERCLOS สูงค้าง แต่เตือนครั้งเดียว
+    frames = [("closed", "normal", "normal", 0.5), ("open", "normal", "normal", 0.5)]
+    alerts, _ = replay(sm, frames * int(2 * PERCLOS_WINDOW_SEC))
+    assert [a for _, a in alerts] == ["High PERCLOS"]